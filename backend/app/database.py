@@ -1,13 +1,21 @@
 import os
 import asyncio
-from databases import Database
+from databases import Database, DatabaseURL
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-database = Database(DATABASE_URL, statement_cache_size=0, min_size=1, max_size=10)
+# Opsi pool asyncpg (pgbouncer Supabase: tanpa prepared statement cache).
+# Driver lain (SQLite lokal) menolak argumen ini, jadi hanya untuk Postgres.
+PG_CONNECT_OPTIONS = {"statement_cache_size": 0, "min_size": 1, "max_size": 10}
+_is_postgres = bool(DATABASE_URL) and DatabaseURL(DATABASE_URL).dialect in (
+    "postgresql",
+    "postgres",
+)
+
+database = Database(DATABASE_URL, **(PG_CONNECT_OPTIONS if _is_postgres else {}))
 
 
 async def connect_to_db():
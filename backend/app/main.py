@@ -5,7 +5,9 @@ BRIDA AI System - Main Application (FIXED)
 Enhanced with Vector Search functionality and proper router configuration
 """
 
-from fastapi import FastAPI, Request
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
@@ -17,6 +19,8 @@ from app.routers.recommendations import router as recommendations_router
 from app.routers.ai_insight import router as insight_router
 from app.routers.ai_collaboration import router as collaboration_router
 from app.routers.dashboard import router as dashboard_router  # ✅ ADDED
+from app.routers.vector_search import router as vector_search_router
+from app.services.embedding_provider import EmbeddingQueueFull
 
 # ===============================
 # IMPORT STARTUP HANDLER
@@ -84,12 +88,18 @@ async def health():
             _inovasi_data_cache,
         )
         from app.services.clustering_service import get_cluster_cache
+        from app.services.embedding_provider import (
+            get_executor_stats,
+            get_model_stats,
+        )
 
         cluster_data, cluster_last_run = get_cluster_cache()
 
         return {
             "status": "healthy",
             "database": "connected" if database.is_connected else "disconnected",
+            "embedding_model": get_model_stats(),
+            "embedding_executor": get_executor_stats(),
             "caches": {
                 "vector": {
                     "loaded": vector_loaded,
@@ -133,6 +143,9 @@ app.include_router(insight_router)
 # AI Collaboration routes
 app.include_router(collaboration_router)
 
+# Vector search routes
+app.include_router(vector_search_router)
+
 # Admin routes
 app.include_router(admin_router)
 
@@ -144,21 +157,41 @@ app.include_router(admin_router)
 
 # Test vector search directly (for debugging)
 @app.get("/test/vector-search")
-async def test_vector_search(query: str):
+async def test_vector_search(
+    query: str,
+    urusan: Optional[List[str]] = Query(None),
+    jenis: Optional[List[str]] = Query(None),
+    opd: Optional[List[str]] = Query(None),
+    kematangan: Optional[List[str]] = Query(None),
+):
     """
     Test vector search functionality directly
     Example: /test/vector-search?query=POP SURGA
+    Dengan filter: /test/vector-search?query=stunting&urusan=Kesehatan&jenis=Digital
     """
     try:
         from app.services.vector_search_service import vector_search_inovasi
 
-        results = await vector_search_inovasi(query, top_k=5)
+        filters = {
+            "urusan": urusan,
+            "jenis": jenis,
+            "opd": opd,
+            "kematangan": kematangan,
+        }
+        filters = {k: v for k, v in filters.items() if v}
+
+        results = await vector_search_inovasi(query, top_k=5, filters=filters)
 
         return {
             "query": query,
+            "filters": filters,
             "results": results,
             "count": len(results),
         }
+    except EmbeddingQueueFull as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
     except Exception as e:
         return {
             "error": str(e),
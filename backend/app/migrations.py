@@ -0,0 +1,187 @@
+"""
+Schema Migrations
+Tabel tambahan yang dibuat backend sendiri (CREATE ... IF NOT EXISTS),
+dijalankan sekali saat startup setelah database terkoneksi. Tabel utama
+(data_inovasi, clustering_result, ...) tetap dikelola di Supabase; di sana
+backend hanya menambah kolom yang dibutuhkan.
+"""
+
+from app.database import database
+
+# ===============================
+# DDL
+# ===============================
+TABLES = [
+    # Satu baris per eksekusi clustering; tepat satu run yang is_active.
+    # Reader hanya membaca hasil run aktif, jadi run baru bisa ditulis
+    # tanpa mengganggu dashboard / chatbot.
+    """
+    CREATE TABLE IF NOT EXISTS clustering_run (
+        run_id BIGINT PRIMARY KEY,
+        status VARCHAR(16) NOT NULL,
+        is_active BOOLEAN NOT NULL DEFAULT FALSE,
+        model_name VARCHAR(64),
+        total_data INTEGER,
+        created_at TIMESTAMP NOT NULL,
+        activated_at TIMESTAMP
+    )
+    """,
+    # Top-k tetangga per inovasi hasil clustering (pengganti dump all-pairs
+    # similarity_result). Satu baris per pasangan per run,
+    # inovasi_id_1 < inovasi_id_2; cluster_id NULL kalau beda cluster.
+    """
+    CREATE TABLE IF NOT EXISTS similarity_neighbor (
+        run_id BIGINT NOT NULL,
+        inovasi_id_1 BIGINT NOT NULL,
+        inovasi_id_2 BIGINT NOT NULL,
+        similarity REAL NOT NULL,
+        cluster_id INTEGER,
+        scope VARCHAR(16) NOT NULL,
+        processed_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (run_id, inovasi_id_1, inovasi_id_2)
+    )
+    """,
+    # change_id inovasi_change_log terakhir yang sudah diproses per stage
+    # (lihat change_tracking)
+    """
+    CREATE TABLE IF NOT EXISTS pipeline_watermark (
+        stage VARCHAR(32) PRIMARY KEY,
+        change_id BIGINT NOT NULL,
+        updated_at TIMESTAMP NOT NULL
+    )
+    """,
+    # Job background (clustering, dst.) beserta progress-nya, lihat job_runner
+    """
+    CREATE TABLE IF NOT EXISTS background_job (
+        job_id VARCHAR(32) PRIMARY KEY,
+        kind VARCHAR(32) NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        progress REAL NOT NULL DEFAULT 0,
+        message TEXT,
+        result TEXT,
+        error TEXT,
+        created_at TIMESTAMP NOT NULL,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    """,
+    # Lease lintas proses untuk job_runner (satu job berjalan di semua worker)
+    """
+    CREATE TABLE IF NOT EXISTS job_lock (
+        name VARCHAR(32) PRIMARY KEY,
+        owner VARCHAR(64),
+        job_id VARCHAR(32),
+        expires_at TIMESTAMP
+    )
+    """,
+    # Jawaban Gemini per sha256(mode, model, prompt), lihat llm_cache
+    """
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        cache_key VARCHAR(64) PRIMARY KEY,
+        mode VARCHAR(32) NOT NULL,
+        model VARCHAR(100) NOT NULL,
+        response TEXT NOT NULL,
+        is_json BOOLEAN NOT NULL DEFAULT FALSE,
+        hits INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP NOT NULL,
+        last_hit_at TIMESTAMP NOT NULL,
+        expires_at TIMESTAMP NOT NULL
+    )
+    """,
+]
+
+# Tabel turunan (diisi ulang tiap clustering): kalau kolom ini belum ada,
+# tabel dibuang lalu dibuat ulang dengan skema terbaru
+DERIVED_TABLES = [
+    ("similarity_neighbor", "run_id"),
+]
+
+# (tabel, kolom, tipe) yang ditambahkan ke tabel yang sudah ada
+COLUMNS = [
+    ("clustering_result", "run_id", "BIGINT"),
+    ("similarity_result", "run_id", "BIGINT"),
+    # Penambahan incremental ke run aktif (lihat incremental_clustering)
+    ("clustering_run", "incremental_rows", "INTEGER DEFAULT 0"),
+    ("clustering_run", "needs_recluster", "BOOLEAN DEFAULT FALSE"),
+    # Pemilik (proses) dan heartbeat job, lihat job_runner
+    ("background_job", "owner", "VARCHAR(64)"),
+    ("background_job", "heartbeat_at", "TIMESTAMP"),
+    # Cancel dari worker lain, dieksekusi heartbeat pemilik job
+    ("background_job", "cancel_requested", "BOOLEAN DEFAULT FALSE"),
+]
+
+INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_clustering_result_run
+    ON clustering_result (run_id, cluster_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_similarity_result_run
+    ON similarity_result (run_id, cluster_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_similarity_neighbor_run_id_2
+    ON similarity_neighbor (run_id, inovasi_id_2)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_similarity_neighbor_run_similarity
+    ON similarity_neighbor (run_id, similarity DESC)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_background_job_created
+    ON background_job (created_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires
+    ON llm_response_cache (expires_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_hit
+    ON llm_response_cache (last_hit_at)
+    """,
+]
+
+
+async def _has_column(table: str, column: str) -> bool:
+    # information_schema tidak ada di SQLite, jadi cukup coba SELECT
+    try:
+        await database.fetch_all(f"SELECT {column} FROM {table} WHERE 1 = 0")
+        return True
+    except Exception:
+        return False
+
+
+async def _add_column(table: str, column: str, column_type: str):
+    if not await _has_column(table, column):
+        await database.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        print(f"🧱 Added column {table}.{column}")
+
+
+async def _drop_if_outdated(table: str, column: str):
+    if await _has_column(table, "*") and not await _has_column(table, column):
+        await database.execute(f"DROP TABLE {table}")
+        print(f"🧱 Dropped outdated {table} (missing {column}), recreating")
+
+
+async def run_migrations():
+    """Jalankan semua DDL; error satu statement tidak menghentikan startup."""
+    from app.services.change_tracking import install_change_tracking
+    from app.services.clustering_runs import adopt_legacy_rows
+
+    steps = (
+        [lambda t=t: _drop_if_outdated(*t) for t in DERIVED_TABLES]
+        + [lambda s=s: database.execute(s) for s in TABLES]
+        + [lambda c=c: _add_column(*c) for c in COLUMNS]
+        + [lambda s=s: database.execute(s) for s in INDEXES]
+        + [adopt_legacy_rows, install_change_tracking]
+    )
+
+    applied = 0
+    for step in steps:
+        try:
+            await step()
+            applied += 1
+        except Exception as e:
+            print(f"⚠️ Migration failed: {e}")
+
+    print(f"✅ Schema migrations checked ({applied}/{len(steps)})")
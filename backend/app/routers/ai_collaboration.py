@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.services.collaboration_scorer import calculate_collaboration_score
-from app.services.ai_service import call_gemini
+from app.services.llm_cache import call_gemini_cached
 from app.services.insight_builder import build_input_collaboration_prompt
 from app.database import database
-import json
 
 router = APIRouter(prefix="/ai-input-collaboration", tags=["AI Input Collaboration"])
 
 
 @router.get("/simulate")
-async def simulate_ai_collaboration(inovasi_1_id: int, inovasi_2_id: int):
+async def simulate_ai_collaboration(
+    request: Request, inovasi_1_id: int, inovasi_2_id: int
+):
 
     inovasi_1 = await database.fetch_one(
         "SELECT * FROM data_inovasi WHERE id = :id",
@@ -31,13 +32,11 @@ async def simulate_ai_collaboration(inovasi_1_id: int, inovasi_2_id: int):
 
     prompt = build_input_collaboration_prompt(inn1, inn2, score)
 
-    ai_response = call_gemini(prompt, mode="collaboration")
-
     try:
-        ai_result = json.loads(
-            ai_response.strip().replace("```json", "").replace("```", "")
+        ai_result = await call_gemini_cached(
+            prompt, mode="collaboration", parse_json=True, request=request
         )
-    except Exception:
+    except ValueError:
         raise HTTPException(status_code=500, detail="Format respon AI tidak valid")
 
     return {
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from datetime import date
 from app.database import database
-from app.services.ai_service import call_gemini
+from app.services.clustering_runs import ACTIVE_RUN_SQL
+from app.services.ai_service import call_gemini_async
+from app.services.llm_cache import call_gemini_cached
+from app.services.vector_search_service import get_pair_similarity
 from app.services.insight_builder import (
     build_insight_prompt,
     build_collaboration_prompt,
@@ -15,7 +18,7 @@ router = APIRouter(prefix="/dashboard", tags=["AI Insight"])
 # AI INSIGHT DASHBOARD (JANGAN DIUBAH)
 # =========================
 @router.get("/ai-insight")
-async def get_ai_insight():
+async def get_ai_insight(request: Request):
     today = date.today()
 
     cache = await database.fetch_one(
@@ -83,7 +86,7 @@ async def get_ai_insight():
     prompt = build_insight_prompt(stats, trend, top_opd, tahap_dist, top_urusan)
 
     try:
-        ai_text = call_gemini(prompt, mode="insight")
+        ai_text = await call_gemini_async(prompt, mode="insight", request=request)
 
         ai_text_clean = ai_text.strip()
         if ai_text_clean.startswith("```"):
@@ -112,9 +115,10 @@ async def get_ai_insight():
 # AI ANALISIS TOP REKOMENDASI KOLABORASI
 # =========================
 @router.get("/ai-collaboration")
-async def ai_collaboration_insight(inovasi_1: int, inovasi_2: int):
+async def ai_collaboration_insight(request: Request, inovasi_1: int, inovasi_2: int):
     # ✅ FIXED: Gunakan nama kolom yang benar dari database
-    query = """
+    # similarity_neighbor menyimpan pasangan sekali (id kecil, id besar)
+    query = f"""
     SELECT
         s.similarity,
         a.judul_inovasi AS inovasi_1,
@@ -123,16 +127,31 @@ async def ai_collaboration_insight(inovasi_1: int, inovasi_2: int):
         b.admin_opd AS opd_2,
         a.urusan_utama AS urusan,
         a.tahapan_inovasi AS tahap
-    FROM similarity_result s
-    JOIN data_inovasi a ON a.id = s.inovasi_id_1
-    JOIN data_inovasi b ON b.id = s.inovasi_id_2
-    WHERE s.inovasi_id_1 = :i1
-      AND s.inovasi_id_2 = :i2
+    FROM data_inovasi a
+    JOIN data_inovasi b ON b.id = :i2
+    LEFT JOIN similarity_neighbor s
+      ON s.run_id = {ACTIVE_RUN_SQL}
+     AND s.inovasi_id_1 = :lo
+     AND s.inovasi_id_2 = :hi
+    WHERE a.id = :i1
     """
 
-    data = await database.fetch_one(query, {"i1": inovasi_1, "i2": inovasi_2})
+    row = await database.fetch_one(
+        query,
+        {
+            "i1": inovasi_1,
+            "i2": inovasi_2,
+            "lo": min(inovasi_1, inovasi_2),
+            "hi": max(inovasi_1, inovasi_2),
+        },
+    )
 
-    if not data:
+    data = dict(row) if row else None
+    if data and data["similarity"] is None:
+        # Bukan top-k partner: hitung langsung dari vector cache
+        data["similarity"] = await get_pair_similarity(inovasi_1, inovasi_2)
+
+    if not data or data["similarity"] is None:
         return {"status": "empty", "message": "Data kolaborasi tidak ditemukan"}
 
     prompt = build_collaboration_prompt(
@@ -148,9 +167,10 @@ async def ai_collaboration_insight(inovasi_1: int, inovasi_2: int):
     )
 
     try:
-        ai_text = call_gemini(prompt, mode="recommendation")
-        ai_text = ai_text.strip().replace("```json", "").replace("```", "")
-        return json.loads(ai_text)
+        # Pasangan yang sama sering dibuka ulang: jawaban JSON di-cache
+        return await call_gemini_cached(
+            prompt, mode="recommendation", parse_json=True, request=request
+        )
 
     except Exception as e:
         print("AI Collaboration Error:", e)
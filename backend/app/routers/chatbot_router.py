@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from app.schemas import ChatRequest
 from app.services.chatbot_service import chatbot_answer
 
@@ -6,8 +6,9 @@ router = APIRouter(prefix="/api", tags=["Chatbot"])
 
 
 @router.post("/chatbot")
-async def chatbot(req: ChatRequest):
-    answer = await chatbot_answer(req.question)
+async def chatbot(req: ChatRequest, request: Request):
+    # request: panggilan Gemini dibatalkan kalau client putus
+    answer = await chatbot_answer(req.question, request=request)
 
     return {
         "question": req.question,
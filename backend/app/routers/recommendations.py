@@ -1,5 +1,16 @@
-from fastapi import APIRouter, Query, BackgroundTasks
-from app.services.clustering_service import run_clustering_pipeline, get_cluster_cache
+from typing import Optional
+from fastapi import APIRouter, Query
+from app.services.clustering_service import (
+    CLUSTERING_JOB_KIND,
+    run_clustering_pipeline,
+    get_cluster_cache,
+)
+from app.services.job_runner import submit_job
+from app.services.group_collaboration_service import (
+    GROUP_MAX_SIZE,
+    get_collaboration_groups,
+    select_groups,
+)
 from app.services.recommendation_service import (
     recommend_for_inovasi,
     get_top_collaboration_recommendations,
@@ -13,11 +24,26 @@ router = APIRouter(tags=["Recommendations"])
 # JALANKAN CLUSTERING (BACKGROUND)
 # ===============================
 @router.post("/run")
-async def run_pipeline(background_tasks: BackgroundTasks):
-    background_tasks.add_task(run_clustering_pipeline)
+async def run_pipeline(
+    sweep: Optional[bool] = Query(None),
+    engine: Optional[str] = Query(
+        None, pattern="^(auto|agglomerative|minibatch|two_stage)$"
+    ),
+):
+    job, created = await submit_job(
+        CLUSTERING_JOB_KIND,
+        lambda progress: run_clustering_pipeline(
+            progress=progress, sweep=sweep, engine=engine
+        ),
+    )
     return {
         "status": "processing",
-        "message": "Clustering sedang berjalan di background",
+        "message": (
+            "Clustering sedang berjalan di background"
+            if created
+            else "Clustering sudah berjalan, memakai job yang sama"
+        ),
+        "job_id": job["job_id"],
     }
 
 
@@ -61,3 +87,32 @@ async def top_collaboration_db(
         "total": len(data),
         "data": data,
     }
+
+
+# ===============================
+# GRUP KOLABORASI LINTAS OPD (2-3 INOVASI)
+# ===============================
+@router.get("/groups")
+async def collaboration_groups(
+    limit: int = Query(5, ge=1, le=20),
+    per_cluster: int = Query(2, ge=1, le=5),
+    # Grup hanya disusun sampai GROUP_MAX_SIZE anggota
+    size: Optional[int] = Query(None, ge=2, le=GROUP_MAX_SIZE),
+):
+    groups, run = await get_collaboration_groups()
+
+    if not run:
+        return {
+            "status": "empty",
+            "message": "Clustering belum dijalankan atau masih diproses",
+            "data": [],
+        }
+
+    data = select_groups(groups, limit=limit, per_cluster=per_cluster, size=size)
+    return {
+        "status": "ok",
+        "run_id": run["run_id"],
+        "computed_at": run["computed_at"].isoformat(),
+        "total": len(data),
+        "data": data,
+    }
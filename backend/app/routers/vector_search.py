@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException
+from app.schemas import VECTOR_SEARCH_MAX_BATCH, VectorSearchBatchRequest
+from app.services.embedding_provider import EmbeddingQueueFull
+from app.services.vector_search_service import vector_search_batch
+
+router = APIRouter(prefix="/api/vector-search", tags=["Vector Search"])
+
+MAX_BATCH_SIZE = VECTOR_SEARCH_MAX_BATCH  # total queries + inovasi_ids
+
+
+# ===============================
+# BATCH SEARCH (BANYAK QUERY / INOVASI SEKALIGUS)
+# ===============================
+@router.post("/batch")
+async def batch_vector_search(req: VectorSearchBatchRequest):
+    total = len(req.queries or []) + len(req.inovasi_ids or [])
+
+    if total == 0:
+        raise HTTPException(
+            status_code=400, detail="Isi minimal satu queries atau inovasi_ids"
+        )
+    if total > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maksimal {MAX_BATCH_SIZE} query per batch (diterima {total})",
+        )
+
+    try:
+        results = await vector_search_batch(
+            queries=req.queries,
+            inovasi_ids=req.inovasi_ids,
+            top_k=req.top_k,
+            min_similarity=req.min_similarity,
+            filters=req.filters,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EmbeddingQueueFull as e:
+        # Backpressure encoder: client diminta mencoba lagi
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
+
+    return {
+        "status": "ok",
+        "count": len(results),
+        "data": results,
+    }
@@ -1,5 +1,19 @@
-from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+# Batas satu request /api/vector-search/batch (queries + inovasi_ids)
+VECTOR_SEARCH_MAX_BATCH = 200
+VECTOR_SEARCH_MAX_TOP_K = 50
 
 
 class ChatRequest(BaseModel):
     question: str
+
+
+class VectorSearchBatchRequest(BaseModel):
+    queries: Optional[List[str]] = Field(None, max_length=VECTOR_SEARCH_MAX_BATCH)
+    inovasi_ids: Optional[List[int]] = Field(None, max_length=VECTOR_SEARCH_MAX_BATCH)
+    top_k: int = Field(5, ge=1, le=VECTOR_SEARCH_MAX_TOP_K)
+    min_similarity: float = Field(0.3, ge=-1.0, le=1.0)
+    filters: Optional[Dict[str, List[str]]] = None
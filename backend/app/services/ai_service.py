@@ -1,27 +1,188 @@
+"""
+Gemini Client (Async, Pooled)
+- Satu genai.Client per API key, dibuat sekali dan dipakai ulang (tidak ada
+  configure / GenerativeModel baru di setiap panggilan).
+- call_gemini_async memakai client.aio sehingga event loop tidak terblok.
+  Jumlah request bersamaan dibatasi per mode (GEMINI_CONCURRENCY_<MODE>,
+  default GEMINI_CONCURRENCY).
+- Setiap percobaan dibatasi GEMINI_TIMEOUT detik; error sementara (timeout,
+  429, 5xx, koneksi) dicoba ulang dengan exponential backoff + jitter.
+- Kalau `request` diberikan, panggilan dibatalkan begitu client HTTP putus.
+
+call_gemini (sync) tetap ada untuk script / kode non-async.
+"""
+
 import os
-import google.generativeai as genai
+import random
+import asyncio
+import httpx
+from google import genai
+from google.genai import errors
 from dotenv import load_dotenv
+from typing import Dict, Optional
 
 load_dotenv()
 
 MODEL_NAME = "models/gemini-2.5-flash-lite"
 
+# ===============================
+# CONFIG
+# ===============================
+MODE_API_KEYS = {
+    "insight": "GEMINI_INSIGHT_API_KEY",
+    "recommendation": "TOP_REKOMENDASI_API_KEY",
+    "collaboration": "GEMINI_COLLAB_API_KEY",
+    "chatbot": "GEMINI_CHATBOT_API_KEY",
+}
+DEFAULT_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+DISCONNECT_POLL_SECONDS = 0.5
 
-def call_gemini(prompt: str, mode: str) -> str:
-    if mode == "insight":
-        api_key = os.getenv("GEMINI_INSIGHT_API_KEY")
-    elif mode == "recommendation":
-        api_key = os.getenv("TOP_REKOMENDASI_API_KEY")
-    elif mode == "collaboration":
-        api_key = os.getenv("GEMINI_COLLAB_API_KEY")
-    elif mode == "chatbot":
-        api_key = os.getenv("GEMINI_CHATBOT_API_KEY")
-    else:
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_clients: Dict[str, genai.Client] = {}  # api_key -> client
+_semaphores: Dict[str, asyncio.Semaphore] = {}  # mode -> limit
+
+
+class ClientDisconnected(Exception):
+    """Client HTTP putus sebelum jawaban Gemini selesai."""
+
+
+# ===============================
+# POOL
+# ===============================
+def _api_key(mode: str) -> Optional[str]:
+    if mode not in MODE_API_KEYS:
         raise ValueError("Mode Gemini tidak dikenali")
+    return os.getenv(MODE_API_KEYS[mode])
+
+
+def get_client(mode: str) -> genai.Client:
+    api_key = _api_key(mode)
+    client = _clients.get(api_key)
+    if client is None:
+        client = _clients[api_key] = genai.Client(api_key=api_key)
+    return client
+
+
+def _semaphore(mode: str) -> asyncio.Semaphore:
+    if mode not in _semaphores:
+        limit = int(
+            os.getenv(f"GEMINI_CONCURRENCY_{mode.upper()}", str(DEFAULT_CONCURRENCY))
+        )
+        _semaphores[mode] = asyncio.Semaphore(max(1, limit))
+    return _semaphores[mode]
+
+
+async def close_gemini_clients():
+    """Tutup koneksi HTTP semua client (dipanggil saat shutdown)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aio.aclose()
+            client.close()
+        except Exception as e:
+            print(f"⚠️ Failed to close Gemini client: {e}")
+
+
+# ===============================
+# CALL
+# ===============================
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    return isinstance(error, errors.APIError) and error.code in RETRYABLE_STATUS
 
-    genai.configure(api_key=api_key)
 
-    model = genai.GenerativeModel(MODEL_NAME)
-    response = model.generate_content(prompt)
+def _backoff(attempt: int) -> float:
+    # Full jitter: 0 .. base * 2^attempt (maks. GEMINI_BACKOFF_MAX)
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2**attempt))
 
+
+async def _generate(prompt: str, mode: str, timeout: float) -> str:
+    client = get_client(mode)
+    attempt = 0
+
+    async with _semaphore(mode):
+        while True:
+            try:
+                response = await asyncio.wait_for(
+                    client.aio.models.generate_content(
+                        model=MODEL_NAME, contents=prompt
+                    ),
+                    timeout,
+                )
+                return response.text
+
+            except Exception as e:
+                if attempt >= GEMINI_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _backoff(attempt)
+                attempt += 1
+                print(
+                    f"🔁 Gemini {mode} retry {attempt}/{GEMINI_MAX_RETRIES} "
+                    f"in {delay:.1f}s ({type(e).__name__}: {e})"
+                )
+                await asyncio.sleep(delay)
+
+
+async def _wait_for_disconnect(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def run_until_disconnected(awaitable, request, label: str = "Gemini"):
+    """
+    Tunggu awaitable; kalau client HTTP `request` putus lebih dulu,
+    awaitable di-cancel dan ClientDisconnected dilempar.
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Juga saat handler ini sendiri di-cancel
+        for pending in (task, watcher):
+            if not pending.done():
+                pending.cancel()
+        await asyncio.gather(task, watcher, return_exceptions=True)
+
+    if task.cancelled():
+        print(f"🔌 Client disconnected, {label} call cancelled")
+        raise ClientDisconnected()
+    return task.result()
+
+
+async def call_gemini_async(
+    prompt: str,
+    mode: str,
+    request=None,
+    timeout: Optional[float] = None,
+) -> str:
+    """
+    Panggil Gemini tanpa memblok event loop.
+
+    Args:
+        request: starlette Request; kalau client putus, panggilan dibatalkan
+        timeout: batas per percobaan (default GEMINI_TIMEOUT)
+
+    Raises:
+        ValueError: mode tidak dikenal
+        ClientDisconnected: client HTTP putus sebelum jawaban selesai
+    """
+    call = _generate(prompt, mode, timeout or GEMINI_TIMEOUT)
+    if request is None:
+        return await call
+    return await run_until_disconnected(call, request, f"Gemini {mode}")
+
+
+def call_gemini(prompt: str, mode: str) -> str:
+    """Versi sync (memakai client yang sama). Jangan dipanggil dari route async."""
+    response = get_client(mode).models.generate_content(
+        model=MODEL_NAME, contents=prompt
+    )
     return response.text
@@ -0,0 +1,94 @@
+"""
+Bulk Writer untuk Hasil Clustering
+Menulis baris hasil (clustering_result, similarity_neighbor, ...) ke beberapa
+tabel dalam satu transaksi.
+
+- Postgres: baris di-stream dengan COPY (asyncpg copy_records_to_table).
+- Database lain (SQLite lokal): INSERT multi-row per batch.
+
+Baris ditulis di bawah run_id baru, jadi belum terlihat reader sampai run
+tersebut diaktifkan (lihat clustering_runs).
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.database import database
+
+# Batas parameter per statement untuk fallback (SQLite lama: 999)
+FALLBACK_MAX_PARAMS = 900
+
+TableRows = Tuple[Sequence[str], List[tuple]]
+Statement = Tuple[str, Optional[Dict]]
+
+
+def _is_postgres() -> bool:
+    return database.url.dialect in ("postgresql", "postgres")
+
+
+async def insert_tables(
+    tables: Dict[str, TableRows], before: Sequence[Statement] = ()
+) -> Dict[str, int]:
+    """
+    Tulis baris ke setiap tabel dalam satu transaksi.
+
+    Args:
+        tables: {nama_tabel: (kolom, list tuple baris sesuai urutan kolom)}
+        before: (sql, values) yang dijalankan lebih dulu dalam transaksi yang
+            sama (mis. DELETE baris lama yang digantikan)
+
+    Returns:
+        Jumlah baris yang ditulis per tabel
+    """
+    start = time.perf_counter()
+
+    if _is_postgres():
+        await _insert_with_copy(tables, before)
+    else:
+        await _insert_batched(tables, before)
+
+    counts = {table: len(rows) for table, (_, rows) in tables.items()}
+    print(
+        f"💾 Bulk write {counts} in {time.perf_counter() - start:.2f}s "
+        f"({'copy' if _is_postgres() else 'insert'})"
+    )
+    return counts
+
+
+async def _insert_with_copy(tables: Dict[str, TableRows], before: Sequence[Statement]):
+    async with database.connection() as connection:
+        raw = connection.raw_connection  # asyncpg.Connection
+
+        async with raw.transaction():
+            for query, values in before:
+                await connection.execute(query, values)
+            for table, (columns, rows) in tables.items():
+                if rows:
+                    await raw.copy_records_to_table(
+                        table, records=rows, columns=list(columns)
+                    )
+
+
+async def _insert_batched(tables: Dict[str, TableRows], before: Sequence[Statement]):
+    async with database.transaction():
+        for query, values in before:
+            await database.execute(query, values)
+        for table, (columns, rows) in tables.items():
+            batch_size = max(1, FALLBACK_MAX_PARAMS // len(columns))
+            for offset in range(0, len(rows), batch_size):
+                batch = rows[offset : offset + batch_size]
+
+                placeholders = []
+                values = {}
+                for i, row in enumerate(batch):
+                    names = [f"{column}_{i}" for column in columns]
+                    placeholders.append(
+                        "(" + ", ".join(f":{name}" for name in names) + ")"
+                    )
+                    values.update(zip(names, row))
+
+                await database.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES {', '.join(placeholders)}",
+                    values,
+                )
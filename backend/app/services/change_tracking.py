@@ -0,0 +1,274 @@
+"""
+Change Tracking data_inovasi
+data_inovasi ditulis dari luar backend (dashboard / Supabase), jadi perubahan
+dicatat oleh trigger database ke inovasi_change_log: satu baris per
+INSERT / UPDATE (kolom yang dipakai search & clustering) / DELETE.
+
+Setiap stage downstream menyimpan watermark (change_id terakhir yang sudah
+diproses) di pipeline_watermark, lalu hanya memproses id yang berubah
+sesudahnya (lihat changes_since_watermark).
+
+Kalau trigger gagal dipasang (mis. user database tidak punya hak), tracking
+dianggap tidak tersedia dan pemanggil kembali ke cara lama (scan penuh).
+Transaksi penulis yang sangat lama bisa commit change_id lebih kecil dari
+watermark yang sudah maju; clustering penuh (scan semua data) menutup celah
+itu.
+"""
+
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from app.database import database
+
+# ===============================
+# CONFIG
+# ===============================
+TRACKED_COLUMNS = (
+    "id",
+    "judul_inovasi",
+    "urusan_utama",
+    "tahapan_inovasi",
+    "label_kematangan",
+    "admin_opd",
+    "bentuk_inovasi",
+    "jenis",
+)
+ID_CHUNK_SIZE = 400  # id per statement IN (...)
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS inovasi_change_log (
+        change_id BIGSERIAL PRIMARY KEY,
+        inovasi_id BIGINT NOT NULL,
+        op CHAR(1) NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+    # Update yang mengganti id dicatat sebagai delete id lama + update id baru
+    """
+    CREATE OR REPLACE FUNCTION log_inovasi_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.id <> NEW.id) THEN
+            INSERT INTO inovasi_change_log (inovasi_id, op) VALUES (OLD.id, 'D');
+        END IF;
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+        INSERT INTO inovasi_change_log (inovasi_id, op)
+        VALUES (NEW.id, LEFT(TG_OP, 1));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE TRIGGER trg_inovasi_change_log
+    AFTER INSERT OR UPDATE OF {", ".join(TRACKED_COLUMNS)} OR DELETE
+    ON data_inovasi
+    FOR EACH ROW EXECUTE FUNCTION log_inovasi_change()
+    """,
+]
+
+SQLITE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS inovasi_change_log (
+        change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        inovasi_id BIGINT NOT NULL,
+        op CHAR(1) NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_inovasi_change_insert
+    AFTER INSERT ON data_inovasi
+    BEGIN
+        INSERT INTO inovasi_change_log (inovasi_id, op) VALUES (NEW.id, 'I');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_inovasi_change_update
+    AFTER UPDATE OF {", ".join(TRACKED_COLUMNS)} ON data_inovasi
+    BEGIN
+        INSERT INTO inovasi_change_log (inovasi_id, op)
+        SELECT OLD.id, 'D' WHERE OLD.id <> NEW.id;
+        INSERT INTO inovasi_change_log (inovasi_id, op) VALUES (NEW.id, 'U');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_inovasi_change_delete
+    AFTER DELETE ON data_inovasi
+    BEGIN
+        INSERT INTO inovasi_change_log (inovasi_id, op) VALUES (OLD.id, 'D');
+    END
+    """,
+]
+
+_tracking_ready = False
+
+
+class ChangeSet(NamedTuple):
+    """
+    Perubahan data_inovasi pada (since, upto].
+    since None = stage belum punya watermark, pemanggil perlu scan penuh
+    sekali (hasilnya menjadi baseline di upto).
+    """
+
+    since: Optional[int]
+    upto: int
+    upserted: List[int]  # id baru / berubah (cek ulang ke data_inovasi)
+    deleted: List[int]
+
+    @property
+    def complete(self) -> bool:
+        return self.since is not None
+
+    @property
+    def empty(self) -> bool:
+        return self.complete and not self.upserted and not self.deleted
+
+
+# ===============================
+# INSTALL (DIPANGGIL run_migrations)
+# ===============================
+def _is_postgres() -> bool:
+    return database.url.dialect in ("postgresql", "postgres")
+
+
+async def install_change_tracking():
+    global _tracking_ready
+
+    if _is_postgres():
+        await database.execute(POSTGRES_DDL[0])
+        exists = await database.fetch_val(
+            """
+            SELECT COUNT(*) FROM pg_trigger
+            WHERE tgname = 'trg_inovasi_change_log' AND NOT tgisinternal
+            """
+        )
+        if not exists:
+            for statement in POSTGRES_DDL[1:]:
+                await database.execute(statement)
+            print("🧱 Installed data_inovasi change-log trigger")
+    else:
+        for statement in SQLITE_DDL:
+            await database.execute(statement)
+
+    _tracking_ready = True
+
+
+def is_tracking_ready() -> bool:
+    return _tracking_ready
+
+
+# ===============================
+# QUERY
+# ===============================
+async def latest_change_id() -> Optional[int]:
+    """change_id terakhir di log, None kalau tracking tidak tersedia."""
+    if not _tracking_ready:
+        return None
+    return int(
+        await database.fetch_val(
+            "SELECT COALESCE(MAX(change_id), 0) FROM inovasi_change_log"
+        )
+    )
+
+
+async def get_watermark(stage: str) -> Optional[int]:
+    value = await database.fetch_val(
+        "SELECT change_id FROM pipeline_watermark WHERE stage = :stage",
+        {"stage": stage},
+    )
+    return int(value) if value is not None else None
+
+
+async def set_watermark(stage: str, change_id: Optional[int]):
+    """Tandai perubahan sampai change_id sudah diproses stage ini."""
+    if change_id is None:
+        return
+
+    async with database.transaction():
+        exists = await database.fetch_val(
+            "SELECT COUNT(*) FROM pipeline_watermark WHERE stage = :stage",
+            {"stage": stage},
+        )
+        values = {"stage": stage, "change_id": change_id, "ts": datetime.utcnow()}
+        if exists:
+            await database.execute(
+                """
+                UPDATE pipeline_watermark
+                SET change_id = :change_id, updated_at = :ts
+                WHERE stage = :stage
+                """,
+                values,
+            )
+        else:
+            await database.execute(
+                """
+                INSERT INTO pipeline_watermark (stage, change_id, updated_at)
+                VALUES (:stage, :change_id, :ts)
+                """,
+                values,
+            )
+
+    await prune_change_log()
+
+
+async def changes_since(since: Optional[int], upto: int) -> ChangeSet:
+    """
+    Id yang berubah pada (since, upto]. Beberapa perubahan pada id yang sama
+    diringkas ke operasi terakhirnya.
+    """
+    if since is None:
+        return ChangeSet(None, upto, [], [])
+
+    rows = await database.fetch_all(
+        """
+        SELECT inovasi_id, op FROM inovasi_change_log
+        WHERE change_id > :since AND change_id <= :upto
+        ORDER BY change_id
+        """,
+        {"since": since, "upto": upto},
+    )
+
+    last_op: Dict[int, str] = {}
+    for row in rows:
+        last_op[int(row["inovasi_id"])] = row["op"]
+
+    return ChangeSet(
+        since,
+        upto,
+        sorted(i for i, op in last_op.items() if op != "D"),
+        sorted(i for i, op in last_op.items() if op == "D"),
+    )
+
+
+def id_chunks(ids: Sequence[int]):
+    """(placeholder, values) per potongan id, di bawah batas parameter SQL."""
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        chunk = ids[start : start + ID_CHUNK_SIZE]
+        yield (
+            ", ".join(f":id{i}" for i in range(len(chunk))),
+            {f"id{i}": int(inovasi_id) for i, inovasi_id in enumerate(chunk)},
+        )
+
+
+async def changes_since_watermark(stage: str) -> Optional[ChangeSet]:
+    """Perubahan sejak watermark stage, None kalau tracking tidak tersedia."""
+    upto = await latest_change_id()
+    if upto is None:
+        return None
+    return await changes_since(await get_watermark(stage), upto)
+
+
+async def prune_change_log():
+    """
+    Buang log yang sudah diproses semua stage. Baris terakhir selalu
+    disisakan supaya latest_change_id tidak mundur.
+    """
+    await database.execute(
+        """
+        DELETE FROM inovasi_change_log
+        WHERE change_id <= (SELECT MIN(change_id) FROM pipeline_watermark)
+          AND change_id < (SELECT MAX(change_id) FROM inovasi_change_log)
+        """
+    )
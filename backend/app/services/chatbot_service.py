@@ -5,8 +5,9 @@ IMPROVED: Friendly and natural conversation style for general users
 IMPROVED: Complete data field extraction from database
 """
 
-from app.services.ai_service import call_gemini
+from app.services.llm_cache import call_gemini_cached
 from app.database import database
+from app.services.clustering_runs import ACTIVE_RUN_SQL
 from app.services.vector_search_service import (
     hybrid_search_inovasi,
     vector_search_collaboration,
@@ -115,7 +116,7 @@ async def get_collaboration_data(
     inovasi_id: Optional[int] = None, limit: int = 3
 ) -> List[Dict]:
     """
-    Ambil data kolaborasi dari similarity_result.
+    Ambil data kolaborasi dari similarity_neighbor (top-k partner per inovasi).
     Jika inovasi_id ada, cari kolaborasi untuk inovasi tersebut.
     Jika tidak, ambil top kolaborasi.
     """
@@ -125,7 +126,7 @@ async def get_collaboration_data(
             return []
 
         if inovasi_id:
-            query = """
+            query = f"""
             SELECT 
                 s.similarity,
                 a.judul_inovasi AS inovasi_1,
@@ -134,10 +135,11 @@ async def get_collaboration_data(
                 b.admin_opd AS opd_2,
                 a.urusan_utama AS urusan,
                 s.cluster_id
-            FROM similarity_result s
+            FROM similarity_neighbor s
             JOIN data_inovasi a ON a.id = s.inovasi_id_1
             JOIN data_inovasi b ON b.id = s.inovasi_id_2
-            WHERE s.inovasi_id_1 = :id OR s.inovasi_id_2 = :id
+            WHERE s.run_id = {ACTIVE_RUN_SQL}
+              AND (s.inovasi_id_1 = :id OR s.inovasi_id_2 = :id)
             ORDER BY s.similarity DESC
             LIMIT :limit
             """
@@ -176,7 +178,7 @@ async def get_collaboration_data(
 
             return []
         else:
-            query = """
+            query = f"""
             SELECT 
                 s.similarity,
                 a.judul_inovasi AS inovasi_1,
@@ -185,10 +187,11 @@ async def get_collaboration_data(
                 b.admin_opd AS opd_2,
                 a.urusan_utama AS urusan,
                 s.cluster_id
-            FROM similarity_result s
+            FROM similarity_neighbor s
             JOIN data_inovasi a ON a.id = s.inovasi_id_1
             JOIN data_inovasi b ON b.id = s.inovasi_id_2
-            WHERE a.admin_opd != b.admin_opd
+            WHERE s.run_id = {ACTIVE_RUN_SQL}
+              AND a.admin_opd != b.admin_opd
             ORDER BY s.similarity DESC
             LIMIT :limit
             """
@@ -253,7 +256,7 @@ async def get_cached_dashboard_insight() -> Optional[str]:
 
 
 # MAIN CHATBOT FUNCTION
-async def chatbot_answer(question: str) -> str:
+async def chatbot_answer(question: str, request=None) -> str:
     """
     Main chatbot logic dengan strategi pencarian bertingkat:
     IMPROVED: Multi-stage search with vector fallback
@@ -386,7 +389,7 @@ async def chatbot_answer(question: str) -> str:
 
         # Step 6: Call AI
         try:
-            answer = call_gemini(prompt, mode="chatbot")
+            answer = await call_gemini_cached(prompt, mode="chatbot", request=request)
             return answer.strip()
         except Exception as e:
             print(f"❌ Chatbot AI Error: {e}")
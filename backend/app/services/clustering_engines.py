@@ -0,0 +1,163 @@
+"""
+Clustering Engine untuk Katalog Besar
+AgglomerativeClustering pada seluruh embedding butuh memori O(n^2) (matriks
+jarak) dan waktu O(n^2)..O(n^3); di atas puluhan ribu inovasi tidak muat.
+Engine di sini di-fit bertahap per chunk embedding (partial_fit) selama
+pipeline streaming data_inovasi, memori model tetap kecil:
+
+- minibatch : MiniBatchKMeans langsung dengan k cluster.
+- two_stage : MiniBatchKMeans ke CLUSTER_PRECLUSTERS pre-cluster, lalu
+              AgglomerativeClustering (ward) pada centroid pre-cluster yang
+              terisi, diulang sebanding jumlah anggotanya (weighted ward,
+              maks. CLUSTER_WARD_SAMPLE titik). Bentuk cluster tetap mirip
+              agglomerative.
+
+CLUSTER_ENGINE=auto memakai agglomerative sampai CLUSTER_AGGLOMERATIVE_MAX_ROWS
+baris, di atas itu two_stage. Angka memori / waktu: README "Clustering at
+Scale" dan benchmarks/bench_clustering_engines.py.
+"""
+
+import os
+import numpy as np
+from typing import List, Optional
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+
+# ===============================
+# CONFIG
+# ===============================
+# agglomerative | minibatch | two_stage | auto
+CLUSTER_ENGINE = os.getenv("CLUSTER_ENGINE", "auto").lower()
+AGGLOMERATIVE_MAX_ROWS = int(os.getenv("CLUSTER_AGGLOMERATIVE_MAX_ROWS", "20000"))
+ENGINE_CHUNK_SIZE = int(os.getenv("CLUSTER_ENGINE_CHUNK_SIZE", "4096"))
+PRECLUSTERS = int(os.getenv("CLUSTER_PRECLUSTERS", "256"))
+# Jumlah titik (centroid berulang) untuk ward di stage 2
+WARD_SAMPLE = int(os.getenv("CLUSTER_WARD_SAMPLE", "4096"))
+ENGINE_SEED = 42
+
+ENGINES = ("agglomerative", "minibatch", "two_stage")
+
+
+def resolve_engine(engine: Optional[str], total_rows: Optional[int]) -> str:
+    """
+    Nama engine final. auto butuh total_rows; tanpa itu dianggap kecil.
+
+    Raises:
+        ValueError: kalau nama engine tidak dikenal
+    """
+    engine = (engine or CLUSTER_ENGINE).lower()
+    if engine == "auto":
+        return (
+            "two_stage"
+            if total_rows and total_rows > AGGLOMERATIVE_MAX_ROWS
+            else "agglomerative"
+        )
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown clustering engine: {engine}")
+    return engine
+
+
+# ===============================
+# STREAMING ENGINE
+# ===============================
+class StreamingClusterer:
+    """
+    partial_fit(chunk) dipanggil per batch embedding (urutan bebas ukuran),
+    lalu fit_labels(embeddings, k) sekali di akhir. Chunk dikumpulkan sampai
+    ENGINE_CHUNK_SIZE baris sebelum diteruskan ke MiniBatchKMeans.
+    """
+
+    def __init__(self, engine: str, k_clusters: int, chunk_size: int = ENGINE_CHUNK_SIZE):
+        if engine not in ("minibatch", "two_stage"):
+            raise ValueError(f"Engine {engine} tidak mendukung streaming")
+        self.engine = engine
+        self.k_clusters = k_clusters
+        self.chunk_size = chunk_size
+        self.model: Optional[MiniBatchKMeans] = None
+        self.rows_seen = 0
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._used_preclusters = 0
+
+    def _new_model(self, n_clusters: int) -> MiniBatchKMeans:
+        return MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=self.chunk_size,
+            n_init=3,
+            random_state=ENGINE_SEED,
+        )
+
+    def _flush(self, final_k: Optional[int] = None):
+        if not self._buffered:
+            return
+        chunk = np.vstack(self._buffer).astype(np.float32, copy=False)
+        self._buffer, self._buffered = [], 0
+
+        if self.model is None:
+            if self.engine == "two_stage":
+                n_clusters = min(PRECLUSTERS, len(chunk))
+            else:
+                # Data lebih kecil dari satu chunk: pakai k final
+                n_clusters = min(final_k or self.k_clusters, len(chunk))
+            self.model = self._new_model(n_clusters)
+
+        self.model.partial_fit(chunk)
+
+    def partial_fit(self, chunk: np.ndarray):
+        self._buffer.append(chunk)
+        self._buffered += len(chunk)
+        self.rows_seen += len(chunk)
+        if self._buffered >= self.chunk_size:
+            self._flush()
+
+    def _predict(self, embeddings: np.ndarray) -> np.ndarray:
+        # Per chunk supaya matriks jarak sementara tetap chunk x centroid
+        return np.concatenate(
+            [
+                self.model.predict(
+                    np.asarray(embeddings[start : start + self.chunk_size], dtype=np.float32)
+                )
+                for start in range(0, len(embeddings), self.chunk_size)
+            ]
+        )
+
+    def fit_labels(self, embeddings: np.ndarray, k: int) -> np.ndarray:
+        """Label final (0..k-1) untuk embeddings, urutan sama dengan partial_fit."""
+        self._flush(final_k=k)
+        if self.model is None:
+            raise ValueError("Belum ada embedding yang di-fit")
+
+        labels = self._predict(embeddings)
+        if self.engine == "minibatch":
+            return labels
+
+        # Stage 2: agglomerate centroid pre-cluster yang punya anggota
+        used = np.unique(labels)
+        self._used_preclusters = len(used)
+        if len(used) <= k:
+            remap = np.zeros(self.model.n_clusters, dtype=np.int64)
+            remap[used] = np.arange(len(used))
+            return remap[labels]
+
+        # Ward pada centroid polos memperlakukan pre-cluster 5 anggota sama
+        # dengan yang 5.000 anggota -> satu cluster raksasa + k-1 cluster
+        # kecil. Setiap centroid diulang sebanding jumlah anggotanya (min. 1)
+        # supaya biaya merge ward memperhitungkan ukuran pre-cluster.
+        counts = np.bincount(labels, minlength=self.model.n_clusters)[used]
+        repeats = np.maximum(1, np.round(counts * WARD_SAMPLE / counts.sum())).astype(
+            np.int64
+        )
+        sample_labels = AgglomerativeClustering(n_clusters=k).fit_predict(
+            np.repeat(self.model.cluster_centers_[used], repeats, axis=0)
+        )
+
+        # Salinan centroid identik (jarak 0) selalu digabung lebih dulu,
+        # jadi label salinan pertama mewakili pre-cluster tersebut
+        first = np.concatenate([[0], np.cumsum(repeats)[:-1]])
+        remap = np.zeros(self.model.n_clusters, dtype=np.int64)
+        remap[used] = sample_labels[first]
+        return remap[labels]
+
+    def model_name(self, k: int) -> str:
+        if self.engine == "minibatch":
+            return f"MiniBatchKMeans_k={k}"
+        return f"TwoStage_pre={self._used_preclusters}_k={k}"
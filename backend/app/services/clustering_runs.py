@@ -0,0 +1,265 @@
+"""
+Clustering Runs (Versioning)
+Setiap eksekusi pipeline clustering menulis hasilnya di bawah run_id baru.
+Setelah semua baris tertulis, pointer run aktif dipindah dalam satu
+transaksi, jadi reader (dashboard, chatbot, rekomendasi) selalu melihat
+hasil run lama yang utuh atau run baru yang utuh, tidak pernah tabel kosong.
+
+Run lama disimpan sebanyak CLUSTERING_RUNS_KEEP (termasuk yang aktif) untuk
+rollback, sisanya dibuang.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.database import database
+
+# ===============================
+# CONFIG
+# ===============================
+RUNS_KEEP = int(os.getenv("CLUSTERING_RUNS_KEEP", "3"))
+# Run 'building' milik proses lain baru boleh dibuang setelah selama ini
+BUILDING_STALE_SECONDS = int(os.getenv("CLUSTERING_BUILDING_STALE_SECONDS", "21600"))
+RUN_TABLES = ("clustering_result", "similarity_neighbor", "similarity_result")
+LEGACY_RUN_ID = 0  # hasil lama sebelum ada versioning
+
+# Subquery run aktif untuk dipakai di query reader:
+#   WHERE s.run_id = {ACTIVE_RUN_SQL}
+ACTIVE_RUN_SQL = "(SELECT run_id FROM clustering_run WHERE is_active)"
+
+
+def new_run_id() -> int:
+    return int(time.time() * 1000)
+
+
+# ===============================
+# LIFECYCLE
+# ===============================
+async def create_run(run_id: int, model_name: Optional[str] = None):
+    await database.execute(
+        """
+        INSERT INTO clustering_run (run_id, status, is_active, model_name, created_at)
+        VALUES (:id, 'building', FALSE, :model, :ts)
+        """,
+        {"id": run_id, "model": model_name, "ts": datetime.utcnow()},
+    )
+
+
+async def _swap_active(
+    run_id: int, allowed_status: str, total_data: Optional[int] = None
+) -> bool:
+    async with database.transaction():
+        run = await database.fetch_one(
+            "SELECT status FROM clustering_run WHERE run_id = :id", {"id": run_id}
+        )
+        if not run or run["status"] != allowed_status:
+            return False
+
+        await database.execute(
+            """
+            UPDATE clustering_run
+            SET status = 'ready',
+                total_data = COALESCE(:total, total_data),
+                activated_at = :ts
+            WHERE run_id = :id
+            """,
+            {"id": run_id, "total": total_data, "ts": datetime.utcnow()},
+        )
+        await database.execute(
+            "UPDATE clustering_run SET is_active = (run_id = :id)", {"id": run_id}
+        )
+
+    print(f"🔀 Clustering run {run_id} is now active")
+    return True
+
+
+async def promote_run(run_id: int, total_data: Optional[int] = None) -> bool:
+    """
+    Dipanggil pipeline setelah semua baris run-nya sendiri tertulis:
+    run 'building' -> 'ready' + aktif dalam satu transaksi.
+    """
+    return await _swap_active(run_id, "building", total_data)
+
+
+async def activate_run(run_id: int) -> bool:
+    """
+    Rollback / pindah ke run lama yang masih disimpan. Hanya run 'ready'
+    (run 'building' bisa saja masih ditulis proses lain).
+    False kalau run tidak ada / belum siap / gagal.
+    """
+    return await _swap_active(run_id, "ready")
+
+
+async def record_incremental(
+    run_id: int, added_rows: int, needs_recluster: bool, removed_rows: int = 0
+):
+    """Catat baris yang di-assign / dibuang incremental di run (tanpa re-cluster)."""
+    await database.execute(
+        """
+        UPDATE clustering_run
+        SET total_data = COALESCE(total_data, 0) + :added - :removed,
+            incremental_rows = COALESCE(incremental_rows, 0) + :added,
+            needs_recluster = :flag
+        WHERE run_id = :id
+        """,
+        {
+            "id": run_id,
+            "added": added_rows,
+            "removed": removed_rows,
+            "flag": needs_recluster,
+        },
+    )
+
+
+async def fail_run(run_id: int):
+    """Tandai run gagal dan buang baris yang sempat tertulis."""
+    await database.execute(
+        "UPDATE clustering_run SET status = 'failed' WHERE run_id = :id",
+        {"id": run_id},
+    )
+    await _delete_run_rows([run_id])
+
+
+async def prune_runs(keep: int = RUNS_KEEP) -> List[int]:
+    """
+    Buang run selain run aktif + (keep - 1) run siap terbaru. Run 'building'
+    (mungkin sedang ditulis proses lain) disimpan sampai lebih tua dari
+    BUILDING_STALE_SECONDS.
+    Returns: run_id yang dibuang.
+    """
+    runs = await list_runs()
+    active = [r["run_id"] for r in runs if r["is_active"]]
+    ready = [r["run_id"] for r in runs if r["status"] == "ready" and not r["is_active"]]
+    stale_before = datetime.utcnow() - timedelta(seconds=BUILDING_STALE_SECONDS)
+    building = [
+        r["run_id"]
+        for r in runs
+        if r["status"] == "building" and _as_datetime(r["created_at"]) > stale_before
+    ]
+    kept = set(active + ready[: max(0, keep - len(active))] + building)
+
+    removed = [r["run_id"] for r in runs if r["run_id"] not in kept]
+    if removed:
+        await _delete_run_rows(removed)
+        await database.execute(
+            f"DELETE FROM clustering_run WHERE run_id IN ({_placeholders(removed)})",
+            _params(removed),
+        )
+        print(f"🧹 Pruned clustering runs: {removed}")
+
+    return removed
+
+
+def _as_datetime(value) -> datetime:
+    # SQLite mengembalikan TIMESTAMP sebagai string
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _placeholders(run_ids: List[int]) -> str:
+    return ", ".join(f":r{i}" for i in range(len(run_ids)))
+
+
+def _params(run_ids: List[int]) -> Dict:
+    return {f"r{i}": run_id for i, run_id in enumerate(run_ids)}
+
+
+async def _delete_run_rows(run_ids: List[int]):
+    for table in RUN_TABLES:
+        try:
+            await database.execute(
+                f"DELETE FROM {table} WHERE run_id IN ({_placeholders(run_ids)})",
+                _params(run_ids),
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to prune {table}: {e}")
+
+
+# ===============================
+# QUERY
+# ===============================
+async def get_active_run() -> Optional[Dict]:
+    row = await database.fetch_one(
+        "SELECT * FROM clustering_run WHERE is_active"
+    )
+    return dict(row) if row else None
+
+
+async def list_runs() -> List[Dict]:
+    rows = await database.fetch_all(
+        "SELECT * FROM clustering_run ORDER BY created_at DESC, run_id DESC"
+    )
+    return [dict(r) for r in rows]
+
+
+# ===============================
+# MIGRASI DATA LAMA
+# ===============================
+async def adopt_legacy_rows():
+    """
+    Baris hasil clustering dari sebelum ada run_id dipindah ke run 0, dan
+    run 0 diaktifkan kalau belum ada run aktif, supaya dashboard tetap
+    menampilkan hasil lama sampai clustering berikutnya selesai.
+
+    Semua pembaca memakai similarity_neighbor, jadi tabel itu diisi untuk
+    run 0 dari similarity_result lama (pasangan (id kecil, id besar), sekali).
+    """
+    legacy = await database.fetch_val(
+        "SELECT COUNT(*) FROM clustering_result WHERE run_id IS NULL"
+    )
+    if not legacy:
+        return
+
+    async with database.transaction():
+        exists = await database.fetch_val(
+            "SELECT COUNT(*) FROM clustering_run WHERE run_id = :id",
+            {"id": LEGACY_RUN_ID},
+        )
+        if not exists:
+            await database.execute(
+                """
+                INSERT INTO clustering_run
+                (run_id, status, is_active, model_name, total_data, created_at)
+                VALUES (:id, 'ready', FALSE, 'legacy', :total, :ts)
+                """,
+                {"id": LEGACY_RUN_ID, "total": legacy, "ts": datetime.utcnow()},
+            )
+
+        for table in ("clustering_result", "similarity_result"):
+            await database.execute(
+                f"UPDATE {table} SET run_id = :id WHERE run_id IS NULL",
+                {"id": LEGACY_RUN_ID},
+            )
+
+        await database.execute(
+            "DELETE FROM similarity_neighbor WHERE run_id = :id",
+            {"id": LEGACY_RUN_ID},
+        )
+        # CASE, bukan LEAST/GREATEST: juga jalan di SQLite lokal
+        await database.execute(
+            """
+            INSERT INTO similarity_neighbor
+            (run_id, inovasi_id_1, inovasi_id_2, similarity, cluster_id, scope,
+             processed_at)
+            SELECT :id, lo, hi, MAX(similarity), MIN(cluster_id), 'cluster', :ts
+            FROM (
+                SELECT
+                    CASE WHEN inovasi_id_1 < inovasi_id_2
+                         THEN inovasi_id_1 ELSE inovasi_id_2 END AS lo,
+                    CASE WHEN inovasi_id_1 < inovasi_id_2
+                         THEN inovasi_id_2 ELSE inovasi_id_1 END AS hi,
+                    similarity,
+                    cluster_id
+                FROM similarity_result
+                WHERE run_id = :source AND inovasi_id_1 <> inovasi_id_2
+            ) pairs
+            GROUP BY lo, hi
+            """,
+            {"id": LEGACY_RUN_ID, "source": LEGACY_RUN_ID, "ts": datetime.utcnow()},
+        )
+
+    if await get_active_run() is None:
+        await activate_run(LEGACY_RUN_ID)
+
+    print(f"📦 Adopted {legacy} legacy clustering rows as run {LEGACY_RUN_ID}")
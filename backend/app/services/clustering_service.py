@@ -1,17 +1,64 @@
+import os
+import time
+import asyncio
 import pandas as pd
 import numpy as np
-from itertools import combinations
-from sentence_transformers import SentenceTransformer
 from sklearn.cluster import AgglomerativeClustering
-from sklearn.metrics.pairwise import cosine_similarity
 from app.database import database
+from app.services.embedding_store import build_feature_text, embedding_store
+from app.services.embedding_provider import encode_texts_async
+from app.services.bulk_writer import insert_tables
+from app.services.clustering_runs import (
+    ACTIVE_RUN_SQL,
+    create_run,
+    fail_run,
+    get_active_run,
+    new_run_id,
+    promote_run,
+    prune_runs,
+)
+from app.services.change_tracking import (
+    changes_since_watermark,
+    latest_change_id,
+    set_watermark,
+)
+from app.services.job_runner import ProgressFn
+from app.services.model_selection import MODEL_SWEEP, select_model
+from app.services.clustering_engines import (
+    CLUSTER_ENGINE,
+    StreamingClusterer,
+    resolve_engine,
+)
+from app.services.vector_index import (
+    block_rows,
+    normalize_rows,
+    top_k_desc,
+)
 from datetime import datetime
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
 # ===============================
-# MODEL
+# CONFIG NEIGHBOUR TABLE
 # ===============================
-embedding_model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+# Top-k partner per inovasi yang disimpan ke similarity_neighbor
+NEIGHBOR_K = int(os.getenv("CLUSTER_NEIGHBOR_K", "10"))
+# cluster: partner satu cluster | all: semua | cross_opd: partner beda OPD
+NEIGHBOR_SCOPE = os.getenv("CLUSTER_NEIGHBOR_SCOPE", "cluster").lower()
+NEIGHBOR_MIN_SIMILARITY = float(os.getenv("CLUSTER_NEIGHBOR_MIN_SIMILARITY", "0.2"))
+# Ukuran batch streaming data_inovasi -> encode
+LOAD_BATCH_SIZE = int(os.getenv("CLUSTER_LOAD_BATCH_SIZE", "2000"))
+# Dump lama semua pasangan intra-cluster ke similarity_result (O(n^2))
+SAVE_ALL_PAIRS = os.getenv("SAVE_ALL_PAIRS_SIMILARITY", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Nama stage di pipeline_watermark (change_tracking)
+CLUSTERING_STAGE = "clustering"
+# Kind job_runner untuk semua clustering (startup maupun /run), supaya
+# dedupe submit_job menganggapnya satu job
+CLUSTERING_JOB_KIND = "clustering"
 
 # ===============================
 # CACHE (IN-MEMORY)
@@ -33,112 +80,135 @@ def get_cluster_cache():
 # ===============================
 # AUTO-LOAD CACHE FROM DATABASE
 # ===============================
+# Satu query: run aktif, jumlah anggota per cluster, dan pasangan teratas per
+# cluster (ROW_NUMBER per cluster_id) lengkap dengan data kedua inovasinya.
+# Pasangan yang inovasinya sudah terhapus dari data_inovasi tidak dihitung.
+CLUSTER_CACHE_SQL = """
+WITH active AS (
+    SELECT run_id, activated_at, created_at
+    FROM clustering_run
+    WHERE is_active
+),
+counts AS (
+    SELECT c.cluster_id, COUNT(*) AS jumlah
+    FROM clustering_result c
+    JOIN active r ON r.run_id = c.run_id
+    GROUP BY c.cluster_id
+),
+ranked AS (
+    SELECT
+        s.cluster_id,
+        s.inovasi_id_1,
+        s.inovasi_id_2,
+        s.similarity,
+        a.judul_inovasi AS judul_1,
+        a.urusan_utama AS urusan_1,
+        a.tahapan_inovasi AS tahap_1,
+        a.label_kematangan AS kematangan_1,
+        a.admin_opd AS opd_1,
+        b.judul_inovasi AS judul_2,
+        b.urusan_utama AS urusan_2,
+        b.tahapan_inovasi AS tahap_2,
+        b.label_kematangan AS kematangan_2,
+        b.admin_opd AS opd_2,
+        ROW_NUMBER() OVER (
+            PARTITION BY s.cluster_id
+            ORDER BY s.similarity DESC, s.inovasi_id_1, s.inovasi_id_2
+        ) AS rn
+    FROM similarity_neighbor s
+    JOIN active r ON r.run_id = s.run_id
+    JOIN data_inovasi a ON a.id = s.inovasi_id_1
+    JOIN data_inovasi b ON b.id = s.inovasi_id_2
+    WHERE s.cluster_id IS NOT NULL
+)
+SELECT
+    r.run_id,
+    r.activated_at,
+    r.created_at,
+    c.cluster_id,
+    c.jumlah,
+    p.inovasi_id_1,
+    p.inovasi_id_2,
+    p.similarity,
+    p.judul_1, p.urusan_1, p.tahap_1, p.kematangan_1, p.opd_1,
+    p.judul_2, p.urusan_2, p.tahap_2, p.kematangan_2, p.opd_2
+FROM active r
+CROSS JOIN counts c
+LEFT JOIN ranked p ON p.cluster_id = c.cluster_id AND p.rn = 1
+ORDER BY c.cluster_id
+"""
+
+# Metrik load cache terakhir (ditampilkan di /admin/cache-status)
+_cluster_cache_load_stats: Dict = {}
+
+
+def get_cluster_cache_load_stats() -> Dict:
+    return dict(_cluster_cache_load_stats)
+
+
+def _cached_insight(row, side: int) -> Dict:
+    return {
+        "id": row[f"inovasi_id_{side}"],
+        "judul": row[f"judul_{side}"],
+        "urusan": row[f"urusan_{side}"],
+        "tahap": row[f"tahap_{side}"],
+        "kematangan": row[f"kematangan_{side}"],
+        "opd": row[f"opd_{side}"],  # ✅ ADDED
+    }
+
+
 async def load_cache_from_database():
     """
     Load clustering results from database and rebuild cache.
     Called automatically on startup or manually when needed.
+
+    Semua cluster dibaca dalam satu round trip (CLUSTER_CACHE_SQL), hanya
+    dari run aktif (run yang sedang ditulis tidak ikut terbaca).
     """
+    global _cluster_insight_cache, _cluster_last_run, _cluster_cache_load_stats
+
     try:
         print("📄 Loading clustering cache from database...")
 
-        # Get last clustering timestamp
-        last_run_row = await database.fetch_one(
-            "SELECT MAX(processed_at) as last_run FROM clustering_result"
-        )
+        start = time.perf_counter()
+        rows = await database.fetch_all(CLUSTER_CACHE_SQL)
+        query_seconds = time.perf_counter() - start
 
-        if not last_run_row or not last_run_row["last_run"]:
+        if not rows:
             print("⚠️ No clustering results found in database")
             return
 
-        # Get all clustering results
-        clusters_data = await database.fetch_all(
-            """
-            SELECT DISTINCT cluster_id 
-            FROM clustering_result 
-            ORDER BY cluster_id
-            """
-        )
-
-        if not clusters_data:
-            print("⚠️ No clusters found in database")
-            return
-
-        insights = []
-
-        # For each cluster, find best pair from similarity_result
-        for cluster_row in clusters_data:
-            cluster_id = cluster_row["cluster_id"]
-
-            # ✅ OPTIMIZED: Get top similarity pair with OPD data
-            top_pair = await database.fetch_one(
-                """
-                SELECT 
-                    s.inovasi_id_1,
-                    s.inovasi_id_2,
-                    s.similarity,
-                    a.judul_inovasi as judul_1,
-                    a.urusan_utama as urusan_1,
-                    a.tahapan_inovasi as tahap_1,
-                    a.label_kematangan as kematangan_1,
-                    a.admin_opd as opd_1,
-                    b.judul_inovasi as judul_2,
-                    b.urusan_utama as urusan_2,
-                    b.tahapan_inovasi as tahap_2,
-                    b.label_kematangan as kematangan_2,
-                    b.admin_opd as opd_2
-                FROM similarity_result s
-                JOIN data_inovasi a ON a.id = s.inovasi_id_1
-                JOIN data_inovasi b ON b.id = s.inovasi_id_2
-                WHERE s.cluster_id = :cluster_id
-                ORDER BY s.similarity DESC
-                LIMIT 1
-                """,
-                {"cluster_id": cluster_id},
-            )
-
-            if not top_pair:
-                continue
-
-            # Count items in cluster
-            count = await database.fetch_val(
-                "SELECT COUNT(*) FROM clustering_result WHERE cluster_id = :cluster_id",
-                {"cluster_id": cluster_id},
-            )
-
-            # ✅ OPTIMIZED: Include OPD in cache
-            insights.append(
-                {
-                    "cluster_id": cluster_id,
-                    "skor_kolaborasi": round(top_pair["similarity"], 4),
-                    "jumlah_inovasi": count,
-                    "inovasi_1": {
-                        "id": top_pair["inovasi_id_1"],
-                        "judul": top_pair["judul_1"],
-                        "urusan": top_pair["urusan_1"],
-                        "tahap": top_pair["tahap_1"],
-                        "kematangan": top_pair["kematangan_1"],
-                        "opd": top_pair["opd_1"],  # ✅ ADDED
-                    },
-                    "inovasi_2": {
-                        "id": top_pair["inovasi_id_2"],
-                        "judul": top_pair["judul_2"],
-                        "urusan": top_pair["urusan_2"],
-                        "tahap": top_pair["tahap_2"],
-                        "kematangan": top_pair["kematangan_2"],
-                        "opd": top_pair["opd_2"],  # ✅ ADDED
-                    },
-                }
-            )
+        # Cluster tanpa pasangan (mis. anggota tunggal) tidak ditampilkan
+        insights = [
+            {
+                "cluster_id": row["cluster_id"],
+                "skor_kolaborasi": round(row["similarity"], 4),
+                "jumlah_inovasi": row["jumlah"],
+                "inovasi_1": _cached_insight(row, 1),
+                "inovasi_2": _cached_insight(row, 2),
+            }
+            for row in rows
+            if row["inovasi_id_1"] is not None
+        ]
 
         # Sort by similarity score
         insights = sorted(insights, key=lambda x: x["skor_kolaborasi"], reverse=True)
 
         # Update cache
-        global _cluster_insight_cache, _cluster_last_run
         _cluster_insight_cache = insights
-        _cluster_last_run = last_run_row["last_run"]
+        _cluster_last_run = rows[0]["activated_at"] or rows[0]["created_at"]
+        _cluster_cache_load_stats = {
+            "run_id": rows[0]["run_id"],
+            "clusters": len(insights),
+            "query_ms": round(query_seconds * 1000, 2),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+            "loaded_at": datetime.utcnow().isoformat(),
+        }
 
-        print(f"✅ Cache loaded: {len(insights)} clusters from {_cluster_last_run}")
+        print(
+            f"✅ Cache loaded: {len(insights)} clusters from {_cluster_last_run} "
+            f"({_cluster_cache_load_stats['total_ms']} ms)"
+        )
 
     except Exception as e:
         print(f"❌ Error loading cache from database: {e}")
@@ -150,40 +220,83 @@ async def load_cache_from_database():
 # ===============================
 # AUTO-DETECT NEW DATA & TRIGGER CLUSTERING
 # ===============================
-async def check_and_auto_run_clustering(threshold: int = 50):
+async def check_and_auto_run_clustering(
+    threshold: int = 50, progress: Optional[ProgressFn] = None
+):
     """
     Check if there are new data that haven't been clustered.
-    Auto-run clustering if new data >= threshold.
+
+    Data baru / berubah / terhapus dibaca dari change log sejak watermark
+    clustering (change_tracking), tanpa COUNT(*) kedua tabel.
+
+    Mode incremental (default, CLUSTER_INCREMENTAL): hanya id yang berubah
+    yang di-assign ulang ke centroid cluster run aktif; clustering penuh
+    hanya jalan kalau drift melewati batas. Tanpa run aktif / mode
+    incremental mati, clustering penuh jalan kalau perubahan >= threshold.
 
     Args:
         threshold: Minimum new data count to trigger clustering (default: 50)
+        progress: callback progress job (diteruskan ke clustering penuh)
     """
+    from app.services.incremental_clustering import (
+        INCREMENTAL_ENABLED,
+        run_incremental_assignment,
+    )
+
     try:
+        # None = change log tidak tersedia (fallback COUNT / scan penuh)
+        changes = await changes_since_watermark(CLUSTERING_STAGE)
+
+        if changes is not None and changes.empty:
+            print("✅ No data changes since last clustering")
+            return False
+
+        if INCREMENTAL_ENABLED and await get_active_run() is not None:
+            print("🔍 Checking for new data (incremental)...")
+            result = await run_incremental_assignment(changes)
+
+            if not result["needs_full_recluster"]:
+                if changes is not None:
+                    await set_watermark(CLUSTERING_STAGE, changes.upto)
+                return result["status"] == "ok"
+
+            print("🚀 AUTO-TRIGGERING full clustering (cluster drift over threshold)")
+            result = await run_clustering_pipeline(progress=progress)
+            print(f"✅ Auto-clustering completed: {result}")
+            return True
+
         print(f"🔍 Checking for new data (threshold: {threshold})...")
 
-        # Get total current data
-        total_data = await database.fetch_val(
-            "SELECT COUNT(*) FROM data_inovasi WHERE judul_inovasi IS NOT NULL"
-        )
+        if changes is not None and changes.complete:
+            new_data_count = len(changes.upserted) + len(changes.deleted)
+            print(
+                f"📊 Changed since last clustering: +{len(changes.upserted)} "
+                f"upserted, -{len(changes.deleted)} deleted"
+            )
+        else:
+            # Get total current data
+            total_data = await database.fetch_val(
+                "SELECT COUNT(*) FROM data_inovasi WHERE judul_inovasi IS NOT NULL"
+            )
 
-        # Get total data in last clustering
-        clustered_data = await database.fetch_val(
-            "SELECT COUNT(*) FROM clustering_result"
-        )
+            # Get total data in last clustering (run aktif)
+            clustered_data = await database.fetch_val(
+                f"SELECT COUNT(*) FROM clustering_result WHERE run_id = {ACTIVE_RUN_SQL}"
+            )
 
-        if clustered_data is None:
-            clustered_data = 0
+            if clustered_data is None:
+                clustered_data = 0
 
-        new_data_count = total_data - clustered_data
+            new_data_count = total_data - clustered_data
 
-        print(
-            f"📊 Total data: {total_data}, Clustered: {clustered_data}, New: {new_data_count}"
-        )
+            print(
+                f"📊 Total data: {total_data}, Clustered: {clustered_data}, New: {new_data_count}"
+            )
 
         # Check if need to run clustering
         if new_data_count >= threshold:
             print(f"🚀 AUTO-TRIGGERING clustering ({new_data_count} new data detected)")
-            result = await run_clustering_pipeline()
+            result = await run_clustering_pipeline(progress=progress)
             print(f"✅ Auto-clustering completed: {result}")
             return True
         else:
@@ -199,11 +312,23 @@ async def check_and_auto_run_clustering(threshold: int = 50):
 
 
 # ===============================
-# LOAD DATA (BATCHED) - ✅ WITH OPD
+# LOAD DATA (KEYSET STREAMING) - ✅ WITH OPD
 # ===============================
-async def load_data_inovasi(batch_size=50, offset=0) -> pd.DataFrame:
+async def load_data_inovasi(
+    batch_size: int = LOAD_BATCH_SIZE, after_id: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Satu batch data_inovasi dengan id > after_id (keyset pagination):
+    setiap batch langsung mulai dari index id, tanpa memindai ulang
+    baris sebelumnya seperti OFFSET.
+    """
+    after_clause = "AND id > :after_id" if after_id is not None else ""
+    values = {"limit": batch_size}
+    if after_id is not None:
+        values["after_id"] = after_id
+
     rows = await database.fetch_all(
-        """
+        f"""
         SELECT
             id,
             judul_inovasi,
@@ -212,11 +337,11 @@ async def load_data_inovasi(batch_size=50, offset=0) -> pd.DataFrame:
             label_kematangan,
             admin_opd
         FROM data_inovasi
-        WHERE judul_inovasi IS NOT NULL
+        WHERE judul_inovasi IS NOT NULL {after_clause}
         ORDER BY id
-        LIMIT :limit OFFSET :offset
+        LIMIT :limit
         """,
-        {"limit": batch_size, "offset": offset},
+        values,
     )
 
     if not rows:
@@ -225,140 +350,316 @@ async def load_data_inovasi(batch_size=50, offset=0) -> pd.DataFrame:
     return pd.DataFrame([dict(r) for r in rows])
 
 
+async def stream_data_inovasi(
+    batch_size: int = LOAD_BATCH_SIZE,
+) -> AsyncIterator[pd.DataFrame]:
+    """
+    Yield batch data_inovasi berurutan id. Batch berikutnya sudah di-fetch
+    (task terpisah) selama pemanggil memproses batch saat ini.
+    """
+    next_batch = asyncio.ensure_future(load_data_inovasi(batch_size))
+
+    while next_batch is not None:
+        df_batch = await next_batch
+        if df_batch.empty:
+            break
+
+        # Batch penuh -> mungkin masih ada data, prefetch sekarang
+        next_batch = (
+            asyncio.ensure_future(
+                load_data_inovasi(batch_size, int(df_batch["id"].iloc[-1]))
+            )
+            if len(df_batch) == batch_size
+            else None
+        )
+
+        try:
+            yield df_batch
+        except BaseException:
+            if next_batch is not None:
+                next_batch.cancel()
+            raise
+
+
 # ===============================
 # EMBEDDING
 # ===============================
-def build_embeddings(df: pd.DataFrame) -> np.ndarray:
-    df["teks_fitur"] = (
-        "Judul: " + df["judul_inovasi"].fillna("") + ". "
-        "Urusan: " + df["urusan_utama"].fillna("") + ". "
-        "Tahapan: " + df["tahapan_inovasi"].fillna("") + ". "
-        "Kematangan: " + df["label_kematangan"].fillna("")
+async def build_embeddings(df: pd.DataFrame) -> np.ndarray:
+    df["teks_fitur"] = [
+        build_feature_text(row) for row in df.fillna("").to_dict("records")
+    ]
+
+    # Reuse embedding store (hanya baris baru / berubah yang di-encode)
+    return await embedding_store.get_embeddings(
+        df["id"].tolist(), df["teks_fitur"].tolist(), encode_texts_async
     )
 
-    return embedding_model.encode(df["teks_fitur"].tolist(), show_progress_bar=False)
-
 
 # ===============================
 # SAVE CLUSTER RESULT
 # ===============================
-async def save_clustering_result(df, labels, model_name):
-    await database.execute("DELETE FROM clustering_result")
+CLUSTERING_RESULT_COLUMNS = (
+    "run_id",
+    "id_inovasi",
+    "cluster_id",
+    "model_name",
+    "model_version",
+    "processed_at",
+)
+
+
+def clustering_result_rows(
+    df, labels, model_name, now: datetime, run_id: int, model_version: str = "v2"
+) -> List[tuple]:
+    return [
+        (run_id, inovasi_id, cluster, model_name, model_version, now)
+        for inovasi_id, cluster in zip(
+            df["id"].to_numpy(dtype=np.int64).tolist(),
+            np.asarray(labels).tolist(),
+        )
+    ]
 
-    records = []
-    now = datetime.utcnow()
 
-    for i in range(len(df)):
-        records.append(
-            {
-                "id": int(df.at[i, "id"]),
-                "cluster": int(labels[i]),
-                "model": model_name,
-                "version": "v2",
-                "ts": now,
-            }
-        )
+# ===============================
+# NEIGHBOUR TABLE (TOP-K PER INOVASI, BLOCKWISE)
+# ===============================
+def build_neighbor_pairs(
+    embeddings: np.ndarray,
+    labels: np.ndarray,
+    opd: Optional[np.ndarray] = None,
+    k: int = NEIGHBOR_K,
+    scope: str = NEIGHBOR_SCOPE,
+    min_similarity: float = NEIGHBOR_MIN_SIMILARITY,
+    rows: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Top-k partner per baris tanpa membuat matriks n x n: similarity dihitung
+    per blok baris, partner di luar `scope` di-mask sebelum top-k.
+    `rows` membatasi baris yang dicari partnernya (default: semua), partner
+    tetap dicari di seluruh matriks.
 
-    await database.execute_many(
-        """
-        INSERT INTO clustering_result
-        (id_inovasi, cluster_id, model_name, model_version, processed_at)
-        VALUES (:id, :cluster, :model, :version, :ts)
-        """,
-        records,
-    )
+    Returns:
+        (row_a, row_b, similarity) dengan row_a < row_b, tiap pasangan sekali.
+    """
+    vectors = normalize_rows(embeddings)
+    labels = np.asarray(labels)
+    n = len(vectors)
+    query_rows = np.arange(n) if rows is None else np.asarray(rows, dtype=np.int64)
+    k = max(0, min(k, n - 1))
+    block = block_rows(n)
+
+    if scope == "cross_opd":
+        if opd is None:
+            raise ValueError("scope cross_opd membutuhkan kolom OPD")
+        _, opd_codes = np.unique(np.asarray(opd, dtype=str), return_inverse=True)
+    elif scope not in ("cluster", "all"):
+        raise ValueError(f"Scope neighbour tidak dikenal: {scope}")
+
+    if k == 0 or len(query_rows) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    pair_a, pair_b, pair_s = [], [], []
+    for start in range(0, len(query_rows), block):
+        block_rows = query_rows[start : start + block]
+        scores = vectors[block_rows] @ vectors.T
+
+        scores[np.arange(len(block_rows)), block_rows] = -np.inf
+        if scope == "cluster":
+            scores[labels[block_rows, None] != labels[None, :]] = -np.inf
+        elif scope == "cross_opd":
+            scores[opd_codes[block_rows, None] == opd_codes[None, :]] = -np.inf
+
+        top_scores, top_idx = top_k_desc(scores, k)
+        keep = top_scores >= min_similarity
+        pair_a.append(np.repeat(block_rows, k)[keep.ravel()])
+        pair_b.append(top_idx[keep])
+        pair_s.append(top_scores[keep])
+
+    a = np.concatenate(pair_a)
+    b = np.concatenate(pair_b)
+    sims = np.concatenate(pair_s).astype(np.float32)
+
+    # Pasangan (i, j) dan (j, i) disimpan sekali sebagai (min, max)
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    _, unique = np.unique(lo * n + hi, return_index=True)
+    return lo[unique], hi[unique], sims[unique]
+
+
+NEIGHBOR_COLUMNS = (
+    "run_id",
+    "inovasi_id_1",
+    "inovasi_id_2",
+    "similarity",
+    "cluster_id",
+    "scope",
+    "processed_at",
+)
+
+
+def neighbor_rows(
+    df, labels, pairs, now: datetime, run_id: int, scope: str = NEIGHBOR_SCOPE
+) -> List[tuple]:
+    row_a, row_b, sims = pairs
+    ids = df["id"].to_numpy(dtype=np.int64)
+    labels = np.asarray(labels)
+
+    # cluster_id hanya diisi kalau kedua inovasi satu cluster
+    same = labels[row_a] == labels[row_b]
+    clusters = [c if ok else None for c, ok in zip(labels[row_a].tolist(), same)]
+
+    # (id kecil, id besar): urutan baris df tidak selalu urut id (incremental
+    # menambahkan baris yang diedit di belakang dengan id lamanya)
+    id_a, id_b = ids[row_a], ids[row_b]
+
+    return [
+        (run_id, a, b, s, c, scope, now)
+        for a, b, s, c in zip(
+            np.minimum(id_a, id_b).tolist(),
+            np.maximum(id_a, id_b).tolist(),
+            sims.astype(np.float64).tolist(),
+            clusters,
+        )
+    ]
 
 
 # ===============================
-# SAVE SIMILARITY (INTRA CLUSTER)
+# PASANGAN INTRA CLUSTER (NUMPY)
 # ===============================
-async def save_similarity(embeddings, df, labels):
-    sim_matrix = cosine_similarity(embeddings)
-    await database.execute("DELETE FROM similarity_result")
+def _cluster_members(labels) -> List[Tuple[int, np.ndarray]]:
+    """(cluster_id, row anggota urut naik) untuk setiap cluster."""
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    cluster_ids, starts = np.unique(labels[order], return_index=True)
+    return list(zip(cluster_ids.tolist(), np.split(order, starts[1:])))
 
-    records = []
-    now = datetime.utcnow()
 
-    for i in range(len(df)):
-        for j in range(i + 1, len(df)):
-            if labels[i] != labels[j]:
-                continue
-
-            similarity = float(sim_matrix[i, j])
-
-            # threshold diturunkan (lebih realistis)
-            if similarity < 0.2:
-                continue
-
-            records.append(
-                {
-                    "cluster": int(labels[i]),
-                    "a": int(df.at[i, "id"]),
-                    "b": int(df.at[j, "id"]),
-                    "s": similarity,
-                    "ts": now,
-                }
+def _cluster_similarity_blocks(vectors: np.ndarray, idxs: np.ndarray):
+    """
+    Sub-matriks cosine anggota cluster per blok baris (blok x c, maks.
+    NEIGHBOR_BLOCK_CELLS sel), bukan c x c sekaligus. Diagonal & segitiga
+    bawah = -inf.
+
+    Yields:
+        (offset baris pertama blok, blok similarity)
+    """
+    members = vectors[idxs]
+    c = len(idxs)
+    block = block_rows(c)
+    columns = np.arange(c)
+
+    for start in range(0, c, block):
+        sub = members[start : start + block] @ members.T
+        rows = np.arange(start, start + len(sub))
+        sub[columns[None, :] <= rows[:, None]] = -np.inf
+        yield start, sub
+
+
+def intra_cluster_pairs(
+    embeddings: np.ndarray, labels, min_similarity: float = 0.2
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Semua pasangan (i < j) satu cluster dengan similarity >= min_similarity.
+
+    Returns:
+        (row_a, row_b, similarity, cluster_id) sebagai array
+    """
+    vectors = normalize_rows(embeddings)
+    parts = []
+
+    for cluster_id, idxs in _cluster_members(labels):
+        for start, sub in _cluster_similarity_blocks(vectors, idxs):
+            a, b = np.nonzero(sub >= min_similarity)
+            parts.append(
+                (
+                    idxs[a + start],
+                    idxs[b],
+                    sub[a, b],
+                    np.full(len(a), cluster_id, dtype=np.int64),
+                )
             )
 
-    if records:
-        await database.execute_many(
-            """
-            INSERT INTO similarity_result
-            (cluster_id, inovasi_id_1, inovasi_id_2, similarity, processed_at)
-            VALUES (:cluster, :a, :b, :s, :ts)
-            """,
-            records,
+    if not parts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32), empty
+
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+# ===============================
+# SIMILARITY RESULT (INTRA CLUSTER, LEGACY ALL-PAIRS)
+# ===============================
+SIMILARITY_RESULT_COLUMNS = (
+    "run_id",
+    "cluster_id",
+    "inovasi_id_1",
+    "inovasi_id_2",
+    "similarity",
+    "processed_at",
+)
+
+
+def similarity_records(
+    embeddings, df, labels, now: datetime, run_id: Optional[int] = None
+) -> List[tuple]:
+    # threshold diturunkan (lebih realistis): similarity >= 0.2
+    row_a, row_b, sims, clusters = intra_cluster_pairs(embeddings, labels)
+    ids = df["id"].to_numpy(dtype=np.int64)
+
+    return list(
+        zip(
+            [run_id] * len(row_a),
+            clusters.tolist(),
+            ids[row_a].tolist(),
+            ids[row_b].tolist(),
+            sims.astype(np.float64).tolist(),
+            [now] * len(row_a),
         )
+    )
 
 
 # ===============================
 # HITUNG AI INSIGHT PER CLUSTER - ✅ WITH OPD
 # ===============================
+def _insight_item(row: Dict) -> Dict:
+    return {
+        "id": int(row["id"]),
+        "judul": row["judul_inovasi"],
+        "urusan": row["urusan_utama"],
+        "tahap": row["tahapan_inovasi"],
+        "kematangan": row["label_kematangan"],
+        "opd": row["admin_opd"],  # ✅ ADDED
+    }
+
+
 def calculate_cluster_insights(df, embeddings, labels) -> List[Dict]:
-    sim_matrix = cosine_similarity(embeddings)
+    vectors = normalize_rows(embeddings)
     results = []
 
-    for cluster_id in sorted(set(labels)):
-        idxs = [i for i, l in enumerate(labels) if l == cluster_id]
+    for cluster_id, idxs in _cluster_members(labels):
         if len(idxs) < 2:
             continue
 
-        best_score = 0.0
-        best_pair = None
+        # Pasangan terbaik = argmax segitiga atas, dicari per blok baris
+        best_score, a, b = -np.inf, None, None
+        for start, sub in _cluster_similarity_blocks(vectors, idxs):
+            best = int(np.argmax(sub))
+            if sub.flat[best] > best_score:
+                best_score = float(sub.flat[best])
+                a = idxs[start + best // len(idxs)]
+                b = idxs[best % len(idxs)]
 
-        for i, j in combinations(idxs, 2):
-            score = float(sim_matrix[i, j])
-            if score > best_score:
-                best_score = score
-                best_pair = (i, j)
-
-        if not best_pair:
+        if best_score <= 0.0:
             continue
 
-        a, b = best_pair
-
         # ✅ OPTIMIZED: Include OPD in insights
         results.append(
             {
                 "cluster_id": int(cluster_id),
                 "skor_kolaborasi": round(best_score, 4),
                 "jumlah_inovasi": len(idxs),
-                "inovasi_1": {
-                    "id": int(df.at[a, "id"]),
-                    "judul": df.at[a, "judul_inovasi"],
-                    "urusan": df.at[a, "urusan_utama"],
-                    "tahap": df.at[a, "tahapan_inovasi"],
-                    "kematangan": df.at[a, "label_kematangan"],
-                    "opd": df.at[a, "admin_opd"],  # ✅ ADDED
-                },
-                "inovasi_2": {
-                    "id": int(df.at[b, "id"]),
-                    "judul": df.at[b, "judul_inovasi"],
-                    "urusan": df.at[b, "urusan_utama"],
-                    "tahap": df.at[b, "tahapan_inovasi"],
-                    "kematangan": df.at[b, "label_kematangan"],
-                    "opd": df.at[b, "admin_opd"],  # ✅ ADDED
-                },
+                "inovasi_1": _insight_item(df.iloc[a]),
+                "inovasi_2": _insight_item(df.iloc[b]),
             }
         )
 
@@ -368,24 +669,65 @@ def calculate_cluster_insights(df, embeddings, labels) -> List[Dict]:
 # ===============================
 # MAIN PIPELINE (FIXED & STABLE)
 # ===============================
-async def run_clustering_pipeline(k_clusters: int = 4):
+async def _no_progress(percent: float, message: Optional[str] = None):
+    return None
+
+
+async def run_clustering_pipeline(
+    k_clusters: int = 4,
+    progress: Optional[ProgressFn] = None,
+    sweep: Optional[bool] = None,
+    engine: Optional[str] = None,
+):
+    """
+    Clustering penuh. `progress` (dari job_runner) menerima persen + pesan
+    setiap tahap. `sweep` (default CLUSTER_MODEL_SWEEP) memilih model dan k
+    lewat model_selection, k_clusters diabaikan. `engine` (default
+    CLUSTER_ENGINE) lihat clustering_engines.
+    """
+    report = progress or _no_progress
     all_df = []
     all_embeddings = []
+    use_sweep = MODEL_SWEEP if sweep is None else sweep
+    engine = (engine or CLUSTER_ENGINE).lower()
+    requested_engine = engine
 
-    offset = 0
-    batch_size = 50
+    # Perubahan sampai titik ini ikut ter-cluster (watermark setelah aktif)
+    change_id = await latest_change_id()
 
-    while True:
-        df_batch = await load_data_inovasi(batch_size, offset)
-        if df_batch.empty:
-            break
+    await report(0, "Loading data")
+    total_rows = (
+        await database.fetch_val(
+            "SELECT COUNT(*) FROM data_inovasi WHERE judul_inovasi IS NOT NULL"
+        )
+        if progress or (engine == "auto" and not use_sweep)
+        else None
+    )
+    loaded_rows = 0
+
+    # Engine streaming di-fit per batch selama data masih dimuat
+    engine = "sweep" if use_sweep else resolve_engine(engine, total_rows)
+    clusterer = (
+        StreamingClusterer(engine, k_clusters)
+        if engine in ("minibatch", "two_stage")
+        else None
+    )
 
-        emb_batch = build_embeddings(df_batch)
+    # Fetch batch berikutnya berjalan bersamaan dengan encode batch ini
+    async for df_batch in stream_data_inovasi():
+        emb_batch = await build_embeddings(df_batch)
 
         all_df.append(df_batch)
         all_embeddings.append(emb_batch)
-
-        offset += batch_size
+        if clusterer:
+            await asyncio.to_thread(clusterer.partial_fit, emb_batch)
+
+        loaded_rows += len(df_batch)
+        if total_rows:
+            await report(
+                40 * min(loaded_rows / total_rows, 1.0),
+                f"Encoded {loaded_rows}/{total_rows} rows",
+            )
 
     if not all_df:
         set_cluster_cache([])
@@ -396,6 +738,7 @@ async def run_clustering_pipeline(k_clusters: int = 4):
 
     df = pd.concat(all_df, ignore_index=True)
     embeddings = np.vstack(all_embeddings)
+    await embedding_store.save_async(keep_ids=df["id"].tolist())
 
     if len(df) < 2:
         set_cluster_cache([])
@@ -409,17 +752,85 @@ async def run_clustering_pipeline(k_clusters: int = 4):
     if actual_k < 2:
         actual_k = 2
 
-    print(f"🔍 Clustering: {len(df)} items with k={actual_k} (requested: {k_clusters})")
+    print(
+        f"🔍 Clustering: {len(df)} items with k={actual_k} "
+        f"(requested: {k_clusters}, engine: {engine})"
+    )
+
+    selection = None
+    if use_sweep:
+        # Pilih model + k lewat sweep paralel (lihat model_selection)
+        await report(45, f"Model selection sweep on {len(df)} rows")
+        selection = await asyncio.to_thread(
+            select_model, embeddings, engine=requested_engine
+        )
+        labels = selection.labels
+        model_name = selection.model_name
+        actual_k = int(len(np.unique(labels)))
+    elif clusterer:
+        await report(45, f"Clustering {len(df)} rows ({engine}, k={actual_k})")
+        labels = await asyncio.to_thread(clusterer.fit_labels, embeddings, actual_k)
+        actual_k = int(len(np.unique(labels)))
+        model_name = clusterer.model_name(actual_k)
+    else:
+        await report(45, f"Clustering {len(df)} rows (k={actual_k})")
+        model = AgglomerativeClustering(n_clusters=actual_k)
+        # Fit di thread terpisah supaya request lain tetap dilayani
+        labels = await asyncio.to_thread(model.fit_predict, embeddings)
 
-    model = AgglomerativeClustering(n_clusters=actual_k)
-    labels = model.fit_predict(embeddings)
+        model_name = f"Agglomerative_k={actual_k}"
 
-    model_name = f"Agglomerative_k={actual_k}"
+    await report(60, "Building neighbour pairs")
+    pairs = await asyncio.to_thread(
+        build_neighbor_pairs, embeddings, labels, df["admin_opd"].fillna("").to_numpy()
+    )
 
-    await save_clustering_result(df, labels, model_name)
-    await save_similarity(embeddings, df, labels)
+    # Hasil ditulis di bawah run_id baru; reader tetap membaca run aktif
+    # lama sampai run ini diaktifkan
+    run_id = new_run_id()
+    now = datetime.utcnow()
+    await create_run(run_id, model_name)
+    await report(75, f"Writing run {run_id}")
 
-    insights = calculate_cluster_insights(df, embeddings, labels)
+    try:
+        tables = {
+            "clustering_result": (
+                CLUSTERING_RESULT_COLUMNS,
+                clustering_result_rows(df, labels, model_name, now, run_id),
+            ),
+            "similarity_neighbor": (
+                NEIGHBOR_COLUMNS,
+                neighbor_rows(df, labels, pairs, now, run_id),
+            ),
+        }
+        if SAVE_ALL_PAIRS:
+            tables["similarity_result"] = (
+                SIMILARITY_RESULT_COLUMNS,
+                await asyncio.to_thread(
+                    similarity_records, embeddings, df, labels, now, run_id
+                ),
+            )
+
+        await insert_tables(tables)
+        print(
+            f"✅ Saved {len(pairs[0])} neighbour pairs "
+            f"(k={NEIGHBOR_K}, scope={NEIGHBOR_SCOPE})"
+        )
+
+        if not await promote_run(run_id, total_data=len(df)):
+            raise RuntimeError(f"Clustering run {run_id} could not be promoted")
+    except BaseException:
+        # Termasuk job yang di-cancel: run setengah jadi dibuang
+        await fail_run(run_id)
+        raise
+
+    await set_watermark(CLUSTERING_STAGE, change_id)
+    await prune_runs()
+
+    await report(95, "Building cluster insights")
+    insights = await asyncio.to_thread(
+        calculate_cluster_insights, df, embeddings, labels
+    )
 
     # ✅ FIX: Add logging to debug cache
     print(f"✅ Generated {len(insights)} cluster insights")
@@ -441,9 +852,11 @@ async def run_clustering_pipeline(k_clusters: int = 4):
 
     return {
         "status": "ok",
+        "run_id": run_id,
         "total_data": len(df),
         "clusters": actual_k,
         "model": model_name,
+        "model_selection": selection.scores if selection else None,
         "total_insight": len(insights),
         "sample": insights[:5],
     }
@@ -0,0 +1,246 @@
+"""
+Embedding Provider
+Satu instance SentenceTransformer bersama untuk semua service (vector search,
+clustering) dan notebook. Model di-load secara lazy saat pertama kali
+dibutuhkan, bukan saat import, sehingga app.main bisa di-import dengan cepat.
+
+Untuk route async, inference dijalankan di executor terpisah (thread/process
+pool) supaya event loop tidak ter-block. Query pendek yang datang bersamaan
+digabung (micro-batch) menjadi satu panggilan encode.
+"""
+
+import os
+import asyncio
+import threading
+import time
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+EMBEDDING_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# ===============================
+# CONFIG EXECUTOR
+# ===============================
+EMBEDDING_EXECUTOR = os.getenv("EMBEDDING_EXECUTOR", "thread").lower()  # thread | process
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+EMBEDDING_MAX_PENDING = int(os.getenv("EMBEDDING_MAX_PENDING", "64"))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+
+
+class EmbeddingQueueFull(RuntimeError):
+    """Antrian encode penuh; request sebaiknya ditolak / dicoba lagi."""
+
+
+# ===============================
+# LAZY SINGLETON
+# ===============================
+_model = None
+_model_lock = threading.Lock()
+_model_stats: Dict = {
+    "name": EMBEDDING_MODEL_NAME,
+    "loaded": False,
+    "load_time_s": None,
+    "model_size_mb": None,
+    "rss_delta_mb": None,
+    "loaded_at": None,
+}
+
+
+def _rss_mb():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def get_embedding_model():
+    """
+    Ambil model embedding bersama. Load pertama dilindungi lock supaya
+    request yang datang bersamaan tidak me-load model dua kali.
+    """
+    global _model
+
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is not None:
+            return _model
+
+        print(f"🔄 Loading embedding model {EMBEDDING_MODEL_NAME}...")
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+        load_time = time.perf_counter() - start
+        rss_after = _rss_mb()
+
+        try:
+            size_bytes = sum(
+                p.numel() * p.element_size() for p in model.parameters()
+            )
+            _model_stats["model_size_mb"] = round(size_bytes / (1024 * 1024), 1)
+        except Exception:
+            pass
+
+        _model_stats.update(
+            {
+                "loaded": True,
+                "load_time_s": round(load_time, 2),
+                "rss_delta_mb": (
+                    round(rss_after - rss_before, 1)
+                    if rss_before is not None and rss_after is not None
+                    else None
+                ),
+                "loaded_at": datetime.utcnow().isoformat(),
+            }
+        )
+
+        _model = model
+        print(f"✅ Embedding model loaded in {load_time:.2f}s")
+        return _model
+
+
+# ===============================
+# ENCODE
+# ===============================
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """Encode list teks menjadi matriks float32 (n x dim)."""
+    embeddings = get_embedding_model().encode(list(texts), show_progress_bar=False)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def get_model_stats() -> Dict:
+    """Status model untuk /health."""
+    return dict(_model_stats)
+
+
+# ===============================
+# ASYNC ENCODE (BOUNDED EXECUTOR)
+# ===============================
+_executor: Optional[Executor] = None
+_pending: int = 0
+_batch_items: List[Tuple[str, asyncio.Future]] = []
+_batch_handle: Optional[asyncio.TimerHandle] = None
+_executor_stats: Dict = {"batches": 0, "batched_queries": 0, "rejected": 0}
+
+
+def _get_executor() -> Executor:
+    global _executor
+
+    if _executor is None:
+        if EMBEDDING_EXECUTOR == "process":
+            # Setiap worker process me-load modelnya sendiri (lazy)
+            _executor = ProcessPoolExecutor(max_workers=EMBEDDING_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=EMBEDDING_WORKERS, thread_name_prefix="embedding"
+            )
+
+    return _executor
+
+
+def _reserve_slot():
+    global _pending
+
+    if _pending >= EMBEDDING_MAX_PENDING:
+        _executor_stats["rejected"] += 1
+        raise EmbeddingQueueFull(
+            f"Embedding queue full ({_pending}/{EMBEDDING_MAX_PENDING} pending)"
+        )
+    _pending += 1
+
+
+def _release_slot():
+    global _pending
+    _pending -= 1
+
+
+async def _run_encode(texts: List[str]) -> np.ndarray:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), encode_texts, texts)
+
+
+async def encode_texts_async(texts: List[str]) -> np.ndarray:
+    """
+    Versi async dari encode_texts untuk batch besar (misal seluruh katalog).
+    Raises EmbeddingQueueFull kalau antrian sudah penuh.
+    """
+    _reserve_slot()
+    try:
+        return await _run_encode(list(texts))
+    finally:
+        _release_slot()
+
+
+def _flush_batch():
+    global _batch_handle
+
+    if _batch_handle is not None:
+        _batch_handle.cancel()
+        _batch_handle = None
+
+    items = _batch_items[:]
+    _batch_items.clear()
+
+    if items:
+        asyncio.ensure_future(_run_batch(items))
+
+
+async def _run_batch(items: List[Tuple[str, asyncio.Future]]):
+    _executor_stats["batches"] += 1
+    _executor_stats["batched_queries"] += len(items)
+
+    try:
+        vectors = await _run_encode([text for text, _ in items])
+        for (_, future), vector in zip(items, vectors):
+            if not future.done():
+                future.set_result(vector)
+    except Exception as e:
+        for _, future in items:
+            if not future.done():
+                future.set_exception(e)
+
+
+async def encode_query_async(text: str) -> np.ndarray:
+    """
+    Encode satu query (vector 1 dimensi). Query yang masuk dalam jendela
+    EMBEDDING_BATCH_WINDOW_MS digabung menjadi satu panggilan encode.
+    """
+    global _batch_handle
+
+    _reserve_slot()
+    try:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        _batch_items.append((text, future))
+
+        if len(_batch_items) >= EMBEDDING_MAX_BATCH:
+            _flush_batch()
+        elif _batch_handle is None:
+            _batch_handle = loop.call_later(
+                EMBEDDING_BATCH_WINDOW_MS / 1000, _flush_batch
+            )
+
+        return await future
+    finally:
+        _release_slot()
+
+
+def get_executor_stats() -> Dict:
+    """Status executor encode untuk /health."""
+    return {
+        "executor": EMBEDDING_EXECUTOR,
+        "workers": EMBEDDING_WORKERS,
+        "pending": _pending,
+        "max_pending": EMBEDDING_MAX_PENDING,
+        **_executor_stats,
+    }
@@ -0,0 +1,253 @@
+"""
+Persistent Embedding Store
+Menyimpan embedding data_inovasi di disk supaya startup tidak perlu
+meng-encode ulang seluruh katalog.
+
+Format di disk (folder EMBEDDING_STORE_DIR):
+- embeddings.npy : matriks float32 (n x dim), dibuka dengan mmap
+- manifest.json  : model, dim, dan daftar [id, hash teks fitur] per baris
+
+Setiap baris dikunci oleh id inovasi + hash teks fitur
+"Judul/Urusan/Tahapan/Kematangan", jadi hanya baris baru atau yang
+berubah yang di-encode ulang.
+
+Vector cache dan pipeline clustering bisa memakai store bersamaan: lookup,
+upsert, dan save dijaga satu asyncio.Lock, dan penulisan ke disk berjalan
+di thread (save_async) supaya event loop tidak terblok.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import numpy as np
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.services.embedding_provider import EMBEDDING_MODEL_NAME
+
+# ===============================
+# CONFIG
+# ===============================
+EMBEDDING_STORE_DIR = os.getenv(
+    "EMBEDDING_STORE_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        ".embedding_store",
+    ),
+)
+
+
+# ===============================
+# TEKS FITUR (SAMA UNTUK SEARCH & CLUSTERING)
+# ===============================
+def build_feature_text(item: Dict) -> str:
+    """Teks fitur yang di-embed, sama persis dengan format clustering."""
+    return (
+        f"Judul: {item.get('judul_inovasi') or ''}. "
+        f"Urusan: {item.get('urusan_utama') or ''}. "
+        f"Tahapan: {item.get('tahapan_inovasi') or ''}. "
+        f"Kematangan: {item.get('label_kematangan') or ''}"
+    )
+
+
+def feature_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+# ===============================
+# STORE
+# ===============================
+class EmbeddingStore:
+    def __init__(self, directory: str, model_name: str):
+        self.directory = directory
+        self.model_name = model_name
+        self.matrix_path = os.path.join(directory, "embeddings.npy")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+
+        self._matrix: Optional[np.ndarray] = None
+        self._rows: Dict[int, Tuple[int, str]] = {}  # id -> (row, hash)
+        self._loaded = False
+        self._dirty = False
+        self._lock = asyncio.Lock()
+
+    # ---------- load ----------
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        if not (
+            os.path.exists(self.matrix_path) and os.path.exists(self.manifest_path)
+        ):
+            return
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            if manifest.get("model") != self.model_name:
+                print("⚠️ Embedding store built with another model, ignoring it")
+                return
+
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+            if matrix.shape[0] != len(manifest["rows"]):
+                print("⚠️ Embedding store manifest mismatch, ignoring it")
+                return
+
+            self._matrix = matrix
+            self._rows = {
+                int(inovasi_id): (row, h)
+                for row, (inovasi_id, h) in enumerate(manifest["rows"])
+            }
+            print(f"💾 Embedding store loaded: {len(self._rows)} rows")
+
+        except Exception as e:
+            print(f"⚠️ Failed to read embedding store: {e}")
+            self._matrix = None
+            self._rows = {}
+
+    # ---------- lookup + encode ----------
+    async def get_embeddings(
+        self,
+        ids: Sequence[int],
+        texts: Sequence[str],
+        encode_fn: Callable[[List[str]], Awaitable[np.ndarray]],
+    ) -> np.ndarray:
+        """
+        Ambil embedding untuk (id, teks). Baris yang belum ada atau teksnya
+        berubah di-encode lewat `encode_fn` (async) dalam satu panggilan.
+        Panggil save_async() setelahnya untuk menulis perubahan ke disk.
+
+        Lock dipegang sampai hasil disalin, termasuk selama encode: pemanggil
+        lain tidak bisa compact / upsert di tengah jalan, dan teks yang sama
+        tidak di-encode dua kali.
+        """
+        async with self._lock:
+            self._ensure_loaded()
+
+            hashes = [feature_hash(t) for t in texts]
+            missing = [
+                i
+                for i, (inovasi_id, h) in enumerate(zip(ids, hashes))
+                if self._rows.get(int(inovasi_id), (None, None))[1] != h
+            ]
+
+            if missing:
+                print(f"🧮 Encoding {len(missing)}/{len(ids)} new or changed rows")
+                vectors = np.asarray(
+                    await encode_fn([texts[i] for i in missing]), dtype=np.float32
+                )
+                self._upsert(
+                    [int(ids[i]) for i in missing],
+                    [hashes[i] for i in missing],
+                    vectors,
+                )
+
+            rows = [self._rows[int(inovasi_id)][0] for inovasi_id in ids]
+            return np.asarray(self._matrix[rows], dtype=np.float32)
+
+    def _upsert(self, ids: List[int], hashes: List[str], vectors: np.ndarray):
+        base = (
+            self._matrix
+            if self._matrix is not None
+            else np.empty((0, vectors.shape[1]), dtype=np.float32)
+        )
+
+        # Tentukan row tujuan dulu: id baru ditambah di belakang, id lama ditimpa
+        targets = np.empty(len(ids), dtype=np.int64)
+        next_row = len(base)
+        for i, (inovasi_id, h) in enumerate(zip(ids, hashes)):
+            entry = self._rows.get(inovasi_id)
+            if entry is None:
+                entry = (next_row, h)
+                next_row += 1
+            targets[i] = entry[0]
+            self._rows[inovasi_id] = (entry[0], h)
+
+        new = targets >= len(base)
+        overwrite = ~new
+
+        # Satu concatenate untuk semua baris baru (hasilnya array baru, writable)
+        if new.any():
+            block = np.empty((next_row - len(base), base.shape[1]), dtype=np.float32)
+            block[targets[new] - len(base)] = vectors[new]
+            matrix = np.concatenate([base, block])
+        else:
+            matrix = base
+
+        if overwrite.any():
+            if matrix is base and (
+                isinstance(matrix, np.memmap) or not matrix.flags.writeable
+            ):
+                # Salin dari mmap (read-only) hanya kalau ada baris yang ditimpa
+                matrix = np.array(matrix, dtype=np.float32)
+            matrix[targets[overwrite]] = vectors[overwrite]
+
+        self._matrix = matrix
+        self._dirty = True
+
+    # ---------- persist ----------
+    async def save_async(self, keep_ids: Optional[Iterable[int]] = None):
+        """save() di thread terpisah, di bawah lock yang sama dengan lookup."""
+        async with self._lock:
+            await asyncio.to_thread(self.save, keep_ids)
+
+    def save(self, keep_ids: Optional[Iterable[int]] = None):
+        """
+        Tulis store ke disk (atomic replace). Kalau `keep_ids` diberikan,
+        baris milik id yang sudah tidak ada di database ikut dibuang.
+        Sinkron; dari kode async pakai save_async.
+        """
+        if self._matrix is None:
+            return
+
+        if keep_ids is not None:
+            keep = {int(i) for i in keep_ids}
+            if keep != set(self._rows):
+                self._compact(keep)
+
+        if not self._dirty:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            ordered = sorted(self._rows.items(), key=lambda kv: kv[1][0])
+            manifest = {
+                "model": self.model_name,
+                "dim": int(self._matrix.shape[1]),
+                "rows": [[inovasi_id, h] for inovasi_id, (_, h) in ordered],
+            }
+
+            tmp_matrix = self.matrix_path + ".tmp.npy"
+            tmp_manifest = self.manifest_path + ".tmp"
+            np.save(tmp_matrix, np.asarray(self._matrix, dtype=np.float32))
+            with open(tmp_manifest, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+            os.replace(tmp_matrix, self.matrix_path)
+            os.replace(tmp_manifest, self.manifest_path)
+
+            self._dirty = False
+            print(f"💾 Embedding store saved: {len(self._rows)} rows")
+
+        except Exception as e:
+            print(f"⚠️ Failed to save embedding store: {e}")
+
+    def _compact(self, keep: set):
+        kept = sorted(
+            (row, inovasi_id, h)
+            for inovasi_id, (row, h) in self._rows.items()
+            if inovasi_id in keep
+        )
+        self._matrix = np.asarray(
+            self._matrix[[row for row, _, _ in kept]], dtype=np.float32
+        )
+        self._rows = {
+            inovasi_id: (new_row, h)
+            for new_row, (_, inovasi_id, h) in enumerate(kept)
+        }
+        self._dirty = True
+
+
+# Satu store bersama untuk vector search & clustering
+embedding_store = EmbeddingStore(EMBEDDING_STORE_DIR, EMBEDDING_MODEL_NAME)
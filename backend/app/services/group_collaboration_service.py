@@ -0,0 +1,286 @@
+"""
+Rekomendasi Grup Kolaborasi Lintas OPD
+Versi backend dari langkah skor_pasangan / skor_grup di
+clustering_similarity.ipynb:
+
+    skor_pasangan = 0.5 * similarity
+                  + 0.25 * (urusan sama ? 1 : 0)
+                  + 0.25 * (tahapan sama ? 1 : 0.5)
+    skor_grup     = rata-rata skor_pasangan semua pasangan anggota
+
+- Kandidat per cluster = GROUP_CANDIDATES inovasi paling dekat ke centroid.
+- Skor pasangan dihitung sekali sebagai satu matriks NumPy per cluster
+  (bukan df.loc per pasangan). Pasangan satu OPD diblok kalau
+  GROUP_CROSS_OPD aktif.
+- Grup ukuran 2..GROUP_MAX_SIZE disusun dengan beam search: tiap langkah
+  memperluas GROUP_BEAM_WIDTH grup terbaik dengan satu anggota.
+- Hasil disimpan per versi run aktif (run_id + perubahan incremental),
+  dihitung ulang hanya kalau run berganti.
+"""
+
+import os
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.database import database
+from app.services.clustering_runs import get_active_run
+from app.services.embedding_store import embedding_store
+from app.services.incremental_clustering import INOVASI_COLUMNS_SQL
+from app.services.vector_index import normalize_rows
+
+# ===============================
+# CONFIG
+# ===============================
+GROUP_CANDIDATES = int(os.getenv("GROUP_CANDIDATES", "10"))  # notebook: top 10
+GROUP_MAX_SIZE = int(os.getenv("GROUP_MAX_SIZE", "3"))
+GROUP_BEAM_WIDTH = int(os.getenv("GROUP_BEAM_WIDTH", "50"))
+GROUP_KEEP_PER_CLUSTER = int(os.getenv("GROUP_KEEP_PER_CLUSTER", "5"))
+GROUP_CROSS_OPD = os.getenv("GROUP_CROSS_OPD", "true").lower() in ("1", "true", "yes")
+
+WEIGHT_SIMILARITY = 0.5
+WEIGHT_URUSAN = 0.25
+WEIGHT_TAHAPAN = 0.25
+
+_group_cache: Dict = {"key": None, "groups": [], "computed_at": None}
+_group_lock = asyncio.Lock()
+
+
+# ===============================
+# SKOR (NUMPY)
+# ===============================
+def _same(values: np.ndarray) -> np.ndarray:
+    return values[:, None] == values[None, :]
+
+
+def pair_score_matrix(
+    vectors: np.ndarray,
+    urusan: np.ndarray,
+    tahapan: np.ndarray,
+    opd: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Matriks skor_pasangan (n x n) dari vektor ternormalisasi. Diagonal dan
+    pasangan satu OPD (kalau opd diberikan) bernilai -inf.
+    """
+    scores = (
+        WEIGHT_SIMILARITY * (vectors @ vectors.T)
+        + WEIGHT_URUSAN * _same(urusan)
+        + WEIGHT_TAHAPAN * np.where(_same(tahapan), 1.0, 0.5)
+    )
+    blocked = np.eye(len(vectors), dtype=bool)
+    if opd is not None:
+        blocked |= _same(opd)
+    scores[blocked] = -np.inf
+    return scores
+
+
+def beam_search_groups(
+    scores: np.ndarray,
+    max_size: int = GROUP_MAX_SIZE,
+    beam_width: int = GROUP_BEAM_WIDTH,
+) -> List[Tuple[Tuple[int, ...], float]]:
+    """
+    Grup ukuran 2..max_size dengan rata-rata skor pasangan tertinggi.
+
+    Returns:
+        [(index anggota terurut, skor_grup)] semua ukuran, skor menurun
+    """
+    n = len(scores)
+    rows, cols = np.triu_indices(n, k=1)
+    valid = np.isfinite(scores[rows, cols])
+    rows, cols = rows[valid], cols[valid]
+    if not len(rows):
+        return []
+
+    # Beam awal: pasangan terbaik, skor disimpan sebagai jumlah skor pasangan
+    order = np.argsort(-scores[rows, cols], kind="stable")[:beam_width]
+    members = np.stack([rows[order], cols[order]], axis=1)
+    totals = scores[members[:, 0], members[:, 1]]
+
+    # Grup 2 anggota: jumlah skor = skor pasangan itu sendiri
+    results = [(tuple(int(i) for i in m), float(t)) for m, t in zip(members, totals)]
+
+    for size in range(3, max_size + 1):
+        # Tambahan skor kalau kandidat j masuk: sum skor j ke setiap anggota
+        gains = scores[members].sum(axis=1)  # (beam, n), -inf kalau terblok
+        gains[np.arange(len(members))[:, None], members] = -np.inf
+        extended = totals[:, None] + gains
+
+        flat = np.argsort(-extended, axis=None, kind="stable")
+        beam_idx, cand = np.unravel_index(flat, extended.shape)
+
+        seen = set()
+        next_members, next_totals = [], []
+        for b, j in zip(beam_idx, cand):
+            total = extended[b, j]
+            if not np.isfinite(total) or len(next_members) >= beam_width:
+                break
+            group = tuple(sorted((*members[b].tolist(), int(j))))
+            if group in seen:
+                continue
+            seen.add(group)
+            next_members.append(group)
+            next_totals.append(total)
+
+        if not next_members:
+            break
+
+        members = np.asarray(next_members)
+        totals = np.asarray(next_totals)
+        pairs = size * (size - 1) / 2
+        results += [(g, float(t) / pairs) for g, t in zip(next_members, totals)]
+
+    return sorted(results, key=lambda r: -r[1])
+
+
+def _member(row: Dict) -> Dict:
+    return {
+        "id": int(row["id"]),
+        "judul": row.get("judul_inovasi"),
+        "opd": row.get("admin_opd") or "-",
+        "urusan": row.get("urusan_utama"),
+        "tahapan": row.get("tahapan_inovasi"),
+        "label_kematangan": row.get("label_kematangan"),
+    }
+
+
+def cluster_groups(
+    df: pd.DataFrame, embeddings: np.ndarray, cross_opd: bool = GROUP_CROSS_OPD
+) -> List[Dict]:
+    """Grup terbaik (maks. GROUP_KEEP_PER_CLUSTER per ukuran) setiap cluster."""
+    vectors = normalize_rows(embeddings)
+    cluster_ids = df["cluster_id"].to_numpy()
+    records = df.to_dict("records")
+    groups = []
+
+    for cluster_id in np.unique(cluster_ids):
+        idxs = np.flatnonzero(cluster_ids == cluster_id)
+        if len(idxs) < 2:
+            continue
+
+        centroid = normalize_rows(vectors[idxs].mean(axis=0, keepdims=True))[0]
+        closest = np.argsort(-(vectors[idxs] @ centroid), kind="stable")
+        candidates = idxs[closest[:GROUP_CANDIDATES]]
+
+        subset = df.iloc[candidates]
+        scores = pair_score_matrix(
+            vectors[candidates],
+            subset["urusan_utama"].fillna("").to_numpy(),
+            subset["tahapan_inovasi"].fillna("").to_numpy(),
+            subset["admin_opd"].fillna("").to_numpy() if cross_opd else None,
+        )
+
+        kept: Dict[int, int] = {}
+        for members, score in beam_search_groups(scores):
+            if kept.get(len(members), 0) >= GROUP_KEEP_PER_CLUSTER:
+                continue
+            kept[len(members)] = kept.get(len(members), 0) + 1
+            groups.append(
+                {
+                    "cluster_id": int(cluster_id),
+                    "jumlah_inovasi": len(members),
+                    "skor": round(score, 4),
+                    "anggota": [_member(records[candidates[m]]) for m in members],
+                }
+            )
+
+    return sorted(groups, key=lambda g: -g["skor"])
+
+
+def select_groups(
+    groups: List[Dict],
+    limit: int = 5,
+    per_cluster: int = 2,
+    size: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Filter notebook: `per_cluster` grup terbaik tiap cluster, lalu grup yang
+    berbagi lebih dari satu inovasi dengan grup terpilih sebelumnya dilewati.
+    """
+    taken: Dict[int, int] = {}
+    top_per_cluster = []
+    for group in groups:
+        if size and group["jumlah_inovasi"] != size:
+            continue
+        if taken.get(group["cluster_id"], 0) < per_cluster:
+            taken[group["cluster_id"]] = taken.get(group["cluster_id"], 0) + 1
+            top_per_cluster.append(group)
+
+    used = set()
+    selected = []
+    for group in top_per_cluster:
+        ids = {m["id"] for m in group["anggota"]}
+        if len(used & ids) > 1:
+            continue
+        selected.append(group)
+        used |= ids
+        if len(selected) >= limit:
+            break
+
+    return selected
+
+
+# ===============================
+# LOAD + CACHE PER RUN
+# ===============================
+def _run_key(run: Dict) -> Tuple:
+    # Incremental assignment menambah / membuang baris tanpa ganti run_id
+    return (run["run_id"], run.get("total_data"), run.get("incremental_rows"))
+
+
+async def _load_run(run_id: int) -> Tuple[pd.DataFrame, np.ndarray]:
+    # Lazy import: clustering_service import modul ini lewat router
+    from app.services.clustering_service import build_embeddings
+
+    rows = await database.fetch_all(
+        f"""
+        SELECT {INOVASI_COLUMNS_SQL}, c.cluster_id
+        FROM clustering_result c
+        JOIN data_inovasi d ON d.id = c.id_inovasi
+        WHERE c.run_id = :run_id AND d.judul_inovasi IS NOT NULL
+        ORDER BY d.id
+        """,
+        {"run_id": run_id},
+    )
+    df = pd.DataFrame([dict(r) for r in rows])
+    if df.empty:
+        return df, np.zeros((0, 0), dtype=np.float32)
+
+    embeddings = await build_embeddings(df)
+    await embedding_store.save_async()
+    return df, embeddings
+
+
+async def get_collaboration_groups() -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Semua grup (urut skor) untuk run aktif + info run / waktu hitung.
+    Dihitung sekali per versi run; pemanggil bersamaan menunggu hasil yang sama.
+    """
+    run = await get_active_run()
+    if not run:
+        return [], None
+
+    key = _run_key(run)
+    async with _group_lock:
+        if _group_cache["key"] != key:
+            start = time.perf_counter()
+            df, embeddings = await _load_run(run["run_id"])
+            groups = (
+                await asyncio.to_thread(cluster_groups, df, embeddings)
+                if not df.empty
+                else []
+            )
+            _group_cache.update(key=key, groups=groups, computed_at=datetime.utcnow())
+            print(
+                f"🤝 Built {len(groups)} collaboration groups for run "
+                f"{run['run_id']} in {time.perf_counter() - start:.2f}s"
+            )
+
+    return _group_cache["groups"], {
+        "run_id": run["run_id"],
+        "computed_at": _group_cache["computed_at"],
+    }
@@ -0,0 +1,439 @@
+"""
+Incremental Cluster Assignment
+Inovasi baru (belum ada di clustering_result run aktif) di-assign ke centroid
+cluster terdekat tanpa menjalankan ulang AgglomerativeClustering (O(n^2)
+memory). Tetangga baris baru dihitung terhadap seluruh baris yang sudah
+ter-cluster, lalu keduanya ditambahkan ke run aktif dalam satu transaksi.
+
+Baris hasil assign ditandai model_version = INCREMENTAL_VERSION, dan drift
+per cluster diukur terhadap anggota asli (hasil clustering penuh):
+- new_ratio      : jumlah anggota incremental / jumlah anggota asli
+- centroid_shift : 1 - cos(centroid asli, centroid semua anggota)
+- fit            : rata-rata similarity anggota incremental ke centroid asli,
+                   dibagi kohesi anggota asli
+Kalau salah satu melewati batas, run ditandai needs_recluster dan
+check_and_auto_run_clustering menjalankan clustering penuh.
+"""
+
+import os
+import asyncio
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.database import database
+from app.services.bulk_writer import insert_tables
+from app.services.change_tracking import ChangeSet, id_chunks
+from app.services.clustering_runs import get_active_run, record_incremental
+from app.services.embedding_store import embedding_store
+from app.services.vector_index import normalize_rows
+
+# ===============================
+# CONFIG
+# ===============================
+INCREMENTAL_ENABLED = os.getenv("CLUSTER_INCREMENTAL", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+INCREMENTAL_VERSION = "v2-incremental"
+# Cluster baru dinilai drift setelah punya minimal sekian anggota incremental
+DRIFT_MIN_ROWS = int(os.getenv("CLUSTER_DRIFT_MIN_ROWS", "5"))
+DRIFT_MAX_NEW_RATIO = float(os.getenv("CLUSTER_DRIFT_MAX_NEW_RATIO", "0.25"))
+DRIFT_MAX_CENTROID_SHIFT = float(os.getenv("CLUSTER_DRIFT_MAX_CENTROID_SHIFT", "0.05"))
+DRIFT_MIN_FIT = float(os.getenv("CLUSTER_DRIFT_MIN_FIT", "0.85"))
+
+# Satu assignment dalam satu waktu (baris baru yang sama tidak ditulis dua kali)
+_incremental_lock = asyncio.Lock()
+
+
+# ===============================
+# CENTROID & DRIFT (NUMPY)
+# ===============================
+def _centroid_sums(vectors: np.ndarray, pos: np.ndarray, n_clusters: int) -> np.ndarray:
+    # One-hot (cluster x baris) @ vectors: jauh lebih cepat dari np.add.at
+    onehot = np.zeros((n_clusters, len(pos)), dtype=np.float32)
+    onehot[pos, np.arange(len(pos))] = 1.0
+    return onehot @ vectors
+
+
+def cluster_centroids(
+    vectors: np.ndarray, labels: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Args:
+        vectors: embedding ter-normalisasi (n x dim)
+
+    Returns:
+        (cluster_ids, centroid ter-normalisasi, kohesi = rata-rata cosine
+        anggota ke centroid), urut sesuai cluster_ids
+    """
+    cluster_ids, pos = np.unique(np.asarray(labels), return_inverse=True)
+    centroids = normalize_rows(_centroid_sums(vectors, pos, len(cluster_ids)))
+
+    member_sims = np.einsum("ij,ij->i", vectors, centroids[pos])
+    counts = np.bincount(pos, minlength=len(cluster_ids))
+    cohesion = np.bincount(pos, weights=member_sims, minlength=len(cluster_ids)) / counts
+
+    return cluster_ids, centroids, cohesion
+
+
+def assign_to_centroids(
+    vectors: np.ndarray, cluster_ids: np.ndarray, centroids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns: (cluster_id terdekat, cosine ke centroid tersebut) per baris."""
+    scores = vectors @ centroids.T
+    best = np.argmax(scores, axis=1)
+    return cluster_ids[best], scores[np.arange(len(vectors)), best]
+
+
+def cluster_drift(
+    vectors: np.ndarray, labels: np.ndarray, incremental: np.ndarray
+) -> Tuple[List[Dict], bool]:
+    """
+    Drift setiap cluster yang punya anggota incremental.
+
+    Args:
+        vectors: embedding ter-normalisasi semua anggota
+        labels: cluster_id per baris
+        incremental: True untuk baris hasil assign incremental
+
+    Returns:
+        (metrik per cluster, perlu re-cluster penuh?)
+    """
+    labels = np.asarray(labels)
+    incremental = np.asarray(incremental, dtype=bool)
+    original = ~incremental
+
+    cluster_ids, centroids, cohesion = cluster_centroids(
+        vectors[original], labels[original]
+    )
+    # Cluster yang anggota aslinya sudah terhapus tidak bisa dinilai
+    known = np.isin(labels, cluster_ids)
+    pos = np.searchsorted(cluster_ids, labels[known])
+    inc = incremental[known]
+    n = len(cluster_ids)
+
+    n_original = np.bincount(pos[~inc], minlength=n)
+    n_incremental = np.bincount(pos[inc], minlength=n)
+
+    all_centroids = normalize_rows(_centroid_sums(vectors[known], pos, n))
+    shift = 1.0 - np.sum(centroids * all_centroids, axis=1)
+
+    fit_sims = np.einsum("ij,ij->i", vectors[known][inc], centroids[pos[inc]])
+    mean_fit = np.bincount(pos[inc], weights=fit_sims, minlength=n) / np.maximum(
+        n_incremental, 1
+    )
+    fit = np.where(n_incremental > 0, mean_fit / np.maximum(cohesion, 1e-6), 1.0)
+    new_ratio = n_incremental / np.maximum(n_original, 1)
+
+    drifted = (n_incremental >= DRIFT_MIN_ROWS) & (
+        (new_ratio > DRIFT_MAX_NEW_RATIO)
+        | (shift > DRIFT_MAX_CENTROID_SHIFT)
+        | (fit < DRIFT_MIN_FIT)
+    )
+
+    metrics = [
+        {
+            "cluster_id": int(cluster_ids[c]),
+            "original_rows": int(n_original[c]),
+            "incremental_rows": int(n_incremental[c]),
+            "new_ratio": round(float(new_ratio[c]), 4),
+            "centroid_shift": round(float(shift[c]), 4),
+            "fit": round(float(fit[c]), 4),
+            "drifted": bool(drifted[c]),
+        }
+        for c in np.flatnonzero(n_incremental)
+    ]
+
+    total_ratio = n_incremental.sum() / max(int(n_original.sum()), 1)
+    needs_recluster = bool(drifted.any()) or (
+        int(n_incremental.sum()) >= DRIFT_MIN_ROWS and total_ratio > DRIFT_MAX_NEW_RATIO
+    )
+    return metrics, needs_recluster
+
+
+def assign_new_rows(
+    clustered_embeddings: np.ndarray,
+    clustered_labels: np.ndarray,
+    clustered_incremental: np.ndarray,
+    new_embeddings: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assign baris baru ke centroid anggota asli (bukan hasil incremental
+    sebelumnya, supaya centroid tidak ikut bergeser).
+
+    Returns:
+        (cluster_id, cosine ke centroid) per baris baru
+    """
+    vectors = normalize_rows(clustered_embeddings)
+    original = ~np.asarray(clustered_incremental, dtype=bool)
+    cluster_ids, centroids, _ = cluster_centroids(
+        vectors[original], np.asarray(clustered_labels)[original]
+    )
+    return assign_to_centroids(normalize_rows(new_embeddings), cluster_ids, centroids)
+
+
+# ===============================
+# LOAD
+# ===============================
+INOVASI_COLUMNS_SQL = """
+    d.id,
+    d.judul_inovasi,
+    d.urusan_utama,
+    d.tahapan_inovasi,
+    d.label_kematangan,
+    d.admin_opd
+"""
+
+
+async def _load_clustered(run_id: int) -> pd.DataFrame:
+    rows = await database.fetch_all(
+        f"""
+        SELECT {INOVASI_COLUMNS_SQL}, c.cluster_id, c.model_version
+        FROM clustering_result c
+        JOIN data_inovasi d ON d.id = c.id_inovasi
+        WHERE c.run_id = :run_id AND d.judul_inovasi IS NOT NULL
+        ORDER BY d.id
+        """,
+        {"run_id": run_id},
+    )
+    return pd.DataFrame([dict(r) for r in rows])
+
+
+async def _load_unclustered(run_id: int) -> pd.DataFrame:
+    rows = await database.fetch_all(
+        f"""
+        SELECT {INOVASI_COLUMNS_SQL}
+        FROM data_inovasi d
+        WHERE d.judul_inovasi IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM clustering_result c
+              WHERE c.run_id = :run_id AND c.id_inovasi = d.id
+          )
+        ORDER BY d.id
+        """,
+        {"run_id": run_id},
+    )
+    return pd.DataFrame([dict(r) for r in rows])
+
+
+async def _load_by_ids(ids: Sequence[int]) -> pd.DataFrame:
+    rows = []
+    for placeholders, values in id_chunks(ids):
+        rows += await database.fetch_all(
+            f"""
+            SELECT {INOVASI_COLUMNS_SQL}
+            FROM data_inovasi d
+            WHERE d.judul_inovasi IS NOT NULL AND d.id IN ({placeholders})
+            ORDER BY d.id
+            """,
+            values,
+        )
+    return pd.DataFrame([dict(r) for r in rows])
+
+
+async def _count_run_rows(run_id: int, ids: Sequence[int]) -> int:
+    total = 0
+    for placeholders, values in id_chunks(ids):
+        total += await database.fetch_val(
+            f"""
+            SELECT COUNT(*) FROM clustering_result
+            WHERE run_id = :run_id AND id_inovasi IN ({placeholders})
+            """,
+            {**values, "run_id": run_id},
+        )
+    return total
+
+
+def _delete_statements(run_id: int, ids: Sequence[int]) -> List[Tuple[str, Dict]]:
+    statements = []
+    for placeholders, values in id_chunks(ids):
+        values = {**values, "run_id": run_id}
+        statements += [
+            (
+                f"""
+                DELETE FROM clustering_result
+                WHERE run_id = :run_id AND id_inovasi IN ({placeholders})
+                """,
+                values,
+            ),
+            (
+                f"""
+                DELETE FROM similarity_neighbor
+                WHERE run_id = :run_id
+                  AND (inovasi_id_1 IN ({placeholders})
+                       OR inovasi_id_2 IN ({placeholders}))
+                """,
+                values,
+            ),
+        ]
+    return statements
+
+
+# ===============================
+# MAIN
+# ===============================
+def _assign_and_measure(clustered: pd.DataFrame, new_df: pd.DataFrame, old_emb, new_emb):
+    from app.services.clustering_service import build_neighbor_pairs
+
+    old_labels = clustered["cluster_id"].to_numpy(dtype=np.int64)
+    old_incremental = (clustered["model_version"] == INCREMENTAL_VERSION).to_numpy()
+
+    new_labels, centroid_sims = assign_new_rows(old_emb, old_labels, old_incremental, new_emb)
+
+    embeddings = np.vstack([old_emb, new_emb])
+    labels = np.concatenate([old_labels, new_labels])
+    incremental = np.concatenate([old_incremental, np.ones(len(new_df), dtype=bool)])
+
+    drift, needs_recluster = cluster_drift(
+        normalize_rows(embeddings), labels, incremental
+    )
+
+    # Tetangga hanya dicari untuk baris baru, terhadap semua baris
+    opd = pd.concat([clustered["admin_opd"], new_df["admin_opd"]]).fillna("")
+    pairs = build_neighbor_pairs(
+        embeddings,
+        labels,
+        opd.to_numpy(),
+        rows=np.arange(len(clustered), len(embeddings)),
+    )
+    return new_labels, centroid_sims, labels, pairs, drift, needs_recluster
+
+
+async def run_incremental_assignment(changes: Optional[ChangeSet] = None) -> Dict:
+    """
+    Assign inovasi yang belum ter-cluster ke run aktif.
+
+    Args:
+        changes: perubahan sejak watermark clustering (change_tracking).
+            Kalau ada, hanya id di dalamnya yang diproses: id yang dihapus /
+            berubah dibuang dari run lalu yang masih ada di-assign ulang.
+            Tanpa changes, baris yang belum ada di run dicari dengan scan penuh.
+
+    Returns:
+        status, jumlah baris yang di-assign / dibuang, metrik drift per
+        cluster, dan needs_full_recluster (True kalau clustering penuh perlu
+        dijalankan)
+    """
+    from app.services.clustering_service import (
+        CLUSTERING_RESULT_COLUMNS,
+        NEIGHBOR_COLUMNS,
+        build_embeddings,
+        clustering_result_rows,
+        load_cache_from_database,
+        neighbor_rows,
+    )
+
+    async with _incremental_lock:
+        active = await get_active_run()
+        if not active:
+            return {
+                "status": "skipped",
+                "reason": "Belum ada run clustering aktif",
+                "needs_full_recluster": True,
+            }
+
+        run_id = active["run_id"]
+        already_flagged = bool(active.get("needs_recluster"))
+
+        if changes is not None and changes.complete:
+            removed_ids = sorted(set(changes.upserted) | set(changes.deleted))
+            new_df = await _load_by_ids(changes.upserted)
+        else:
+            removed_ids = []
+            new_df = await _load_unclustered(run_id)
+
+        if new_df.empty and not removed_ids:
+            return {
+                "status": "skipped",
+                "reason": "Tidak ada data baru",
+                "needs_full_recluster": already_flagged,
+            }
+
+        # Baris lama dari id yang berubah / dihapus dibuang (lihat before);
+        # dihitung langsung dari run karena id terhapus tidak ikut ter-JOIN
+        removed_rows = await _count_run_rows(run_id, removed_ids)
+        clustered = await _load_clustered(run_id)
+        if not clustered.empty:
+            clustered = clustered[~clustered["id"].isin(removed_ids)]
+            clustered = clustered.reset_index(drop=True)
+
+        if clustered.empty:
+            return {
+                "status": "skipped",
+                "reason": "Run aktif tidak punya hasil cluster",
+                "needs_full_recluster": True,
+            }
+
+        print(
+            f"🧩 Incremental assignment: {len(new_df)} new/changed rows, "
+            f"{removed_rows} removed -> run {run_id}"
+        )
+
+        tables = {}
+        drift, needs_recluster = [], False
+
+        if not new_df.empty:
+            old_emb = await build_embeddings(clustered)
+            new_emb = await build_embeddings(new_df)
+            await embedding_store.save_async()
+
+            (
+                new_labels,
+                centroid_sims,
+                labels,
+                pairs,
+                drift,
+                needs_recluster,
+            ) = await asyncio.to_thread(
+                _assign_and_measure, clustered, new_df, old_emb, new_emb
+            )
+
+            now = datetime.utcnow()
+            all_df = pd.concat([clustered, new_df], ignore_index=True)
+            tables = {
+                "clustering_result": (
+                    CLUSTERING_RESULT_COLUMNS,
+                    clustering_result_rows(
+                        new_df,
+                        new_labels,
+                        active["model_name"],
+                        now,
+                        run_id,
+                        model_version=INCREMENTAL_VERSION,
+                    ),
+                ),
+                "similarity_neighbor": (
+                    NEIGHBOR_COLUMNS,
+                    neighbor_rows(all_df, labels, pairs, now, run_id),
+                ),
+            }
+            print(
+                f"✅ Assigned {len(new_df)} rows "
+                f"(mean centroid similarity {float(np.mean(centroid_sims)):.3f})"
+            )
+
+        needs_recluster = needs_recluster or already_flagged
+        await insert_tables(tables, before=_delete_statements(run_id, removed_ids))
+        await record_incremental(
+            run_id, len(new_df), needs_recluster, removed_rows=removed_rows
+        )
+
+    await load_cache_from_database()
+
+    drifted = [m["cluster_id"] for m in drift if m["drifted"]]
+    print(f"✅ Incremental update done, drifted clusters: {drifted or '-'}")
+    if needs_recluster:
+        print("⚠️ Cluster drift over threshold, full re-cluster needed")
+
+    return {
+        "status": "ok",
+        "run_id": run_id,
+        "assigned": len(new_df),
+        "removed": removed_rows,
+        "drift": drift,
+        "drifted_clusters": drifted,
+        "needs_full_recluster": needs_recluster,
+    }
@@ -0,0 +1,236 @@
+"""
+Columnar Store untuk Metadata Inovasi
+Pengganti list-of-dict di cache vector search. Setiap kolom disimpan sebagai
+array: kolom kategori (OPD, urusan, tahapan, dst.) di-encode menjadi kode
+integer + daftar kategori, judul digabung dalam satu blob UTF-8 (uint8) +
+offset byte. Semua bagian berupa array numpy, jadi bisa di-mmap bersama
+lewat shared_snapshot (tidak ada teks besar di meta.json).
+
+Tetap bisa dipakai seperti list lama: len(store), store[i] -> dict, iterasi.
+
+Kolom kategori juga punya posting list (row id per nilai) untuk pre-filter
+vector search, misal urusan_utama="Kesehatan" atau jenis="Digital".
+"""
+
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+TEXT_COLUMNS = ("judul_inovasi",)
+CATEGORY_COLUMNS = (
+    "admin_opd",
+    "urusan_utama",
+    "tahapan_inovasi",
+    "label_kematangan",
+    "bentuk_inovasi",
+    "jenis",
+)
+
+
+class CategoryColumn:
+    """Kolom kategori: kode int32 per baris + daftar nilai unik (-1 = NULL)."""
+
+    def __init__(self, values: List[Optional[str]]):
+        self.categories: List[str] = []
+        lookup: Dict[str, int] = {}
+        codes = np.empty(len(values), dtype=np.int32)
+
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = -1
+                continue
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self.categories)
+                self.categories.append(value)
+            codes[i] = code
+
+        self.codes = codes
+        self._lookup = lookup
+        self._postings: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_arrays(cls, codes: np.ndarray, categories: List[str]) -> "CategoryColumn":
+        column = cls.__new__(cls)
+        column.codes = codes
+        column.categories = categories
+        column._lookup = {value: code for code, value in enumerate(categories)}
+        column._postings = None
+        return column
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        code = self.codes[row]
+        return self.categories[code] if code >= 0 else None
+
+    def code_of(self, value: str) -> int:
+        return self._lookup.get(value, -2)
+
+    def codes_matching(self, value: str) -> List[int]:
+        """Kode untuk nilai persis, atau semua yang sama tanpa beda huruf besar."""
+        code = self._lookup.get(value)
+        if code is not None:
+            return [code]
+        folded = value.strip().casefold()
+        return [c for c, v in enumerate(self.categories) if v.casefold() == folded]
+
+    def rows_for(self, values: Sequence[str]) -> np.ndarray:
+        """Row id (urut) yang nilainya salah satu dari `values`."""
+        if self._postings is None:
+            # Posting list: row id dikelompokkan per kode (argsort stabil)
+            valid = self.codes >= 0
+            order = np.flatnonzero(valid)[np.argsort(self.codes[valid], kind="stable")]
+            counts = np.bincount(self.codes[valid], minlength=len(self.categories))
+            self._postings = (order, np.concatenate([[0], np.cumsum(counts)]))
+
+        order, offsets = self._postings
+        codes = {c for value in values for c in self.codes_matching(value)}
+        parts = [order[offsets[c] : offsets[c + 1]] for c in sorted(codes)]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(len(c.encode("utf-8")) for c in self.categories)
+
+
+def encode_strings(values: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """List string -> (offset byte int64, blob UTF-8 uint8)."""
+    parts = [(v or "").encode("utf-8") for v in values]
+    lengths = np.fromiter((len(p) for p in parts), dtype=np.int64, count=len(parts))
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    return offsets, np.frombuffer(b"".join(parts), dtype=np.uint8)
+
+
+def decode_strings(offsets: np.ndarray, blob: np.ndarray) -> List[str]:
+    data = bytes(blob)
+    return [
+        data[start:end].decode("utf-8")
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+class TextColumn:
+    """Kolom teks bebas: satu blob UTF-8 (uint8) + offset byte tiap baris."""
+
+    def __init__(self, values: List[Optional[str]]):
+        self.offsets, self.blob = encode_strings(values)
+
+    @classmethod
+    def from_arrays(cls, offsets: np.ndarray, blob: np.ndarray) -> "TextColumn":
+        column = cls.__new__(cls)
+        column.offsets = offsets
+        column.blob = blob
+        return column
+
+    def __getitem__(self, row: int) -> str:
+        return bytes(self.blob[self.offsets[row] : self.offsets[row + 1]]).decode(
+            "utf-8"
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.blob.nbytes
+
+
+class InovasiColumns:
+    def __init__(self, rows: List[Dict], signatures: Optional[np.ndarray] = None):
+        self.ids = np.fromiter((r["id"] for r in rows), dtype=np.int64, count=len(rows))
+        self.signatures = (
+            signatures
+            if signatures is not None
+            else np.zeros(len(rows), dtype=np.uint64)
+        )
+        self.columns: Dict[str, object] = {}
+
+        for name in TEXT_COLUMNS:
+            self.columns[name] = TextColumn([r.get(name) for r in rows])
+        for name in CATEGORY_COLUMNS:
+            self.columns[name] = CategoryColumn([r.get(name) for r in rows])
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Semua kolom sebagai array (bisa di-mmap); metadata JSON kosong."""
+        arrays = {"ids": self.ids, "signatures": self.signatures}
+
+        for name in TEXT_COLUMNS:
+            arrays[f"text_{name}"] = self.columns[name].offsets
+            arrays[f"textblob_{name}"] = self.columns[name].blob
+        for name in CATEGORY_COLUMNS:
+            arrays[f"cat_{name}"] = self.columns[name].codes
+            offsets, blob = encode_strings(self.columns[name].categories)
+            arrays[f"catoffsets_{name}"] = offsets
+            arrays[f"catblob_{name}"] = blob
+
+        return arrays, {}
+
+    @classmethod
+    def from_arrays(
+        cls, arrays: Dict[str, np.ndarray], meta: Optional[Dict] = None
+    ) -> "InovasiColumns":
+        store = cls.__new__(cls)
+        store.ids = arrays["ids"]
+        store.signatures = arrays["signatures"]
+        store.columns = {}
+
+        for name in TEXT_COLUMNS:
+            store.columns[name] = TextColumn.from_arrays(
+                arrays[f"text_{name}"], arrays[f"textblob_{name}"]
+            )
+        for name in CATEGORY_COLUMNS:
+            # Daftar kategori kecil (nilai unik), di-decode per worker
+            store.columns[name] = CategoryColumn.from_arrays(
+                arrays[f"cat_{name}"],
+                decode_strings(arrays[f"catoffsets_{name}"], arrays[f"catblob_{name}"]),
+            )
+
+        return store
+
+    def filter_rows(
+        self, filters: Optional[Dict[str, Union[str, Sequence[str]]]]
+    ) -> Optional[np.ndarray]:
+        """
+        Row id yang lolos semua filter (AND antar kolom, OR antar nilai).
+        None berarti tanpa filter (semua baris).
+        """
+        active = {k: v for k, v in (filters or {}).items() if v}
+        if not active:
+            return None
+
+        rows: Optional[np.ndarray] = None
+        for name, values in active.items():
+            column = self.columns.get(name)
+            if not isinstance(column, CategoryColumn):
+                raise ValueError(f"Kolom filter tidak dikenali: {name}")
+
+            if isinstance(values, str):
+                values = [values]
+            matched = column.rows_for(values)
+            rows = (
+                matched
+                if rows is None
+                else np.intersect1d(rows, matched, assume_unique=True)
+            )
+            if rows.size == 0:
+                break
+
+        return rows
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row: int) -> Dict:
+        item = {"id": int(self.ids[row])}
+        for name, column in self.columns.items():
+            item[name] = column[row]
+        return item
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self)):
+            yield self[row]
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.ids.nbytes
+            + self.signatures.nbytes
+            + sum(column.nbytes for column in self.columns.values())
+        )
@@ -0,0 +1,471 @@
+"""
+Background Job Runner
+Job berat (clustering) dijalankan sebagai asyncio task di dalam proses,
+bukan di jalur startup / request. Status, progress (0-100), hasil, dan error
+setiap job disimpan di tabel background_job, dipantau lewat /admin/jobs.
+
+- Satu job berjalan dalam satu waktu, juga lintas worker / proses: selain
+  _run_lock (per proses), job harus memegang lease baris job_lock di
+  database. Lease diperpanjang heartbeat dan kedaluwarsa sendiri kalau
+  pemegangnya mati. Job lain menunggu "queued".
+- Selama job dengan kind yang sama masih queued/running (di proses mana
+  pun, heartbeat masih segar), submit_job mengembalikan job tersebut.
+- Setiap job mencatat owner (proses) dan heartbeat_at; saat startup hanya
+  job yang heartbeat-nya basi (pemiliknya sudah mati) ditandai gagal.
+- Cancel: job queued langsung batal, job running berhenti di titik await
+  berikutnya (asyncio.CancelledError). Job milik worker lain ditandai
+  cancel_requested; heartbeat pemiliknya yang membatalkan task-nya.
+"""
+
+import os
+import json
+import uuid
+import socket
+import asyncio
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.database import database
+
+# ===============================
+# CONFIG
+# ===============================
+ACTIVE_STATUSES = ("queued", "running")
+MEMORY_JOBS_KEEP = 50  # job selesai yang tetap disimpan di memory
+HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+# Job / lease tanpa heartbeat selama ini dianggap milik proses yang mati
+STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", str(4 * HEARTBEAT_SECONDS)))
+LOCK_POLL_SECONDS = float(os.getenv("JOB_LOCK_POLL_SECONDS", "2"))
+RUN_LOCK_NAME = "job_runner"
+
+# Identitas proses ini (owner job & lease)
+OWNER_ID = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# progress(persen, pesan) dipanggil job untuk melaporkan kemajuan
+ProgressFn = Callable[[float, Optional[str]], Awaitable[None]]
+JobFn = Callable[[ProgressFn], Awaitable[Any]]
+
+JOB_FIELDS = (
+    "job_id",
+    "kind",
+    "status",
+    "progress",
+    "message",
+    "result",
+    "error",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "owner",
+    "heartbeat_at",
+)
+
+_jobs: Dict[str, Dict] = {}  # job milik proses ini, job_id -> record
+_tasks: Dict[str, asyncio.Task] = {}
+_run_lock = asyncio.Lock()
+_heartbeat_task: Optional[asyncio.Task] = None
+
+
+# ===============================
+# PERSISTENCE
+# ===============================
+def _row_values(job: Dict) -> Dict:
+    values = {field: job[field] for field in JOB_FIELDS}
+    values["result"] = (
+        json.dumps(job["result"], default=str) if job["result"] is not None else None
+    )
+    return values
+
+
+async def _insert(job: Dict) -> bool:
+    """
+    Insert kondisional: gagal (False) kalau sudah ada job kind yang sama yang
+    masih hidup, mis. baru saja di-submit worker lain.
+    """
+    values = _row_values(job)
+    values["same_kind"] = job["kind"]
+    values["fresh"] = job["created_at"] - timedelta(seconds=STALE_SECONDS)
+    await database.execute(
+        f"""
+        INSERT INTO background_job ({", ".join(JOB_FIELDS)})
+        SELECT {", ".join(f":{field}" for field in JOB_FIELDS)}
+        WHERE NOT EXISTS (
+            SELECT 1 FROM background_job
+            WHERE kind = :same_kind AND status IN ('queued', 'running')
+              AND heartbeat_at >= :fresh
+        )
+        """,
+        values,
+    )
+    inserted = await database.fetch_val(
+        "SELECT 1 FROM background_job WHERE job_id = :job_id",
+        {"job_id": job["job_id"]},
+    )
+    return bool(inserted)
+
+
+async def _save(job: Dict):
+    # Gagal menulis status tidak boleh menghentikan job
+    try:
+        await database.execute(
+            f"""
+            UPDATE background_job
+            SET {", ".join(f"{field} = :{field}" for field in JOB_FIELDS[2:])}
+            WHERE job_id = :job_id
+            """,
+            {k: v for k, v in _row_values(job).items() if k != "kind"},
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to save job {job['job_id']}: {e}")
+
+
+def _from_row(row) -> Dict:
+    job = dict(row)
+    if job.get("result"):
+        try:
+            job["result"] = json.loads(job["result"])
+        except ValueError:
+            pass
+    return job
+
+
+# ===============================
+# LEASE LINTAS PROSES (job_lock)
+# ===============================
+async def _ensure_lock_row(name: str):
+    try:
+        await database.execute(
+            """
+            INSERT INTO job_lock (name)
+            SELECT :name WHERE NOT EXISTS (SELECT 1 FROM job_lock WHERE name = :existing)
+            """,
+            {"name": name, "existing": name},
+        )
+    except Exception as e:
+        # Biasanya proses lain membuatnya bersamaan (unique violation)
+        print(f"⚠️ job_lock row {name}: {e}")
+
+
+async def _try_acquire_lease(job_id: str, name: str = RUN_LOCK_NAME) -> bool:
+    """
+    Ambil lease kalau kosong / kedaluwarsa. UPDATE satu baris bersifat atomik
+    (Postgres mengecek ulang WHERE setelah row lock), jadi hanya satu proses
+    yang menang; hasilnya dicek dengan membaca ulang pemegangnya.
+    """
+    await _ensure_lock_row(name)
+    now = datetime.utcnow()
+    await database.execute(
+        """
+        UPDATE job_lock
+        SET owner = :owner, job_id = :job_id, expires_at = :expires
+        WHERE name = :name
+          AND (job_id IS NULL OR job_id = :job_id OR expires_at < :now)
+        """,
+        {
+            "name": name,
+            "owner": OWNER_ID,
+            "job_id": job_id,
+            "expires": now + timedelta(seconds=STALE_SECONDS),
+            "now": now,
+        },
+    )
+    holder = await database.fetch_val(
+        "SELECT job_id FROM job_lock WHERE name = :name", {"name": name}
+    )
+    return holder == job_id
+
+
+async def _release_lease(job_id: str, name: str = RUN_LOCK_NAME):
+    try:
+        await database.execute(
+            """
+            UPDATE job_lock SET owner = NULL, job_id = NULL, expires_at = NULL
+            WHERE name = :name AND job_id = :job_id
+            """,
+            {"name": name, "job_id": job_id},
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to release job lock for {job_id}: {e}")
+
+
+async def _cancel_requested_jobs():
+    """Cancel task proses ini yang diminta batal dari worker lain."""
+    rows = await database.fetch_all(
+        """
+        SELECT job_id FROM background_job
+        WHERE owner = :owner AND cancel_requested = :requested
+          AND status IN ('queued', 'running')
+        """,
+        {"owner": OWNER_ID, "requested": True},
+    )
+    for row in rows:
+        task = _tasks.get(row["job_id"])
+        if task is not None and not task.done():
+            print(f"🛑 Cancel requested by another worker ({row['job_id']})")
+            task.cancel()
+
+
+async def _heartbeat_loop():
+    """
+    Perbarui heartbeat job aktif proses ini, perpanjang lease-nya, dan
+    jalankan cancel yang diminta worker lain.
+    """
+    while _tasks:
+        now = datetime.utcnow()
+        try:
+            for job in [j for j in _jobs.values() if j["status"] in ACTIVE_STATUSES]:
+                job["heartbeat_at"] = now
+                await database.execute(
+                    "UPDATE background_job SET heartbeat_at = :ts WHERE job_id = :id",
+                    {"ts": now, "id": job["job_id"]},
+                )
+            await _cancel_requested_jobs()
+            await database.execute(
+                """
+                UPDATE job_lock SET expires_at = :expires
+                WHERE name = :name AND owner = :owner
+                """,
+                {
+                    "name": RUN_LOCK_NAME,
+                    "owner": OWNER_ID,
+                    "expires": now + timedelta(seconds=STALE_SECONDS),
+                },
+            )
+        except Exception as e:
+            print(f"⚠️ Job heartbeat failed: {e}")
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+
+
+def _ensure_heartbeat():
+    global _heartbeat_task
+    if _heartbeat_task is None or _heartbeat_task.done():
+        _heartbeat_task = asyncio.create_task(_heartbeat_loop())
+
+
+async def _find_active_job(kind: str) -> Optional[Dict]:
+    """Job kind ini yang masih hidup di proses mana pun."""
+    for job in _jobs.values():
+        if job["kind"] == kind and job["status"] in ACTIVE_STATUSES:
+            return dict(job)
+
+    row = await database.fetch_one(
+        """
+        SELECT * FROM background_job
+        WHERE kind = :kind AND status IN ('queued', 'running')
+          AND heartbeat_at >= :fresh
+        ORDER BY created_at DESC
+        LIMIT 1
+        """,
+        {
+            "kind": kind,
+            "fresh": datetime.utcnow() - timedelta(seconds=STALE_SECONDS),
+        },
+    )
+    return _from_row(row) if row else None
+
+
+# ===============================
+# RUN
+# ===============================
+async def submit_job(kind: str, fn: JobFn) -> Tuple[Dict, bool]:
+    """
+    Antrikan job.
+
+    Returns:
+        (record job, True kalau job baru dibuat / False kalau job yang sama
+        masih berjalan)
+    """
+    existing = await _find_active_job(kind)
+    if existing:
+        return existing, False
+
+    now = datetime.utcnow()
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "queued",
+        "progress": 0.0,
+        "message": None,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "owner": OWNER_ID,
+        "heartbeat_at": now,
+    }
+    if not await _insert(job):
+        existing = await _find_active_job(kind)
+        if existing:
+            return existing, False
+        raise RuntimeError(f"Job {kind} gagal diantrikan")
+
+    _jobs[job["job_id"]] = job
+    task = asyncio.create_task(_run(job, fn))
+    task.add_done_callback(lambda _, job=job: _cancelled_before_start(job))
+    _tasks[job["job_id"]] = task
+    _forget_finished()
+    _ensure_heartbeat()
+
+    print(f"🗂️ Job {job['kind']} queued ({job['job_id']})")
+    return dict(job), True
+
+
+async def _run(job: Dict, fn: JobFn):
+    async def progress(percent: float, message: Optional[str] = None):
+        job["progress"] = round(min(max(float(percent), 0.0), 100.0), 1)
+        job["message"] = message
+        await _save(job)
+
+    leased = False
+    try:
+        async with _run_lock:
+            # Tunggu giliran lintas proses (lease job_lock)
+            while not await _try_acquire_lease(job["job_id"]):
+                if job["message"] is None:
+                    job["message"] = "Waiting for a job in another worker"
+                    await _save(job)
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+            leased = True
+
+            job.update(status="running", started_at=datetime.utcnow(), message=None)
+            await _save(job)
+            print(f"▶️ Job {job['kind']} started ({job['job_id']})")
+
+            result = await fn(progress)
+
+        job.update(status="succeeded", progress=100.0, result=result)
+
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+
+    except Exception as e:
+        job.update(status="failed", error=str(e))
+        traceback.print_exc()
+
+    finally:
+        job["finished_at"] = datetime.utcnow()
+        _tasks.pop(job["job_id"], None)
+        await _save(job)
+        if leased:
+            await _release_lease(job["job_id"])
+        print(f"⏹️ Job {job['kind']} {job['status']} ({job['job_id']})")
+
+
+def _cancelled_before_start(job: Dict):
+    # Task yang di-cancel sebelum sempat jalan tidak melewati finally di _run
+    if job["status"] in ACTIVE_STATUSES:
+        job.update(status="cancelled", finished_at=datetime.utcnow())
+        _tasks.pop(job["job_id"], None)
+        asyncio.ensure_future(_save(job))
+
+
+def _forget_finished():
+    finished = [
+        job_id
+        for job_id, job in _jobs.items()
+        if job["status"] not in ACTIVE_STATUSES
+    ]
+    for job_id in finished[: max(0, len(finished) - MEMORY_JOBS_KEEP)]:
+        _jobs.pop(job_id, None)
+
+
+async def cancel_job(job_id: str) -> Tuple[Optional[Dict], bool]:
+    """
+    Cancel job queued / running.
+
+    Job di proses ini langsung di-cancel. Job milik worker lain ditandai
+    cancel_requested dan dibatalkan oleh heartbeat pemiliknya (paling lama
+    HEARTBEAT_SECONDS); kalau pemiliknya sudah mati (heartbeat basi) job
+    langsung ditandai cancelled.
+
+    Returns:
+        (record job atau None kalau job tidak aktif, True kalau dibatalkan
+        di proses ini / False kalau ditangani lewat database)
+    """
+    task = _tasks.get(job_id)
+    if task is not None and not task.done():
+        task.cancel()
+        return dict(_jobs[job_id]), True
+
+    job = await get_job(job_id)
+    if job is None or job["status"] not in ACTIVE_STATUSES:
+        return None, False
+
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=STALE_SECONDS)
+    await database.execute(
+        """
+        UPDATE background_job
+        SET status = 'cancelled', finished_at = :ts
+        WHERE job_id = :id AND status IN ('queued', 'running')
+          AND (heartbeat_at IS NULL OR heartbeat_at < :stale)
+        """,
+        {"id": job_id, "ts": now, "stale": stale},
+    )
+    await database.execute(
+        """
+        UPDATE background_job SET cancel_requested = :requested
+        WHERE job_id = :id AND status IN ('queued', 'running')
+        """,
+        {"id": job_id, "requested": True},
+    )
+
+    return await get_job(job_id), False
+
+
+# ===============================
+# QUERY
+# ===============================
+async def get_job(job_id: str) -> Optional[Dict]:
+    if job_id in _jobs:
+        return dict(_jobs[job_id])
+
+    row = await database.fetch_one(
+        "SELECT * FROM background_job WHERE job_id = :id", {"id": job_id}
+    )
+    return _from_row(row) if row else None
+
+
+async def list_jobs(limit: int = 20) -> List[Dict]:
+    rows = await database.fetch_all(
+        """
+        SELECT * FROM background_job
+        ORDER BY created_at DESC
+        LIMIT :limit
+        """,
+        {"limit": limit},
+    )
+    # Record di memory lebih baru dari baris DB (progress terakhir)
+    return [dict(_jobs.get(row["job_id"]) or _from_row(row)) for row in rows]
+
+
+# ===============================
+# LIFECYCLE
+# ===============================
+async def recover_interrupted_jobs():
+    """
+    Job queued/running yang pemiliknya sudah mati (heartbeat basi) ditandai
+    gagal. Job worker lain yang masih hidup tidak disentuh.
+    """
+    now = datetime.utcnow()
+    await database.execute(
+        """
+        UPDATE background_job
+        SET status = 'failed', error = 'Interrupted by restart', finished_at = :ts
+        WHERE status IN ('queued', 'running')
+          AND (heartbeat_at IS NULL OR heartbeat_at < :stale)
+        """,
+        {"ts": now, "stale": now - timedelta(seconds=STALE_SECONDS)},
+    )
+
+
+async def shutdown_jobs():
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
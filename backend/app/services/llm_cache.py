@@ -0,0 +1,289 @@
+"""
+LLM Response Cache
+Jawaban Gemini disimpan dengan key sha256(mode, model, prompt), jadi input
+yang sama (pasangan inovasi yang dibuka berulang dari CollaborationDetail /
+ReportAIRecommendation, pertanyaan chatbot yang sama) tidak memanggil model
+lagi selama belum kedaluwarsa.
+
+- Tier 1: LRU in-memory (LLM_CACHE_MEMORY_ITEMS entri) per proses.
+- Tier 2: tabel llm_response_cache, dipakai bersama semua worker dan
+  bertahan setelah restart. Dibatasi LLM_CACHE_MAX_ROWS (yang paling lama
+  tidak dipakai dibuang) dan expires_at.
+- TTL per mode: LLM_CACHE_TTL_<MODE>, default LLM_CACHE_TTL_SECONDS.
+- Hasil JSON disimpan sudah di-parse; jawaban yang gagal di-parse tidak
+  disimpan.
+- Request bersamaan dengan key yang sama berbagi satu panggilan model.
+  Panggilan baru di-cancel kalau semua client yang menunggunya putus.
+"""
+
+import os
+import json
+import hashlib
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.database import database
+from app.services.ai_service import MODEL_NAME, call_gemini_async, run_until_disconnected
+
+# ===============================
+# CONFIG
+# ===============================
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "256"))
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "5000"))
+PRUNE_EVERY_WRITES = 50
+
+# key -> (expires_at, is_json, value)
+_memory: "OrderedDict[str, Tuple[datetime, bool, Any]]" = OrderedDict()
+_inflight: Dict[str, List] = {}  # key -> [task, jumlah penunggu]
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "writes": 0}
+
+
+def cache_key(mode: str, model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{mode}\0{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def ttl_for(mode: str) -> int:
+    return int(os.getenv(f"LLM_CACHE_TTL_{mode.upper()}", str(LLM_CACHE_TTL_SECONDS)))
+
+
+def parse_json_response(text: str) -> Any:
+    """Jawaban model -> objek JSON (pagar ```json dibuang). ValueError kalau invalid."""
+    return json.loads(text.strip().replace("```json", "").replace("```", ""))
+
+
+# ===============================
+# TIER 1: MEMORY (LRU)
+# ===============================
+def _memory_get(key: str, now: datetime) -> Optional[Tuple[bool, Any]]:
+    entry = _memory.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= now:
+        del _memory[key]
+        return None
+    _memory.move_to_end(key)
+    return entry[1], entry[2]
+
+
+def _memory_put(key: str, expires_at: datetime, is_json: bool, value: Any):
+    _memory[key] = (expires_at, is_json, value)
+    _memory.move_to_end(key)
+    while len(_memory) > LLM_CACHE_MEMORY_ITEMS:
+        _memory.popitem(last=False)
+
+
+# ===============================
+# TIER 2: DATABASE
+# ===============================
+async def _db_get(key: str, now: datetime) -> Optional[Tuple[datetime, bool, Any]]:
+    row = await database.fetch_one(
+        """
+        SELECT response, is_json, expires_at FROM llm_response_cache
+        WHERE cache_key = :key AND expires_at > :now
+        """,
+        {"key": key, "now": now},
+    )
+    if not row:
+        return None
+
+    await database.execute(
+        """
+        UPDATE llm_response_cache
+        SET hits = hits + 1, last_hit_at = :now
+        WHERE cache_key = :key
+        """,
+        {"key": key, "now": now},
+    )
+    is_json = bool(row["is_json"])
+    value = json.loads(row["response"]) if is_json else row["response"]
+    return row["expires_at"], is_json, value
+
+
+async def _db_put(
+    key: str, mode: str, now: datetime, expires_at: datetime, is_json: bool, value: Any
+):
+    values = {
+        "key": key,
+        "mode": mode,
+        "model": MODEL_NAME,
+        "response": json.dumps(value, ensure_ascii=False) if is_json else value,
+        "is_json": is_json,
+        "now": now,
+        "expires_at": expires_at,
+    }
+    async with database.transaction():
+        await database.execute(
+            "DELETE FROM llm_response_cache WHERE cache_key = :key", {"key": key}
+        )
+        await database.execute(
+            """
+            INSERT INTO llm_response_cache
+                (cache_key, mode, model, response, is_json, hits,
+                 created_at, last_hit_at, expires_at)
+            VALUES
+                (:key, :mode, :model, :response, :is_json, 0,
+                 :now, :now, :expires_at)
+            """,
+            values,
+        )
+
+
+async def prune_llm_cache() -> None:
+    """Buang baris kedaluwarsa, lalu yang paling lama tidak dipakai di atas batas."""
+    now = datetime.utcnow()
+    await database.execute(
+        "DELETE FROM llm_response_cache WHERE expires_at <= :now", {"now": now}
+    )
+
+    # Batas ukuran: last_hit_at baris ke-(MAX_ROWS + 1) jadi titik potong
+    cutoff = await database.fetch_val(
+        """
+        SELECT last_hit_at FROM llm_response_cache
+        ORDER BY last_hit_at DESC
+        LIMIT 1 OFFSET :max_rows
+        """,
+        {"max_rows": LLM_CACHE_MAX_ROWS},
+    )
+    if cutoff is not None:
+        await database.execute(
+            "DELETE FROM llm_response_cache WHERE last_hit_at <= :cutoff",
+            {"cutoff": cutoff},
+        )
+
+
+# ===============================
+# LOOKUP + CALL
+# ===============================
+async def _lookup(key: str, is_json: bool) -> Tuple[bool, Any]:
+    now = datetime.utcnow()
+
+    cached = _memory_get(key, now)
+    if cached is not None and cached[0] == is_json:
+        _stats["memory_hits"] += 1
+        return True, cached[1]
+
+    try:
+        stored = await _db_get(key, now)
+    except Exception as e:
+        print(f"⚠️ LLM cache read failed: {e}")
+        stored = None
+    if stored is not None and stored[1] == is_json:
+        _stats["db_hits"] += 1
+        _memory_put(key, *stored)
+        return True, stored[2]
+
+    return False, None
+
+
+async def _store(key: str, mode: str, is_json: bool, value: Any):
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_for(mode))
+    _memory_put(key, expires_at, is_json, value)
+
+    # Gagal menulis cache tidak boleh menggagalkan jawaban
+    try:
+        await _db_put(key, mode, now, expires_at, is_json, value)
+        _stats["writes"] += 1
+        if _stats["writes"] % PRUNE_EVERY_WRITES == 0:
+            await prune_llm_cache()
+    except Exception as e:
+        print(f"⚠️ LLM cache write failed: {e}")
+
+
+async def _fetch_and_store(key: str, prompt: str, mode: str, parse_json: bool) -> Any:
+    text = await call_gemini_async(prompt, mode)
+    value = parse_json_response(text) if parse_json else text
+    await _store(key, mode, parse_json, value)
+    return value
+
+
+async def _shared_call(key: str, prompt: str, mode: str, parse_json: bool, request):
+    entry = _inflight.get(key)
+    if entry is None:
+        task = asyncio.ensure_future(_fetch_and_store(key, prompt, mode, parse_json))
+        entry = _inflight[key] = [task, 0]
+        task.add_done_callback(
+            lambda _, entry=entry: _inflight.pop(key, None)
+            if _inflight.get(key) is entry
+            else None
+        )
+
+    task = entry[0]
+    entry[1] += 1
+    try:
+        # shield: putusnya satu client tidak membatalkan panggilan bersama
+        if request is None:
+            return await asyncio.shield(task)
+        return await run_until_disconnected(
+            asyncio.shield(task), request, f"Gemini {mode}"
+        )
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not task.done():
+            task.cancel()
+
+
+async def call_gemini_cached(
+    prompt: str, mode: str, parse_json: bool = False, request=None
+) -> Any:
+    """
+    call_gemini_async dengan cache.
+
+    Returns:
+        teks jawaban, atau objek JSON kalau parse_json
+
+    Raises:
+        ValueError: parse_json dan jawaban bukan JSON valid (tidak di-cache)
+        ClientDisconnected: lihat ai_service.call_gemini_async
+    """
+    if not LLM_CACHE_ENABLED:
+        text = await call_gemini_async(prompt, mode, request=request)
+        return parse_json_response(text) if parse_json else text
+
+    key = cache_key(mode, MODEL_NAME, prompt)
+    hit, value = await _lookup(key, parse_json)
+    if hit:
+        return value
+
+    _stats["misses"] += 1
+    return await _shared_call(key, prompt, mode, parse_json, request)
+
+
+# ===============================
+# ADMIN
+# ===============================
+async def get_llm_cache_stats() -> Dict:
+    rows = await database.fetch_val(
+        "SELECT COUNT(*) FROM llm_response_cache WHERE expires_at > :now",
+        {"now": datetime.utcnow()},
+    )
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        "memory_items": len(_memory),
+        "memory_limit": LLM_CACHE_MEMORY_ITEMS,
+        "db_rows": int(rows or 0),
+        "db_limit": LLM_CACHE_MAX_ROWS,
+        "inflight": len(_inflight),
+        **_stats,
+    }
+
+
+async def clear_llm_cache(mode: Optional[str] = None) -> int:
+    """Kosongkan cache (satu mode atau semua). Returns: jumlah baris DB dibuang."""
+    # Tier memory tidak menyimpan mode: selalu dikosongkan semua (murah)
+    _memory.clear()
+    where, values = ("WHERE mode = :mode", {"mode": mode}) if mode else ("", {})
+
+    count = await database.fetch_val(
+        f"SELECT COUNT(*) FROM llm_response_cache {where}", values
+    )
+    await database.execute(f"DELETE FROM llm_response_cache {where}", values)
+    return int(count or 0)
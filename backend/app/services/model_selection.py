@@ -0,0 +1,218 @@
+"""
+Model Selection Sweep untuk Clustering
+Versi service dari sweep di clustering_similarity.ipynb: KMeans dan
+Agglomerative untuk k = SWEEP_K_MIN..SWEEP_K_MAX plus DBSCAN, masing-masing
+dinilai dengan silhouette, Calinski-Harabasz, dan Davies-Bouldin. Pemenang =
+silhouette tertinggi (sama dengan notebook), DBSCAN hanya sah kalau tidak ada
+noise dan cluster > 1.
+
+- Kandidat di-fit paralel di process pool (spawn).
+- Embedding dan matriks jarak dibagikan ke worker lewat file .npy yang dibuka
+  dengan mmap: dihitung sekali, tidak di-pickle per kandidat.
+- Silhouette dihitung dari matriks jarak sampel SWEEP_SAMPLE_SIZE baris,
+  jadi tetap murah untuk n besar.
+- Kandidat hierarkis mengikuti CLUSTER_ENGINE (clustering_engines): di atas
+  CLUSTER_AGGLOMERATIVE_MAX_ROWS baris (atau engine two_stage) kandidat
+  Agglomerative diganti two_stage, karena beberapa Agglomerative paralel
+  butuh memori workers x O(n^2). Engine minibatch: tanpa kandidat
+  hierarkis (sudah diwakili KMeans).
+
+Modul ini sengaja tidak import app.database supaya ringan di-import worker.
+"""
+
+import os
+import time
+import tempfile
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sklearn.cluster import DBSCAN, AgglomerativeClustering, KMeans
+from sklearn.metrics import (
+    calinski_harabasz_score,
+    davies_bouldin_score,
+    pairwise_distances,
+    silhouette_score,
+)
+
+from app.services.clustering_engines import (
+    AGGLOMERATIVE_MAX_ROWS,
+    StreamingClusterer,
+    resolve_engine,
+)
+
+# ===============================
+# CONFIG
+# ===============================
+MODEL_SWEEP = os.getenv("CLUSTER_MODEL_SWEEP", "false").lower() in ("1", "true", "yes")
+SWEEP_K_MIN = int(os.getenv("CLUSTER_SWEEP_K_MIN", "2"))
+SWEEP_K_MAX = int(os.getenv("CLUSTER_SWEEP_K_MAX", "7"))
+SWEEP_WORKERS = int(os.getenv("CLUSTER_SWEEP_WORKERS", "0"))  # 0 = jumlah CPU
+SWEEP_SAMPLE_SIZE = int(os.getenv("CLUSTER_SWEEP_SAMPLE_SIZE", "2000"))
+DBSCAN_EPS = float(os.getenv("CLUSTER_DBSCAN_EPS", "0.7"))
+DBSCAN_MIN_SAMPLES = int(os.getenv("CLUSTER_DBSCAN_MIN_SAMPLES", "5"))
+SWEEP_SEED = 42
+
+Candidate = Tuple[str, Optional[int]]  # (kmeans | agglomerative | two_stage | dbscan, k)
+
+
+class ModelSelection(NamedTuple):
+    model_name: str
+    labels: np.ndarray
+    scores: List[Dict]  # semua kandidat, urut silhouette menurun
+
+
+def model_label(kind: str, k: Optional[int]) -> str:
+    if kind == "kmeans":
+        return f"KMeans_k={k}"
+    if kind == "agglomerative":
+        return f"Agglomerative_k={k}"
+    if kind == "two_stage":
+        return f"TwoStage_k={k}"
+    return f"DBSCAN_eps={DBSCAN_EPS}"
+
+
+def hierarchical_kind(n_rows: int, engine: Optional[str] = None) -> Optional[str]:
+    """Jenis kandidat hierarkis untuk n_rows baris (None = tidak ada)."""
+    engine = resolve_engine(engine, n_rows)
+    if engine == "minibatch":
+        return None
+    if engine == "two_stage" or n_rows > AGGLOMERATIVE_MAX_ROWS:
+        return "two_stage"
+    return "agglomerative"
+
+
+def sweep_candidates(n_rows: int, engine: Optional[str] = None) -> List[Candidate]:
+    k_values = range(SWEEP_K_MIN, min(SWEEP_K_MAX, n_rows - 1) + 1)
+    hierarchical = hierarchical_kind(n_rows, engine)
+    return (
+        [("kmeans", k) for k in k_values]
+        + ([(hierarchical, k) for k in k_values] if hierarchical else [])
+        + [("dbscan", None)]
+    )
+
+
+# ===============================
+# WORKER
+# ===============================
+def _fit_candidate(args: Tuple[str, Optional[int], str]) -> Dict:
+    kind, k, workdir = args
+    start = time.perf_counter()
+
+    embeddings = np.load(os.path.join(workdir, "embeddings.npy"), mmap_mode="r")
+    distances = np.load(os.path.join(workdir, "distances.npy"), mmap_mode="r")
+    sample = np.load(os.path.join(workdir, "sample.npy"))
+
+    if kind == "kmeans":
+        labels = KMeans(n_clusters=k, random_state=SWEEP_SEED, n_init=10).fit_predict(
+            embeddings
+        )
+    elif kind == "agglomerative":
+        labels = AgglomerativeClustering(n_clusters=k).fit_predict(embeddings)
+    elif kind == "two_stage":
+        clusterer = StreamingClusterer("two_stage", k)
+        for offset in range(0, len(embeddings), clusterer.chunk_size):
+            clusterer.partial_fit(embeddings[offset : offset + clusterer.chunk_size])
+        labels = clusterer.fit_labels(embeddings, k)
+    elif len(sample) == len(embeddings):
+        # Sampel = semua baris: pakai matriks jarak yang sudah ada
+        labels = DBSCAN(
+            eps=DBSCAN_EPS, min_samples=DBSCAN_MIN_SAMPLES, metric="precomputed"
+        ).fit_predict(distances)
+    else:
+        labels = DBSCAN(eps=DBSCAN_EPS, min_samples=DBSCAN_MIN_SAMPLES).fit_predict(
+            embeddings
+        )
+
+    result = {
+        "model": model_label(kind, k),
+        "clusters": int(len(set(labels.tolist()) - {-1})),
+        "valid": False,
+        "silhouette": None,
+        "calinski_harabasz": None,
+        "davies_bouldin": None,
+    }
+
+    sample_labels = labels[sample]
+    if (
+        result["clusters"] >= 2
+        and -1 not in labels
+        and len(np.unique(sample_labels)) >= 2
+    ):
+        result.update(
+            valid=True,
+            silhouette=float(
+                silhouette_score(distances, sample_labels, metric="precomputed")
+            ),
+            calinski_harabasz=float(calinski_harabasz_score(embeddings, labels)),
+            davies_bouldin=float(davies_bouldin_score(embeddings, labels)),
+        )
+
+    result["fit_seconds"] = round(time.perf_counter() - start, 3)
+    result["labels"] = labels.astype(np.int32)
+    return result
+
+
+# ===============================
+# SWEEP
+# ===============================
+def select_model(
+    embeddings: np.ndarray,
+    workers: Optional[int] = None,
+    engine: Optional[str] = None,
+) -> ModelSelection:
+    """
+    Fit semua kandidat paralel lalu pilih silhouette tertinggi
+    (seri: Calinski-Harabasz tertinggi). `engine` (default CLUSTER_ENGINE)
+    menentukan kandidat hierarkis, lihat hierarchical_kind.
+
+    Raises:
+        ValueError: kalau tidak ada kandidat yang sah
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n = len(embeddings)
+    candidates = sweep_candidates(n, engine)
+    workers = workers or SWEEP_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(workers, len(candidates)))
+
+    rng = np.random.default_rng(SWEEP_SEED)
+    sample = (
+        np.arange(n)
+        if n <= SWEEP_SAMPLE_SIZE
+        else np.sort(rng.choice(n, size=SWEEP_SAMPLE_SIZE, replace=False))
+    )
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="cluster_sweep_") as workdir:
+        np.save(os.path.join(workdir, "embeddings.npy"), embeddings)
+        np.save(os.path.join(workdir, "sample.npy"), sample)
+        np.save(
+            os.path.join(workdir, "distances.npy"),
+            pairwise_distances(embeddings[sample]).astype(np.float32),
+        )
+
+        # spawn: worker tidak mewarisi event loop / koneksi database proses utama
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results = list(
+                pool.map(_fit_candidate, [(kind, k, workdir) for kind, k in candidates])
+            )
+
+    valid = [r for r in results if r["valid"]]
+    if not valid:
+        raise ValueError("Tidak ada kandidat clustering yang sah")
+
+    best = max(valid, key=lambda r: (r["silhouette"], r["calinski_harabasz"]))
+    scores = sorted(
+        ({k: v for k, v in r.items() if k != "labels"} for r in results),
+        key=lambda r: (r["valid"], r["silhouette"] or 0.0),
+        reverse=True,
+    )
+
+    print(
+        f"🏁 Model sweep: {len(candidates)} candidates on {workers} workers in "
+        f"{time.perf_counter() - start:.1f}s, winner {best['model']} "
+        f"(silhouette {best['silhouette']:.4f})"
+    )
+    return ModelSelection(best["model"], best["labels"], scores)
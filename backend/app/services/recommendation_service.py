@@ -1,4 +1,5 @@
 from app.database import database
+from app.services.clustering_runs import ACTIVE_RUN_SQL
 
 
 # ===============================
@@ -37,7 +38,7 @@ def build_reason(row):
 async def get_top_collaboration_recommendations(
     limit: int = 5, min_similarity: float = 0.3
 ):
-    query = """
+    query = f"""
     SELECT
         s.inovasi_id_1,
         s.inovasi_id_2,
@@ -50,10 +51,11 @@ async def get_top_collaboration_recommendations(
         b.tahapan_inovasi AS tahap_2,
         a.admin_opd AS opd_1,
         b.admin_opd AS opd_2
-    FROM similarity_result s
+    FROM similarity_neighbor s
     JOIN data_inovasi a ON a.id = s.inovasi_id_1
     JOIN data_inovasi b ON b.id = s.inovasi_id_2
-    WHERE s.similarity >= :min_similarity
+    WHERE s.run_id = {ACTIVE_RUN_SQL}
+      AND s.similarity >= :min_similarity
       AND a.admin_opd != b.admin_opd
     ORDER BY s.similarity DESC
     LIMIT :limit
@@ -87,13 +89,14 @@ async def get_top_collaboration_recommendations(
 # REKOMENDASI UNTUK SATU INOVASI
 # ===============================
 async def recommend_for_inovasi(inovasi_id: int, top_n: int = 5):
-    query = """
+    query = f"""
     SELECT
         s.inovasi_id_1,
         s.inovasi_id_2,
         s.similarity
-    FROM similarity_result s
-    WHERE s.inovasi_id_1 = :id OR s.inovasi_id_2 = :id
+    FROM similarity_neighbor s
+    WHERE s.run_id = {ACTIVE_RUN_SQL}
+      AND (s.inovasi_id_1 = :id OR s.inovasi_id_2 = :id)
     ORDER BY s.similarity DESC
     LIMIT :limit
     """
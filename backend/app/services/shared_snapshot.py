@@ -0,0 +1,232 @@
+"""
+Shared Vector Snapshot (multi-worker)
+Dengan `uvicorn --workers N`, setiap worker sebelumnya membangun cache
+embedding sendiri. Modul ini membuat satu worker (leader) yang membangun dan
+mem-publish snapshot ke disk (.npy, dibuka dengan mmap); worker lain hanya
+attach read-only, sehingga halaman memori dipakai bersama lewat page cache OS.
+
+Aktifkan dengan VECTOR_SHARED_SNAPSHOT=true.
+
+Layout folder VECTOR_SNAPSHOT_DIR:
+- leader.lock       : flock eksklusif, dipegang leader selama proses hidup;
+                      follower mencoba ulang tiap VECTOR_SNAPSHOT_LEADER_RETRY_S
+                      sehingga leader yang mati digantikan
+- CURRENT           : nama generasi snapshot yang aktif (diganti atomic)
+- gen-<id>/         : array *.npy + meta.json untuk satu generasi
+- refresh.request   : di-touch worker non-leader untuk meminta refresh
+"""
+
+import os
+import json
+import time
+import shutil
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from app.services.embedding_store import EMBEDDING_STORE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: tidak ada flock, mode shared dimatikan
+    fcntl = None
+
+# ===============================
+# CONFIG
+# ===============================
+SHARED_SNAPSHOT_ENABLED = os.getenv("VECTOR_SHARED_SNAPSHOT", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SNAPSHOT_DIR = os.getenv(
+    "VECTOR_SNAPSHOT_DIR", os.path.join(EMBEDDING_STORE_DIR, "snapshot")
+)
+SNAPSHOT_WAIT_S = float(os.getenv("VECTOR_SNAPSHOT_WAIT_S", "120"))
+SNAPSHOT_POLL_S = float(os.getenv("VECTOR_SNAPSHOT_POLL_S", "5"))
+LEADER_RETRY_S = float(os.getenv("VECTOR_SNAPSHOT_LEADER_RETRY_S", "30"))
+SNAPSHOT_KEEP = 2
+
+_CURRENT = os.path.join(SNAPSHOT_DIR, "CURRENT")
+_LEADER_LOCK = os.path.join(SNAPSHOT_DIR, "leader.lock")
+_REFRESH_REQUEST = os.path.join(SNAPSHOT_DIR, "refresh.request")
+
+_leader_fd = None
+_is_leader: Optional[bool] = None
+_leader_checked_at = 0.0
+
+
+def is_enabled() -> bool:
+    return SHARED_SNAPSHOT_ENABLED and fcntl is not None
+
+
+# ===============================
+# LEADER ELECTION
+# ===============================
+def is_leader() -> bool:
+    """
+    True kalau worker ini yang bertugas build/refresh. Tanpa mode shared,
+    setiap worker adalah leader untuk dirinya sendiri (perilaku lama).
+    Follower mencoba ambil lock lagi tiap LEADER_RETRY_S detik; flock lepas
+    sendiri saat proses leader mati.
+    """
+    global _leader_fd, _is_leader, _leader_checked_at
+
+    if not is_enabled():
+        return True
+    if _is_leader:
+        return True
+
+    now = time.monotonic()
+    if _is_leader is None or now - _leader_checked_at >= LEADER_RETRY_S:
+        _leader_checked_at = now
+        was_follower = _is_leader is False
+
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        fd = open(_LEADER_LOCK, "a+")
+        try:
+            fcntl.flock(fd.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fd.seek(0)
+            fd.truncate()
+            fd.write(str(os.getpid()))
+            fd.flush()
+            _leader_fd = fd  # dipegang selama proses hidup
+            _is_leader = True
+        except OSError:
+            fd.close()
+            _is_leader = False
+
+        if _is_leader and was_follower:
+            print("👑 Shared snapshot role: follower -> leader (previous leader gone)")
+        elif not was_follower:
+            print(f"👑 Shared snapshot role: {'leader' if _is_leader else 'follower'}")
+
+    return _is_leader
+
+
+# ===============================
+# PUBLISH (LEADER)
+# ===============================
+def publish_snapshot(
+    index, data, neighbors=None, change_id: Optional[int] = None
+) -> str:
+    """
+    Tulis index + metadata (+ tabel tetangga kalau ada) sebagai generasi
+    baru, lalu ganti CURRENT secara atomic. change_id (change_tracking) ikut
+    disimpan di meta data supaya leader yang restart cukup menerapkan delta.
+    Generasi lama dibuang (file yang masih di-mmap worker lain tetap valid
+    sampai mereka attach ke generasi baru).
+    """
+    generation = f"gen-{int(time.time() * 1000)}-{os.getpid()}"
+    target = os.path.join(SNAPSHOT_DIR, generation)
+    os.makedirs(target, exist_ok=True)
+
+    index_arrays, index_meta = index.to_arrays()
+    data_arrays, data_meta = data.to_arrays()
+    data_meta = {**data_meta, "change_id": change_id}
+
+    for name, array in index_arrays.items():
+        np.save(os.path.join(target, f"index_{name}.npy"), np.asarray(array))
+    for name, array in data_arrays.items():
+        np.save(os.path.join(target, f"data_{name}.npy"), np.asarray(array))
+
+    neighbor_arrays = neighbors.to_arrays() if neighbors is not None else {}
+    for name, array in neighbor_arrays.items():
+        np.save(os.path.join(target, f"neighbors_{name}.npy"), np.asarray(array))
+
+    with open(os.path.join(target, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "index": index_meta,
+                "index_arrays": list(index_arrays),
+                "data": data_meta,
+                "data_arrays": list(data_arrays),
+                "neighbors_arrays": list(neighbor_arrays),
+            },
+            f,
+        )
+
+    tmp = _CURRENT + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(generation)
+    os.replace(tmp, _CURRENT)
+
+    _prune_generations(keep=generation)
+    print(f"📤 Shared snapshot published: {generation}")
+    return generation
+
+
+def _prune_generations(keep: str):
+    generations = sorted(
+        d for d in os.listdir(SNAPSHOT_DIR) if d.startswith("gen-") and d != keep
+    )
+    for old in generations[: max(0, len(generations) - (SNAPSHOT_KEEP - 1))]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, old), ignore_errors=True)
+
+
+# ===============================
+# ATTACH (SEMUA WORKER)
+# ===============================
+def current_generation() -> Optional[str]:
+    try:
+        with open(_CURRENT, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def attach_snapshot(
+    generation: Optional[str] = None,
+) -> Optional[Tuple[str, Tuple, Tuple, Optional[Dict]]]:
+    """
+    Buka generasi snapshot (default: CURRENT) secara read-only via mmap.
+
+    Returns:
+        (generation, (index_arrays, index_meta), (data_arrays, data_meta),
+        neighbor_arrays atau None) atau None kalau belum ada snapshot atau
+        generasinya sudah dibuang leader (pemanggil cukup mencoba lagi).
+    """
+    generation = generation or current_generation()
+    if not generation:
+        return None
+
+    source = os.path.join(SNAPSHOT_DIR, generation)
+
+    def _load(prefix, names):
+        arrays = {}
+        for name in names:
+            path = os.path.join(source, f"{prefix}_{name}.npy")
+            try:
+                arrays[name] = np.load(path, mmap_mode="r")
+            except ValueError:
+                # Array kosong (mis. blob judul tanpa isi) tidak bisa di-mmap
+                arrays[name] = np.load(path)
+        return arrays
+
+    try:
+        with open(os.path.join(source, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index_part = (_load("index", meta["index_arrays"]), meta["index"])
+        data_part = (_load("data", meta["data_arrays"]), meta["data"])
+        neighbor_part = _load("neighbors", meta.get("neighbors_arrays", [])) or None
+    except FileNotFoundError:
+        print(f"⚠️ Shared snapshot {generation} was pruned before attach")
+        return None
+
+    return generation, index_part, data_part, neighbor_part
+
+
+# ===============================
+# REFRESH REQUEST (FOLLOWER -> LEADER)
+# ===============================
+def request_refresh():
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(_REFRESH_REQUEST, "a"):
+        os.utime(_REFRESH_REQUEST, None)
+
+
+def refresh_requested_at() -> float:
+    try:
+        return os.stat(_REFRESH_REQUEST).st_mtime
+    except FileNotFoundError:
+        return 0.0
@@ -0,0 +1,425 @@
+"""
+Vector Index Layer for Semantic Search
+Pluggable nearest-neighbour index dipakai oleh vector_search_service.
+
+Backend dipilih lewat environment variable VECTOR_INDEX_BACKEND:
+- "exact" (default): matriks ter-normalisasi + argpartition (hasil 100% akurat)
+- "ivf": inverted file index (k-means coarse quantizer), approximate tapi
+  hanya menilai sebagian kecil baris per query
+
+Representasi vector di memory dipilih lewat VECTOR_CACHE_DTYPE:
+"float32" (default), "float16", atau "int8" (dengan scale per baris).
+
+NeighborTable menyimpan top-K tetangga setiap baris (VECTOR_NEIGHBOR_K),
+dihitung sekali per refresh cache, untuk lookup kolaborasi O(1).
+"""
+
+import os
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from typing import Dict, Optional, Tuple
+
+# ===============================
+# CONFIG
+# ===============================
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "exact").lower()
+IVF_NLIST = int(os.getenv("VECTOR_INDEX_IVF_NLIST", "0"))  # 0 = auto (~sqrt(n))
+IVF_NPROBE = int(os.getenv("VECTOR_INDEX_IVF_NPROBE", "8"))
+IVF_MIN_ROWS = int(os.getenv("VECTOR_INDEX_IVF_MIN_ROWS", "2000"))
+VECTOR_CACHE_DTYPE = os.getenv("VECTOR_CACHE_DTYPE", "float32").lower()
+SEARCH_CHUNK_ROWS = 16384
+NEIGHBOR_K = int(os.getenv("VECTOR_NEIGHBOR_K", "20"))  # 0 = tanpa tabel
+NEIGHBOR_BLOCK_CELLS = 1 << 24  # maks. skor (baris blok x n) per blok
+MAX_BLOCK_ROWS = 4096
+
+
+# ===============================
+# HELPERS
+# ===============================
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize setiap baris supaya dot product == cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def block_rows(n_columns: int) -> int:
+    """
+    Baris per blok untuk matriks skor blok x n_columns, supaya tidak melebihi
+    NEIGHBOR_BLOCK_CELLS sel (dan maks. MAX_BLOCK_ROWS baris).
+    """
+    return max(1, min(MAX_BLOCK_ROWS, NEIGHBOR_BLOCK_CELLS // max(n_columns, 1)))
+
+
+def top_k_desc(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ambil top-k per baris dengan argpartition (O(n)) lalu sort hanya k elemen.
+
+    Returns:
+        (scores, indices), keduanya shape (n_queries, k), urut menurun
+    """
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+
+    return (
+        np.take_along_axis(part_scores, order, axis=1),
+        np.take_along_axis(part, order, axis=1),
+    )
+
+
+# ===============================
+# COMPACT VECTOR STORAGE
+# ===============================
+class QuantizedMatrix:
+    """
+    Matriks embedding ter-normalisasi dalam float32, float16, atau int8.
+    Mode int8 menyimpan satu scale float32 per baris (max |x| / 127).
+    """
+
+    def __init__(self, vectors: np.ndarray, dtype: str = "float32"):
+        vectors = normalize_rows(vectors)
+        self.dtype = dtype if dtype in ("float32", "float16", "int8") else "float32"
+        self.scales: Optional[np.ndarray] = None
+
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.data = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        elif self.dtype == "float16":
+            self.data = vectors.astype(np.float16)
+        else:
+            self.data = vectors
+
+    @classmethod
+    def from_arrays(
+        cls, data: np.ndarray, scales: Optional[np.ndarray], dtype: str
+    ) -> "QuantizedMatrix":
+        """Bungkus array yang sudah ada (misal hasil mmap) tanpa menyalin."""
+        matrix = cls.__new__(cls)
+        matrix.data = data
+        matrix.scales = scales
+        matrix.dtype = dtype
+        return matrix
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {"data": self.data}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        return arrays
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rows(self, idx) -> np.ndarray:
+        """Ambil baris (index / slice / array) sebagai float32."""
+        block = np.asarray(self.data[idx], dtype=np.float32)
+        if self.scales is not None:
+            block = block * self.scales[idx].reshape(-1, 1)
+        return block
+
+    def dot(self, queries: np.ndarray) -> np.ndarray:
+        """queries (nq x dim, float32) @ matriks.T, per blok untuk mode kompak."""
+        if self.dtype == "float32":
+            return queries @ self.data.T
+
+        n = len(self)
+        scores = np.empty((queries.shape[0], n), dtype=np.float32)
+        for start in range(0, n, SEARCH_CHUNK_ROWS):
+            end = min(start + SEARCH_CHUNK_ROWS, n)
+            scores[:, start:end] = queries @ self.rows(slice(start, end)).T
+        return scores
+
+
+def search_rows(
+    vectors: QuantizedMatrix, queries: np.ndarray, top_k: int, rows: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k yang hanya menilai baris `rows`; index hasil tetap global."""
+    queries = normalize_rows(queries)
+    rows = np.asarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        return top_k_desc(np.empty((queries.shape[0], 0), dtype=np.float32), top_k)
+
+    scores, local = top_k_desc(queries @ vectors.rows(rows).T, top_k)
+    return scores, rows[local]
+
+
+# ===============================
+# EXACT BACKEND
+# ===============================
+class ExactIndex:
+    """Brute-force cosine search di atas matriks yang sudah dinormalisasi."""
+
+    name = "exact"
+
+    def __init__(self, embeddings: np.ndarray, dtype: Optional[str] = None):
+        self.vectors = QuantizedMatrix(embeddings, dtype or VECTOR_CACHE_DTYPE)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def get_vector(self, idx: int) -> np.ndarray:
+        return self.vectors.rows([idx])[0]
+
+    def search(
+        self, queries: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k cosine search. Kalau `rows` diberikan (hasil pre-filter), hanya
+        baris kandidat itu yang dinilai.
+        """
+        if rows is not None:
+            return search_rows(self.vectors, queries, top_k, rows)
+
+        queries = normalize_rows(queries)
+        scores = self.vectors.dot(queries)
+        return top_k_desc(scores, top_k)
+
+    def info(self) -> dict:
+        return {
+            "backend": self.name,
+            "items": len(self),
+            "dtype": self.vectors.dtype,
+            "memory_mb": round(self.vectors.nbytes / (1024 * 1024), 2),
+        }
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], dict]:
+        return self.vectors.to_arrays(), {
+            "backend": self.name,
+            "dtype": self.vectors.dtype,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: dict) -> "ExactIndex":
+        index = cls.__new__(cls)
+        index.vectors = QuantizedMatrix.from_arrays(
+            arrays["data"], arrays.get("scales"), meta["dtype"]
+        )
+        return index
+
+
+# ===============================
+# IVF BACKEND (APPROXIMATE)
+# ===============================
+class IVFIndex:
+    """
+    Inverted file index: baris dikelompokkan ke `nlist` centroid, query hanya
+    menilai baris di `nprobe` centroid terdekat.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        dtype: Optional[str] = None,
+    ):
+        normalized = normalize_rows(embeddings)
+        n = normalized.shape[0]
+
+        self.nlist = max(1, min(nlist or IVF_NLIST or int(np.sqrt(n)), n))
+        self.nprobe = max(1, min(nprobe or IVF_NPROBE, self.nlist))
+
+        quantizer = MiniBatchKMeans(
+            n_clusters=self.nlist,
+            random_state=42,
+            batch_size=min(4096, n),
+            n_init=1,
+            max_iter=50,
+        )
+        assignments = quantizer.fit_predict(normalized)
+        self.centroids = normalize_rows(quantizer.cluster_centers_)
+        self.vectors = QuantizedMatrix(normalized, dtype or VECTOR_CACHE_DTYPE)
+
+        # Simpan inverted lists sebagai satu array urut + offset per list
+        self.order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.nlist)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def get_vector(self, idx: int) -> np.ndarray:
+        return self.vectors.rows([idx])[0]
+
+    def _candidates(self, list_ids: np.ndarray) -> np.ndarray:
+        return np.concatenate(
+            [self.order[self.offsets[l] : self.offsets[l + 1]] for l in list_ids]
+        )
+
+    def search(
+        self, queries: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if rows is not None:
+            # Kandidat pre-filter biasanya kecil: nilai semuanya secara exact
+            return search_rows(self.vectors, queries, top_k, rows)
+
+        queries = normalize_rows(queries)
+        _, probe_lists = top_k_desc(queries @ self.centroids.T, self.nprobe)
+
+        k = min(top_k, len(self))
+        all_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        all_indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+
+        for qi, query in enumerate(queries):
+            candidates = self._candidates(probe_lists[qi])
+            if candidates.size == 0:
+                continue
+
+            scores, local = top_k_desc(self.vectors.rows(candidates) @ query, k)
+            found = scores.shape[1]
+            all_scores[qi, :found] = scores[0]
+            all_indices[qi, :found] = candidates[local[0]]
+
+        return all_scores, all_indices
+
+    def info(self) -> dict:
+        return {
+            "backend": self.name,
+            "items": len(self),
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "dtype": self.vectors.dtype,
+            "memory_mb": round(self.vectors.nbytes / (1024 * 1024), 2),
+        }
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], dict]:
+        arrays = {
+            **self.vectors.to_arrays(),
+            "centroids": self.centroids,
+            "order": self.order,
+            "offsets": self.offsets,
+        }
+        return arrays, {
+            "backend": self.name,
+            "dtype": self.vectors.dtype,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: dict) -> "IVFIndex":
+        index = cls.__new__(cls)
+        index.vectors = QuantizedMatrix.from_arrays(
+            arrays["data"], arrays.get("scales"), meta["dtype"]
+        )
+        index.centroids = arrays["centroids"]
+        index.order = arrays["order"]
+        index.offsets = arrays["offsets"]
+        index.nlist = meta["nlist"]
+        index.nprobe = meta["nprobe"]
+        return index
+
+
+# ===============================
+# NEIGHBOUR TABLE (TOP-K PER BARIS)
+# ===============================
+class NeighborTable:
+    """
+    Top-K tetangga terdekat setiap baris (dirinya sendiri tidak ikut).
+    rows: int32 (n x K), -1 untuk slot kosong; scores: float32 (n x K).
+    """
+
+    def __init__(self, rows: np.ndarray, scores: np.ndarray):
+        self.rows = rows
+        self.scores = scores
+
+    @classmethod
+    def build(cls, index, k: Optional[int] = None) -> "NeighborTable":
+        """
+        Hitung per blok baris lewat index.search, jadi matriks n x n tidak
+        pernah dibuat utuh (memori per blok dibatasi NEIGHBOR_BLOCK_CELLS).
+        """
+        n = len(index)
+        k = max(0, min(NEIGHBOR_K if k is None else k, n - 1))
+        block = block_rows(n)
+
+        rows = np.full((n, k), -1, dtype=np.int32)
+        scores = np.full((n, k), -np.inf, dtype=np.float32)
+        if k == 0:
+            return cls(rows, scores)
+
+        for start in range(0, n, block):
+            end = min(start + block, n)
+            block_scores, block_idx = index.search(
+                index.vectors.rows(slice(start, end)), k + 1
+            )
+
+            # Buang diri sendiri; kalau tidak terambil, buang kandidat terakhir
+            own = block_idx == np.arange(start, end)[:, None]
+            own[~own.any(axis=1), -1] = True
+            rows[start:end] = block_idx[~own].reshape(-1, k)
+            scores[start:end] = block_scores[~own].reshape(-1, k)
+
+        return cls(rows, scores)
+
+    @property
+    def k(self) -> int:
+        return self.rows.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.scores.nbytes
+
+    def get(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(row tetangga, skor) untuk satu baris, urut menurun."""
+        valid = self.rows[row] >= 0
+        return self.rows[row][valid], self.scores[row][valid]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"rows": self.rows, "scores": self.scores}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "NeighborTable":
+        return cls(arrays["rows"], arrays["scores"])
+
+
+# ===============================
+# FACTORY
+# ===============================
+def index_from_arrays(arrays: Dict[str, np.ndarray], meta: dict):
+    """Rekonstruksi index dari array (dipakai untuk snapshot bersama)."""
+    if meta["backend"] == IVFIndex.name:
+        return IVFIndex.from_arrays(arrays, meta)
+    return ExactIndex.from_arrays(arrays, meta)
+
+
+def build_index(
+    embeddings: np.ndarray, backend: Optional[str] = None, dtype: Optional[str] = None
+):
+    """
+    Bangun index sesuai config. IVF hanya dipakai kalau jumlah baris cukup
+    besar; untuk katalog kecil exact search lebih cepat dan akurat.
+    """
+    backend = (backend or VECTOR_INDEX_BACKEND).lower()
+
+    if backend == "ivf":
+        if len(embeddings) >= IVF_MIN_ROWS:
+            return IVFIndex(embeddings, dtype=dtype)
+        print(
+            f"ℹ️ IVF index skipped ({len(embeddings)} < {IVF_MIN_ROWS} rows), using exact"
+        )
+    elif backend != "exact":
+        print(f"⚠️ Unknown VECTOR_INDEX_BACKEND '{backend}', using exact")
+
+    return ExactIndex(embeddings, dtype=dtype)
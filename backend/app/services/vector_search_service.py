@@ -4,24 +4,150 @@ Handles semantic search using embeddings to find relevant innovations
 even when there are typos or semantic variations.
 """
 
+import os
+import json
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from cachetools import TTLCache
 from app.database import database
-from typing import List, Dict, Optional, Tuple
+from app.services.vector_index import NeighborTable, build_index, index_from_arrays
+from app.services import shared_snapshot
+from app.services.change_tracking import (
+    ChangeSet,
+    changes_since_watermark,
+    id_chunks,
+    latest_change_id,
+    set_watermark,
+)
+from app.services.embedding_store import (
+    build_feature_text,
+    embedding_store,
+    feature_hash,
+)
+from app.services.embedding_provider import (
+    EmbeddingQueueFull,
+    encode_query_async,
+    encode_texts_async,
+)
+from app.services.inovasi_columns import InovasiColumns
+from typing import List, Dict, Optional, Sequence, Tuple, Union
 import asyncio
 
 # ===============================
-# MODEL (Same as clustering service)
+# CACHE FOR EMBEDDINGS
 # ===============================
-embedding_model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+# Metadata baris disimpan kolumnar; vector disimpan di dalam index
+# (float32 / float16 / int8 sesuai VECTOR_CACHE_DTYPE)
+_inovasi_data_cache: Optional[InovasiColumns] = None
+_vector_index = None
+_id_to_row: Dict[int, int] = {}
+_neighbor_table: Optional[NeighborTable] = None
+_cache_loaded: bool = False
+_load_task: Optional[asyncio.Task] = None
+# change_id data_inovasi terakhir yang sudah tercermin di cache (change_tracking)
+_cache_change_id: Optional[int] = None
+EMBEDDING_STAGE = "embedding"  # watermark pipeline_watermark untuk cache ini
+_snapshot_generation: Optional[str] = None
+_snapshot_checked_at: float = 0.0
 
 # ===============================
-# CACHE FOR EMBEDDINGS
+# CACHE FOR QUERY EMBEDDINGS (LRU + TTL)
 # ===============================
-_embeddings_cache: Optional[np.ndarray] = None
-_inovasi_data_cache: Optional[List[Dict]] = None
-_cache_loaded: bool = False
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+
+_query_embedding_cache = TTLCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+_query_cache_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_query(query: str) -> str:
+    """Rapikan spasi; dipakai sebagai teks yang di-encode sekaligus key cache."""
+    return " ".join(query.split())
+
+
+async def get_query_embedding(query: str) -> np.ndarray:
+    """
+    Embedding query dengan cache. Key = teks persis setelah normalize_query:
+    tokenizer model membedakan huruf besar/kecil, jadi "POP SURGA" dan
+    "pop surga" punya embedding berbeda dan tidak boleh berbagi entri.
+    """
+    key = normalize_query(query)
+
+    cached = _query_embedding_cache.get(key)
+    if cached is not None:
+        _query_cache_stats["hits"] += 1
+        return cached
+
+    _query_cache_stats["misses"] += 1
+    embedding = await encode_query_async(key)
+    embedding.setflags(write=False)
+    _query_embedding_cache[key] = embedding
+    return embedding
+
+
+# ===============================
+# PRE-FILTER (KOLOM KATEGORI)
+# ===============================
+# Nama filter publik -> kolom di InovasiColumns
+SEARCH_FILTER_COLUMNS = {
+    "urusan": "urusan_utama",
+    "jenis": "jenis",
+    "opd": "admin_opd",
+    "kematangan": "label_kematangan",
+}
+
+SearchFilters = Dict[str, Union[str, Sequence[str]]]
+
+
+def _candidate_rows(filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+    """
+    Row id kandidat dari filter, sebelum scoring. Key boleh nama publik
+    (urusan, jenis, opd, kematangan) atau nama kolom aslinya.
+    """
+    if not filters:
+        return None
+
+    columns = {SEARCH_FILTER_COLUMNS.get(k, k): v for k, v in filters.items()}
+    return _inovasi_data_cache.filter_rows(columns)
+
+
+async def get_query_embeddings(queries: Sequence[str]) -> np.ndarray:
+    """
+    Versi batch dari get_query_embedding: semua query yang belum ada di cache
+    di-encode dalam satu panggilan encode. Hasil: matriks (n x dim).
+    """
+    keys = [normalize_query(q) for q in queries]
+
+    vectors: Dict[str, np.ndarray] = {}
+    missing: List[str] = []
+    for key in keys:
+        cached = _query_embedding_cache.get(key)
+        if cached is not None:
+            _query_cache_stats["hits"] += 1
+            vectors[key] = cached
+        elif key not in missing:
+            _query_cache_stats["misses"] += 1
+            missing.append(key)
+
+    if missing:
+        encoded = await encode_texts_async(missing)
+        for key, embedding in zip(missing, encoded):
+            embedding.setflags(write=False)
+            _query_embedding_cache[key] = embedding
+            vectors[key] = embedding
+
+    return np.stack([vectors[key] for key in keys])
+
+
+def get_query_cache_stats() -> Dict:
+    total = _query_cache_stats["hits"] + _query_cache_stats["misses"]
+    return {
+        **_query_cache_stats,
+        "hit_rate": round(_query_cache_stats["hits"] / total, 4) if total else 0.0,
+        "size": len(_query_embedding_cache),
+        "max_size": QUERY_CACHE_SIZE,
+        "ttl_seconds": QUERY_CACHE_TTL,
+    }
 
 
 # ===============================
@@ -31,54 +157,211 @@ async def load_inovasi_embeddings_cache():
     """
     Load semua data inovasi dan embeddings ke memory.
     Call ini saat startup aplikasi atau periodic refresh.
+
+    Single-flight: kalau load sedang berjalan, pemanggil lain menunggu hasil
+    load yang sama (tidak memulai load duplikat).
     """
-    global _embeddings_cache, _inovasi_data_cache, _cache_loaded
+    global _load_task
 
-    try:
-        print("🔄 Loading inovasi embeddings cache...")
+    if _load_task is None or _load_task.done():
+        if shared_snapshot.is_enabled() and not shared_snapshot.is_leader():
+            # Worker non-leader hanya attach ke snapshot bersama
+            _load_task = asyncio.ensure_future(_attach_shared_cache())
+        else:
+            _load_task = asyncio.ensure_future(_build_and_swap_cache())
+
+    # shield: load tetap selesai walaupun request pemanggilnya dibatalkan
+    return await asyncio.shield(_load_task)
+
+
+def _row_signature(item: Dict) -> int:
+    return int(feature_hash(json.dumps(item, sort_keys=True, default=str)), 16)
+
+
+def _diff_signatures(old: Optional[InovasiColumns], ids, signatures):
+    """Hitung (added, changed, removed) antara snapshot lama dan data baru."""
+    if old is None:
+        return len(ids), 0, 0
+
+    common, new_pos, old_pos = np.intersect1d(ids, old.ids, return_indices=True)
+    changed = int(np.count_nonzero(signatures[new_pos] != old.signatures[old_pos]))
+    return len(ids) - len(common), changed, len(old.ids) - len(common)
+
+
+def _swap_cache(data: InovasiColumns, index, neighbors: Optional[NeighborTable]):
+    """
+    Ganti seluruh cache sekaligus (tanpa await di tengahnya), jadi reader
+    selalu melihat snapshot lama atau snapshot baru yang utuh.
+    """
+    global _inovasi_data_cache, _vector_index, _id_to_row, _neighbor_table
+    global _cache_loaded
 
-        # Fetch all inovasi data
+    _inovasi_data_cache = data
+    _vector_index = index
+    _id_to_row = {int(inovasi_id): row for row, inovasi_id in enumerate(data.ids)}
+    _neighbor_table = neighbors
+    _cache_loaded = True
+
+
+INOVASI_SELECT = """
+    SELECT
+        id,
+        judul_inovasi,
+        admin_opd,
+        urusan_utama,
+        tahapan_inovasi,
+        label_kematangan,
+        bentuk_inovasi,
+        jenis
+    FROM data_inovasi
+    WHERE judul_inovasi IS NOT NULL
+"""
+
+
+async def _fetch_inovasi_rows(ids: Optional[Sequence[int]] = None) -> List[Dict]:
+    """Semua baris inovasi (urut id), atau hanya `ids` dari change log."""
+    if ids is None:
+        rows = await database.fetch_all(INOVASI_SELECT + " ORDER BY id")
+        return [dict(r) for r in rows]
+
+    items: List[Dict] = []
+    for placeholders, values in id_chunks(ids):
         rows = await database.fetch_all(
-            """
-            SELECT
-                id,
-                judul_inovasi,
-                admin_opd,
-                urusan_utama,
-                tahapan_inovasi,
-                label_kematangan,
-                bentuk_inovasi,
-                jenis
-            FROM data_inovasi
-            WHERE judul_inovasi IS NOT NULL
-            ORDER BY id
-            """
+            INOVASI_SELECT + f" AND id IN ({placeholders})", values
         )
+        items.extend(dict(r) for r in rows)
+    return items
 
-        if not rows:
+
+async def _pending_changes() -> Optional[ChangeSet]:
+    """
+    Delta sejak watermark stage embedding. None -> perlu fetch penuh: cache
+    belum ada, tracking mati, atau watermark sudah melewati cache worker ini
+    (log yang dibutuhkan mungkin sudah dipangkas prune_change_log).
+    """
+    if not _cache_loaded or _cache_change_id is None:
+        return None
+
+    changes = await changes_since_watermark(EMBEDDING_STAGE)
+    if changes is None or changes.since is None or changes.since > _cache_change_id:
+        return None
+    # Watermark di belakang cache ini hanya berarti delta sedikit lebih
+    # besar; upsert/hapus ulang baris yang sama tetap menghasilkan hal sama
+    return changes
+
+
+def _apply_changes(
+    old: InovasiColumns, changes: ChangeSet, fetched: List[Dict]
+) -> Tuple[List[Dict], np.ndarray]:
+    """Baris lama yang tidak tersentuh + baris hasil fetch delta, urut id."""
+    touched = np.array(changes.upserted + changes.deleted, dtype=np.int64)
+    keep = np.flatnonzero(~np.isin(old.ids, touched))
+
+    items = [old[int(row)] for row in keep] + fetched
+    signatures = np.concatenate(
+        [
+            old.signatures[keep],
+            np.array([_row_signature(item) for item in fetched], dtype=np.uint64),
+        ]
+    )
+    order = np.argsort(
+        np.fromiter((item["id"] for item in items), dtype=np.int64, count=len(items)),
+        kind="stable",
+    )
+    return [items[i] for i in order], signatures[order]
+
+
+async def _build_and_swap_cache() -> bool:
+    global _cache_change_id
+
+    try:
+        if (
+            not _cache_loaded
+            and shared_snapshot.is_enabled()
+            and shared_snapshot.current_generation()
+        ):
+            # Restart leader: mulai dari generasi terakhir (change_id-nya ada
+            # di meta), lalu cukup terapkan delta sesudahnya
+            await _attach_shared_cache(wait=False)
+
+        # Change log tidak bertambah sejak build terakhir -> tanpa fetch penuh
+        change_id = await latest_change_id()
+        if _cache_loaded and change_id is not None and change_id == _cache_change_id:
+            print("✅ Embeddings cache already up to date (no data changes)")
+            return True
+
+        changes = await _pending_changes()
+        if changes is not None:
+            # Hanya id yang berubah sejak watermark yang di-fetch
+            fetched = await _fetch_inovasi_rows(changes.upserted)
+            items, signatures = _apply_changes(_inovasi_data_cache, changes, fetched)
+            print(
+                f"🔄 Applying inovasi changes to embeddings cache: "
+                f"{len(changes.upserted)} upserted, {len(changes.deleted)} deleted"
+            )
+        else:
+            print("🔄 Loading inovasi embeddings cache...")
+            items = await _fetch_inovasi_rows()
+            signatures = np.array(
+                [_row_signature(item) for item in items], dtype=np.uint64
+            )
+
+        if not items:
             print("⚠️ No inovasi data found")
             return False
 
-        # Convert to list of dicts
-        _inovasi_data_cache = [dict(r) for r in rows]
-
-        # Build embeddings
-        texts = []
-        for item in _inovasi_data_cache:
-            # Same text format as clustering
-            text = (
-                f"Judul: {item['judul_inovasi']}. "
-                f"Urusan: {item.get('urusan_utama', '')}. "
-                f"Tahapan: {item.get('tahapan_inovasi', '')}. "
-                f"Kematangan: {item.get('label_kematangan', '')}"
-            )
-            texts.append(text)
+        ids = np.array([item["id"] for item in items], dtype=np.int64)
+
+        # Diff terhadap snapshot yang sedang dipakai
+        added, changed, removed = _diff_signatures(
+            _inovasi_data_cache, ids, signatures
+        )
+
+        if _cache_loaded and not (added or changed or removed):
+            _cache_change_id = change_id
+            await set_watermark(EMBEDDING_STAGE, change_id)
+            print("✅ Embeddings cache already up to date")
+            return True
+
+        print(f"📊 Cache diff: +{added} added, ~{changed} changed, -{removed} removed")
 
-        # Generate embeddings
-        _embeddings_cache = embedding_model.encode(texts, show_progress_bar=False)
+        # Build embeddings (same text format as clustering)
+        texts = [build_feature_text(item) for item in items]
+        ids = ids.tolist()
 
-        _cache_loaded = True
-        print(f"✅ Embeddings cache loaded: {len(_inovasi_data_cache)} items")
+        # Ambil dari embedding store, encode hanya baris baru / berubah
+        embeddings = await embedding_store.get_embeddings(
+            ids, texts, encode_texts_async
+        )
+        await embedding_store.save_async(keep_ids=ids)
+
+        # Build search index (exact / ivf, sesuai VECTOR_INDEX_BACKEND)
+        index = await asyncio.to_thread(build_index, embeddings)
+
+        # Top-K tetangga per baris untuk lookup kolaborasi O(1)
+        neighbors = await asyncio.to_thread(NeighborTable.build, index)
+
+        data = InovasiColumns(items, signatures)
+        del items, embeddings
+
+        _swap_cache(data, index, neighbors)
+        _cache_change_id = change_id
+
+        if shared_snapshot.is_enabled():
+            # Publish untuk worker lain, lalu pakai versi mmap juga di leader
+            # supaya salinan privat di memory bisa dibebaskan
+            generation = await asyncio.to_thread(
+                shared_snapshot.publish_snapshot, index, data, neighbors, change_id
+            )
+            await _attach_shared_cache(generation, wait=False)
+
+        # Sesudah swap (dan publish): delta berikutnya mulai dari sini, dan
+        # prune_change_log menyisakan log yang belum dilihat cache
+        await set_watermark(EMBEDDING_STAGE, change_id)
+        print(
+            f"✅ Embeddings cache loaded: {len(data)} items "
+            f"(index: {index.name}, dtype: {index.vectors.dtype})"
+        )
         return True
 
     except Exception as e:
@@ -94,19 +377,113 @@ async def load_inovasi_embeddings_cache():
 # ===============================
 async def refresh_embeddings_cache():
     """
-    Refresh cache embeddings.
+    Refresh cache embeddings secara incremental.
     Call ini setelah ada data baru ditambahkan.
+
+    Cache lama tetap dipakai untuk query selama refresh berjalan; hanya baris
+    baru / berubah yang di-encode, lalu snapshot baru di-swap sekaligus.
     """
-    global _cache_loaded
-    _cache_loaded = False
+    if shared_snapshot.is_enabled() and not shared_snapshot.is_leader():
+        # Refresh hanya dikerjakan leader; worker ini ikut attach nanti
+        shared_snapshot.request_refresh()
+        print("📨 Refresh requested from shared snapshot leader")
+        return True
+
+    # Load yang sedang berjalan mungkin dimulai sebelum data baru masuk,
+    # jadi tunggu selesai lalu jalankan satu refresh lagi.
+    if _load_task is not None and not _load_task.done():
+        await asyncio.shield(_load_task)
+
     return await load_inovasi_embeddings_cache()
 
 
+# ===============================
+# SHARED SNAPSHOT (MULTI-WORKER)
+# ===============================
+async def _attach_shared_cache(
+    generation: Optional[str] = None, wait: bool = True
+) -> bool:
+    """Attach read-only ke snapshot bersama (mmap), tunggu leader kalau perlu."""
+    global _snapshot_generation, _cache_change_id
+
+    deadline = time.monotonic() + (shared_snapshot.SNAPSHOT_WAIT_S if wait else 0)
+    while True:
+        attached = await asyncio.to_thread(shared_snapshot.attach_snapshot, generation)
+        if attached is not None or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.5)
+
+    if attached is None:
+        print("⚠️ Shared snapshot not available yet (leader still building?)")
+        return False
+
+    generation, (index_arrays, index_meta), (data_arrays, data_meta), neighbor_arrays = (
+        attached
+    )
+    _swap_cache(
+        InovasiColumns.from_arrays(data_arrays, data_meta),
+        index_from_arrays(index_arrays, index_meta),
+        NeighborTable.from_arrays(neighbor_arrays) if neighbor_arrays else None,
+    )
+    _snapshot_generation = generation
+    _cache_change_id = data_meta.get("change_id")
+    print(f"📥 Attached to shared snapshot {generation}: {len(data_arrays['ids'])} items")
+    return True
+
+
+async def _follow_shared_snapshot():
+    """Worker non-leader: attach ulang kalau leader sudah publish generasi baru."""
+    global _snapshot_checked_at
+
+    if not shared_snapshot.is_enabled() or shared_snapshot.is_leader():
+        return
+
+    now = time.monotonic()
+    if now - _snapshot_checked_at < shared_snapshot.SNAPSHOT_POLL_S:
+        return
+    _snapshot_checked_at = now
+
+    generation = shared_snapshot.current_generation()
+    if generation and generation != _snapshot_generation:
+        await load_inovasi_embeddings_cache()
+
+
+async def watch_shared_refresh_requests():
+    """
+    Loop background di setiap worker, aktif hanya selama worker ini leader
+    (follower bisa naik jadi leader kalau leader lama mati): jalankan refresh
+    saat worker lain meminta lewat /admin/refresh-vector-cache.
+    """
+    handled_at = shared_snapshot.refresh_requested_at()
+
+    while True:
+        await asyncio.sleep(shared_snapshot.SNAPSHOT_POLL_S)
+        if not shared_snapshot.is_leader():
+            continue
+
+        requested_at = shared_snapshot.refresh_requested_at()
+        if requested_at > handled_at:
+            handled_at = requested_at
+            print("📨 Shared snapshot refresh requested by another worker")
+            await refresh_embeddings_cache()
+
+
+def get_shared_snapshot_status() -> Dict:
+    return {
+        "enabled": shared_snapshot.is_enabled(),
+        "role": "leader" if shared_snapshot.is_leader() else "follower",
+        "generation": _snapshot_generation,
+    }
+
+
 # ===============================
 # VECTOR SEARCH
 # ===============================
 async def vector_search_inovasi(
-    query: str, top_k: int = 5, min_similarity: float = 0.3
+    query: str,
+    top_k: int = 5,
+    min_similarity: float = 0.3,
+    filters: Optional[SearchFilters] = None,
 ) -> List[Dict]:
     """
     Cari inovasi menggunakan semantic similarity.
@@ -115,11 +492,18 @@ async def vector_search_inovasi(
         query: User query string
         top_k: Number of top results to return
         min_similarity: Minimum similarity threshold (0-1)
+        filters: Optional pre-filter, misal {"urusan": "Kesehatan",
+            "jenis": ["Digital"]}. Hanya baris yang lolos yang dinilai.
 
     Returns:
         List of dict with keys: id, judul_inovasi, admin_opd, similarity_score
+
+    Raises:
+        EmbeddingQueueFull: antrian encode penuh (route: 503), bukan hasil kosong
     """
-    global _embeddings_cache, _inovasi_data_cache, _cache_loaded
+    global _inovasi_data_cache, _vector_index, _cache_loaded
+
+    await _follow_shared_snapshot()
 
     # Auto-load cache if not loaded
     if not _cache_loaded:
@@ -127,28 +511,31 @@ async def vector_search_inovasi(
         if not success:
             return []
 
-    if _embeddings_cache is None or _inovasi_data_cache is None:
+    if _vector_index is None or _inovasi_data_cache is None:
         return []
 
-    try:
-        # Generate query embedding
-        query_embedding = embedding_model.encode([query], show_progress_bar=False)
+    # Filter tidak dikenal -> ValueError ke pemanggil (bukan hasil kosong)
+    rows = _candidate_rows(filters)
+    if rows is not None and rows.size == 0:
+        print(f"🔍 Vector search for '{query}': no rows match filters {filters}")
+        return []
 
-        # Calculate cosine similarity
-        similarities = cosine_similarity(query_embedding, _embeddings_cache)[0]
+    try:
+        # Generate query embedding (cache -> executor + micro-batch)
+        query_embedding = await get_query_embedding(query)
 
-        # Get top-k results
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        # Top-k lewat index (cosine similarity), hanya kandidat kalau difilter
+        scores, indices = _vector_index.search(query_embedding, top_k, rows=rows)
 
         results = []
-        for idx in top_indices:
-            score = float(similarities[idx])
+        for idx, score in zip(indices[0], scores[0]):
+            score = float(score)
 
-            # Filter by minimum similarity
-            if score < min_similarity:
+            # Filter by minimum similarity (dan slot kosong dari IVF)
+            if idx < 0 or score < min_similarity:
                 continue
 
-            inovasi = _inovasi_data_cache[idx].copy()
+            inovasi = _inovasi_data_cache[idx]
             inovasi["similarity_score"] = round(score, 4)
             results.append(inovasi)
 
@@ -160,6 +547,8 @@ async def vector_search_inovasi(
 
         return results
 
+    except EmbeddingQueueFull:
+        raise
     except Exception as e:
         print(f"❌ Vector search error: {e}")
         import traceback
@@ -168,6 +557,126 @@ async def vector_search_inovasi(
         return []
 
 
+# ===============================
+# BATCH VECTOR SEARCH
+# ===============================
+def _rows_for_ids(inovasi_ids: Sequence[int]) -> np.ndarray:
+    """Row cache untuk setiap id (-1 kalau tidak ada)."""
+    return np.array([_id_to_row.get(i, -1) for i in inovasi_ids], dtype=np.int64)
+
+
+async def vector_search_batch(
+    queries: Optional[Sequence[str]] = None,
+    inovasi_ids: Optional[Sequence[int]] = None,
+    top_k: int = 5,
+    min_similarity: float = 0.3,
+    filters: Optional[SearchFilters] = None,
+) -> List[Dict]:
+    """
+    Vector search untuk banyak query / inovasi sekaligus: satu panggilan
+    encode dan satu perkalian matriks terhadap cache, bukan N request.
+
+    Args:
+        queries: Daftar query teks (di-encode bersama)
+        inovasi_ids: Daftar id inovasi; vector-nya diambil dari cache dan
+            dirinya sendiri tidak ikut di hasil
+        top_k: Jumlah hasil per query
+        min_similarity: Minimum similarity threshold
+        filters: Optional pre-filter (lihat vector_search_inovasi)
+
+    Returns:
+        List per query (urutan sama dengan input):
+        {"query"/"inovasi_id": ..., "results": [...]}. Kalau cache belum
+        bisa dimuat, setiap entri tetap ada dengan results kosong.
+    """
+    queries = list(queries or [])
+    inovasi_ids = [int(i) for i in inovasi_ids or []]
+
+    entries: List[Dict] = [{"query": q, "results": []} for q in queries]
+    entries += [{"inovasi_id": i, "results": []} for i in inovasi_ids]
+    if not entries:
+        return entries
+
+    await _follow_shared_snapshot()
+
+    if not _cache_loaded:
+        success = await load_inovasi_embeddings_cache()
+        if not success:
+            return entries
+
+    if _vector_index is None or _inovasi_data_cache is None:
+        return entries
+
+    rows = _candidate_rows(filters)
+    if rows is not None and rows.size == 0:
+        return entries
+
+    # Matriks query: teks yang di-encode + vector inovasi dari cache
+    blocks = []
+    if queries:
+        blocks.append(await get_query_embeddings(queries))
+
+    self_rows = np.full(len(queries), -1, dtype=np.int64)
+    if inovasi_ids:
+        id_rows = _rows_for_ids(inovasi_ids)
+        missing = [i for i, r in zip(inovasi_ids, id_rows) if r < 0]
+        if missing:
+            print(f"❌ Inovasi IDs not found in cache: {missing}")
+
+        blocks.append(_vector_index.vectors.rows(np.maximum(id_rows, 0)))
+        self_rows = np.concatenate([self_rows, id_rows])
+
+    # +1 karena inovasi sendiri bisa ikut terambil
+    scores, indices = _vector_index.search(
+        np.vstack(blocks).astype(np.float32, copy=False),
+        top_k + (1 if inovasi_ids else 0),
+        rows=rows,
+    )
+
+    for entry, self_row, row_idx, row_scores in zip(
+        entries, self_rows, indices, scores
+    ):
+        if "inovasi_id" in entry and self_row < 0:
+            continue
+
+        for idx, score in zip(row_idx, row_scores):
+            score = float(score)
+            if idx < 0 or idx == self_row or score < min_similarity:
+                continue
+
+            inovasi = _inovasi_data_cache[idx]
+            inovasi["similarity_score"] = round(score, 4)
+            entry["results"].append(inovasi)
+
+            if len(entry["results"]) >= top_k:
+                break
+
+    print(
+        f"🔍 Batch vector search: {len(queries)} queries + {len(inovasi_ids)} inovasi"
+    )
+    return entries
+
+
+# ===============================
+# SIMILARITY SATU PASANGAN
+# ===============================
+async def get_pair_similarity(inovasi_id_1: int, inovasi_id_2: int) -> Optional[float]:
+    """Cosine similarity dua inovasi dari cache (None kalau salah satunya tidak ada)."""
+    await _follow_shared_snapshot()
+
+    if not _cache_loaded:
+        await load_inovasi_embeddings_cache()
+
+    row_1 = _id_to_row.get(inovasi_id_1)
+    row_2 = _id_to_row.get(inovasi_id_2)
+    if _vector_index is None or row_1 is None or row_2 is None:
+        return None
+
+    vectors = _vector_index.vectors.rows([row_1, row_2])
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return round(float(vectors[0] @ vectors[1]), 4)
+
+
 # ===============================
 # HYBRID SEARCH (Vector + SQL LIKE)
 # ===============================
@@ -287,7 +796,10 @@ async def hybrid_search_inovasi(
 # VECTOR SEARCH FOR COLLABORATION
 # ===============================
 async def vector_search_collaboration(
-    inovasi_id: int, top_k: int = 5, min_similarity: float = 0.3
+    inovasi_id: int,
+    top_k: int = 5,
+    min_similarity: float = 0.3,
+    filters: Optional[SearchFilters] = None,
 ) -> List[Dict]:
     """
     Cari inovasi yang mirip untuk kolaborasi menggunakan vector similarity.
@@ -297,52 +809,58 @@ async def vector_search_collaboration(
         inovasi_id: ID inovasi yang ingin dicari pasangannya
         top_k: Number of top similar inovasi
         min_similarity: Minimum similarity threshold
+        filters: Optional pre-filter (lihat vector_search_inovasi)
 
     Returns:
         List of similar inovasi with similarity scores
     """
-    global _embeddings_cache, _inovasi_data_cache, _cache_loaded
+    global _inovasi_data_cache, _vector_index, _cache_loaded
+
+    await _follow_shared_snapshot()
 
     if not _cache_loaded:
         await load_inovasi_embeddings_cache()
 
-    if _embeddings_cache is None or _inovasi_data_cache is None:
+    if _vector_index is None or _inovasi_data_cache is None:
+        return []
+
+    rows = _candidate_rows(filters)
+    if rows is not None and rows.size == 0:
         return []
 
     try:
-        # Find index of target inovasi
-        target_idx = None
-        for idx, item in enumerate(_inovasi_data_cache):
-            if item["id"] == inovasi_id:
-                target_idx = idx
-                break
+        # Lookup O(1) lewat id index
+        target_idx = _id_to_row.get(inovasi_id)
 
         if target_idx is None:
             print(f"❌ Inovasi ID {inovasi_id} not found in cache")
             return []
 
-        # Get embedding of target inovasi
-        target_embedding = _embeddings_cache[target_idx].reshape(1, -1)
-
-        # Calculate similarity with all other inovasi
-        similarities = cosine_similarity(target_embedding, _embeddings_cache)[0]
-
-        # Get top-k results (excluding self)
-        top_indices = np.argsort(similarities)[::-1]
+        if rows is None and _neighbor_table is not None and top_k <= _neighbor_table.k:
+            # Tabel tetangga yang sudah dihitung saat refresh cache
+            indices, scores = _neighbor_table.get(target_idx)
+        else:
+            # Filter / top_k di luar tabel: search lewat index
+            # (+1 karena dirinya sendiri ikut terambil)
+            target_embedding = _vector_index.get_vector(target_idx)
+            scores, indices = _vector_index.search(
+                target_embedding, top_k + 1, rows=rows
+            )
+            scores, indices = scores[0], indices[0]
 
         results = []
-        for idx in top_indices:
+        for idx, score in zip(indices, scores):
             # Skip self
-            if idx == target_idx:
+            if idx == target_idx or idx < 0:
                 continue
 
-            score = float(similarities[idx])
+            score = float(score)
 
             # Filter by minimum similarity
             if score < min_similarity:
                 continue
 
-            inovasi = _inovasi_data_cache[idx].copy()
+            inovasi = _inovasi_data_cache[idx]
             inovasi["similarity_score"] = round(score, 4)
             results.append(inovasi)
 
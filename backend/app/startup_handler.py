@@ -6,12 +6,42 @@ Handles initialization of vector search cache and clustering cache
 
 from fastapi import FastAPI
 from app.database import database
-from app.services.vector_search_service import load_inovasi_embeddings_cache
+from app.migrations import run_migrations
+from app.services.vector_search_service import (
+    load_inovasi_embeddings_cache,
+    watch_shared_refresh_requests,
+)
+from app.services import shared_snapshot
 from app.services.clustering_service import (
+    CLUSTERING_JOB_KIND,
     load_cache_from_database,
     check_and_auto_run_clustering,
 )
+from app.services.ai_service import close_gemini_clients
+from app.services.job_runner import (
+    recover_interrupted_jobs,
+    shutdown_jobs,
+    submit_job,
+)
 from contextlib import asynccontextmanager
+import asyncio
+
+
+async def auto_clustering_job(progress):
+    """
+    Job startup: cek data baru, clustering kalau perlu, lalu reload cache.
+    Dijalankan oleh job_runner supaya tidak menahan startup.
+    """
+    need_clustering = await check_and_auto_run_clustering(
+        threshold=50, progress=progress
+    )
+
+    if need_clustering:
+        print("\n🔄 Reloading caches after clustering...")
+        await load_inovasi_embeddings_cache()
+        await load_cache_from_database()
+
+    return {"clustering_ran": need_clustering}
 
 
 @asynccontextmanager
@@ -38,8 +68,17 @@ async def lifespan(app: FastAPI):
         # Don't yield yet - continue with startup to allow health checks
         # but skip cache loading
 
+    # Dengan VECTOR_SHARED_SNAPSHOT, hanya leader yang build cache & clustering
+    is_leader = shared_snapshot.is_leader()
+    refresh_watcher = None
+
     # Only continue with cache loading if database is connected
     if database.is_connected:
+        # Tabel tambahan backend (similarity_neighbor, dst.)
+        await run_migrations()
+        if is_leader:
+            await recover_interrupted_jobs()
+
         # 1. Load Vector Search Embeddings Cache
         print("\n📊 Step 1: Loading Vector Search Cache...")
         embeddings_loaded = await load_inovasi_embeddings_cache()
@@ -54,18 +93,16 @@ async def lifespan(app: FastAPI):
         await load_cache_from_database()
         print("✅ Clustering cache loaded")
 
-        # 3. Auto-check for new data and trigger clustering if needed
-        print("\n📊 Step 3: Checking for new data...")
-        need_clustering = await check_and_auto_run_clustering(threshold=50)
-
-        if need_clustering:
-            print("✅ Auto-clustering completed")
-            # Reload caches after clustering
-            print("\n🔄 Reloading caches after clustering...")
-            await load_inovasi_embeddings_cache()
-            await load_cache_from_database()
+        # 3. Auto-check for new data (background job, tidak menahan startup)
+        print("\n📊 Step 3: Scheduling new data check...")
+        if is_leader:
+            job, _ = await submit_job(CLUSTERING_JOB_KIND, auto_clustering_job)
+            print(f"✅ Auto-clustering job queued: {job['job_id']}")
         else:
-            print("✅ No clustering needed")
+            print("✅ Auto-clustering handled by leader worker")
+
+        if shared_snapshot.is_enabled():
+            refresh_watcher = asyncio.create_task(watch_shared_refresh_requests())
     else:
         print("\n⚠️ Skipping cache initialization due to database connection failure")
 
@@ -83,6 +120,13 @@ async def lifespan(app: FastAPI):
     print("👋 BRIDA AI System Shutting Down...")
     print("=" * 60)
 
+    if refresh_watcher is not None:
+        refresh_watcher.cancel()
+
+    # Job yang masih berjalan di-cancel sebelum database ditutup
+    await shutdown_jobs()
+    await close_gemini_clients()
+
     # ✅ DISCONNECT DATABASE
     try:
         await database.disconnect()
@@ -96,7 +140,8 @@ async def lifespan(app: FastAPI):
 # =====================================
 # MANUAL REFRESH ENDPOINTS (Optional)
 # =====================================
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from typing import Optional
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -133,6 +178,38 @@ async def refresh_clustering_cache(background_tasks: BackgroundTasks):
     }
 
 
+@router.get("/clustering-runs")
+async def get_clustering_runs():
+    """
+    Daftar run clustering yang masih disimpan (terbaru dulu).
+    """
+    from app.services.clustering_runs import list_runs
+
+    return {"runs": await list_runs()}
+
+
+@router.post("/clustering-runs/{run_id}/activate")
+async def activate_clustering_run(run_id: int):
+    """
+    Rollback / pindah ke run clustering lain yang masih disimpan.
+    """
+    from app.services.clustering_runs import activate_run
+    from app.services.clustering_service import load_cache_from_database
+
+    if not await activate_run(run_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Run {run_id} tidak ditemukan atau belum siap (status bukan ready)",
+        )
+
+    await load_cache_from_database()
+
+    return {
+        "status": "ok",
+        "message": f"Clustering run {run_id} is now active",
+    }
+
+
 @router.post("/refresh-all-caches")
 async def refresh_all_caches(background_tasks: BackgroundTasks):
     """
@@ -154,6 +231,115 @@ async def refresh_all_caches(background_tasks: BackgroundTasks):
     }
 
 
+@router.get("/changes")
+async def get_pending_changes(stage: str = Query("clustering")):
+    """
+    Id data_inovasi yang berubah sejak watermark sebuah stage
+    (inovasi_change_log), yaitu delta yang akan diproses run berikutnya.
+    """
+    from app.services.change_tracking import changes_since_watermark
+
+    changes = await changes_since_watermark(stage)
+    if changes is None:
+        return {"tracking": False, "stage": stage}
+
+    return {
+        "tracking": True,
+        "stage": stage,
+        "watermark": changes.since,
+        "latest_change_id": changes.upto,
+        "upserted_ids": changes.upserted,
+        "deleted_ids": changes.deleted,
+    }
+
+
+@router.get("/jobs")
+async def get_jobs(limit: int = Query(20, ge=1, le=100)):
+    """
+    Daftar job background terbaru (status + progress).
+    """
+    from app.services.job_runner import list_jobs
+
+    return {"jobs": await list_jobs(limit)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Status dan progress satu job.
+    """
+    from app.services.job_runner import get_job
+
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} tidak ditemukan")
+
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job_endpoint(job_id: str):
+    """
+    Cancel job yang masih queued / running. Job yang berjalan di worker lain
+    dijawab "cancel_requested" dan dibatalkan oleh worker pemiliknya.
+    """
+    from app.services.job_runner import HEARTBEAT_SECONDS, cancel_job, get_job
+
+    job, local = await cancel_job(job_id)
+    if job is None:
+        if await get_job(job_id) is None:
+            raise HTTPException(
+                status_code=404, detail=f"Job {job_id} tidak ditemukan"
+            )
+        raise HTTPException(
+            status_code=409, detail=f"Job {job_id} tidak sedang berjalan"
+        )
+
+    if local:
+        return {
+            "status": "cancelling",
+            "message": f"Job {job_id} sedang dibatalkan",
+        }
+
+    if job["status"] == "cancelled":
+        # Worker pemiliknya sudah mati, job langsung ditutup
+        return {
+            "status": "cancelled",
+            "owner": job["owner"],
+            "message": f"Job {job_id} milik worker yang sudah berhenti, ditandai cancelled",
+        }
+
+    return {
+        "status": "cancel_requested",
+        "owner": job["owner"],
+        "message": (
+            f"Job {job_id} berjalan di worker {job['owner']}; dibatalkan pada "
+            f"heartbeat berikutnya (maks. {HEARTBEAT_SECONDS:.0f} detik)"
+        ),
+    }
+
+
+@router.get("/llm-cache")
+async def get_llm_cache_status():
+    """
+    Statistik cache jawaban Gemini (memory + tabel llm_response_cache).
+    """
+    from app.services.llm_cache import get_llm_cache_stats
+
+    return await get_llm_cache_stats()
+
+
+@router.post("/llm-cache/clear")
+async def clear_llm_cache_endpoint(mode: Optional[str] = Query(None)):
+    """
+    Kosongkan cache jawaban Gemini (semua, atau satu mode).
+    """
+    from app.services.llm_cache import clear_llm_cache
+
+    removed = await clear_llm_cache(mode)
+    return {"status": "ok", "mode": mode, "removed": removed}
+
+
 @router.get("/cache-status")
 async def get_cache_status():
     """
@@ -162,8 +348,15 @@ async def get_cache_status():
     from app.services.vector_search_service import (
         _cache_loaded as vector_loaded,
         _inovasi_data_cache,
+        _vector_index,
+        _neighbor_table,
+        get_query_cache_stats,
+        get_shared_snapshot_status,
+    )
+    from app.services.clustering_service import (
+        get_cluster_cache,
+        get_cluster_cache_load_stats,
     )
-    from app.services.clustering_service import get_cluster_cache
 
     cluster_data, cluster_last_run = get_cluster_cache()
 
@@ -174,9 +367,26 @@ async def get_cache_status():
         "vector_cache": {
             "loaded": vector_loaded,
             "total_items": len(_inovasi_data_cache) if _inovasi_data_cache else 0,
+            "index": _vector_index.info() if _vector_index else None,
+            "metadata_memory_mb": (
+                round(_inovasi_data_cache.nbytes / (1024 * 1024), 2)
+                if _inovasi_data_cache
+                else 0
+            ),
+            "neighbor_table": (
+                {
+                    "k": _neighbor_table.k,
+                    "memory_mb": round(_neighbor_table.nbytes / (1024 * 1024), 2),
+                }
+                if _neighbor_table is not None
+                else None
+            ),
         },
+        "query_embedding_cache": get_query_cache_stats(),
+        "shared_snapshot": get_shared_snapshot_status(),
         "clustering_cache": {
             "total_clusters": len(cluster_data) if cluster_data else 0,
             "last_run": (cluster_last_run.isoformat() if cluster_last_run else None),
+            "last_load": get_cluster_cache_load_stats() or None,
         },
     }
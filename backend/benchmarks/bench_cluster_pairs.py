@@ -0,0 +1,151 @@
+"""
+Benchmark: ekstraksi pasangan intra-cluster (similarity_result) dan pasangan
+terbaik per cluster (calculate_cluster_insights), loop Python lama vs NumPy.
+
+Implementasi lama disalin di file ini sebagai pembanding. Embedding sintetis
+384 dimensi, label dari 4 cluster (sama dengan default pipeline).
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_cluster_pairs
+    python -m benchmarks.bench_cluster_pairs --sizes 600 5000 --legacy-max 5000
+"""
+
+import argparse
+import time
+from datetime import datetime
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.services.clustering_service import (
+    calculate_cluster_insights,
+    similarity_records,
+)
+from benchmarks.bench_vector_index import make_embeddings
+
+
+def make_frame(n: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": np.arange(1, n + 1),
+            "judul_inovasi": [f"Inovasi {i}" for i in range(n)],
+            "urusan_utama": "Kesehatan",
+            "tahapan_inovasi": "Penerapan",
+            "label_kematangan": "Matang",
+            "admin_opd": [f"OPD {i % 40}" for i in range(n)],
+        }
+    )
+
+
+# ===============================
+# IMPLEMENTASI LAMA (PEMBANDING)
+# ===============================
+def legacy_similarity_records(embeddings, df, labels, now):
+    sim_matrix = cosine_similarity(embeddings)
+    records = []
+
+    for i in range(len(df)):
+        for j in range(i + 1, len(df)):
+            if labels[i] != labels[j]:
+                continue
+
+            similarity = float(sim_matrix[i, j])
+            if similarity < 0.2:
+                continue
+
+            records.append(
+                {
+                    "cluster": int(labels[i]),
+                    "a": int(df.at[i, "id"]),
+                    "b": int(df.at[j, "id"]),
+                    "s": similarity,
+                    "ts": now,
+                }
+            )
+
+    return records
+
+
+def legacy_best_pairs(embeddings, labels):
+    sim_matrix = cosine_similarity(embeddings)
+    pairs = {}
+
+    for cluster_id in sorted(set(labels)):
+        idxs = [i for i, l in enumerate(labels) if l == cluster_id]
+        best_score, best_pair = 0.0, None
+        for i, j in combinations(idxs, 2):
+            score = float(sim_matrix[i, j])
+            if score > best_score:
+                best_score, best_pair = score, (i, j)
+        pairs[int(cluster_id)] = best_pair
+
+    return pairs
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(sizes, n_clusters: int, legacy_max: int):
+    print(
+        f"{'rows':>7} {'step':>9} {'legacy_s':>9} {'numpy_s':>8} {'speedup':>8} "
+        f"{'pairs':>10} {'same':>5}"
+    )
+
+    for n in sizes:
+        embeddings = make_embeddings(n)
+        labels = np.random.default_rng(0).integers(0, n_clusters, size=n)
+        df = make_frame(n)
+        now = datetime.utcnow()
+
+        records, new_s = timed(similarity_records, embeddings, df, labels, now)
+        insights, new_ins_s = timed(calculate_cluster_insights, df, embeddings, labels)
+
+        if n <= legacy_max:
+            old_records, old_s = timed(
+                legacy_similarity_records, embeddings, df, labels, now
+            )
+            old_pairs, old_ins_s = timed(legacy_best_pairs, embeddings, labels)
+
+            same_records = {(r[1], r[2]) for r in records} == {
+                (r["a"], r["b"]) for r in old_records
+            }
+            new_pairs = {
+                i["cluster_id"]: (i["inovasi_1"]["id"] - 1, i["inovasi_2"]["id"] - 1)
+                for i in insights
+            }
+            same_pairs = new_pairs == {k: v for k, v in old_pairs.items() if v}
+        else:
+            old_s = old_ins_s = None
+            same_records = same_pairs = None
+
+        for step, old, new, count, same in (
+            ("pairs", old_s, new_s, len(records), same_records),
+            ("insights", old_ins_s, new_ins_s, len(insights), same_pairs),
+        ):
+            old_txt = f"{old:>9.2f}" if old is not None else f"{'skip':>9}"
+            speedup = f"{old / new:>7.1f}x" if old is not None else f"{'-':>8}"
+            same_txt = "-" if same is None else ("yes" if same else "NO")
+            print(
+                f"{n:>7} {step:>9} {old_txt} {new:>8.3f} {speedup} "
+                f"{count:>10} {same_txt:>5}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[600, 5000, 20000])
+    parser.add_argument("--clusters", type=int, default=4)
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=20000,
+        help="lewati implementasi lama di atas jumlah baris ini",
+    )
+    args = parser.parse_args()
+
+    run(args.sizes, args.clusters, args.legacy_max)
@@ -0,0 +1,91 @@
+"""
+Benchmark: engine clustering (agglomerative / minibatch / two_stage) pada
+10k, 50k, 100k baris embedding 384 dimensi.
+
+"peak_mb" = puncak alokasi baru selama fit (tracemalloc, termasuk array
+numpy/scipy; embedding yang sudah ada di memori tidak dihitung). Engine streaming
+menerima embedding per batch CLUSTER_LOAD_BATCH_SIZE seperti di pipeline.
+Agglomerative di atas --agglomerative-max tidak dijalankan; yang dicetak
+hanya perkiraan matriks jarak condensed float64 (n*(n-1)/2*8 byte).
+
+"silhouette" = silhouette pada sampel 2000 baris (makin tinggi makin baik).
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_clustering_engines
+    python -m benchmarks.bench_clustering_engines --sizes 10000 --engines two_stage
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.metrics import silhouette_score
+
+from app.services.clustering_engines import StreamingClusterer
+from benchmarks.bench_vector_index import make_embeddings
+
+BATCH_SIZE = 2000
+SILHOUETTE_SAMPLE = 2000
+
+
+def measure(engine: str, embeddings: np.ndarray, k: int):
+    n = len(embeddings)
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if engine == "agglomerative":
+        labels = AgglomerativeClustering(n_clusters=k).fit_predict(embeddings)
+    else:
+        clusterer = StreamingClusterer(engine, k)
+        for offset in range(0, n, BATCH_SIZE):
+            clusterer.partial_fit(embeddings[offset : offset + BATCH_SIZE])
+        labels = clusterer.fit_labels(embeddings, k)
+
+    seconds = time.perf_counter() - start
+    peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    silhouette = silhouette_score(
+        embeddings, labels, sample_size=min(SILHOUETTE_SAMPLE, n), random_state=42
+    )
+    return seconds, peak_mb, silhouette
+
+
+def run(sizes, engines, k: int, agglomerative_max: int):
+    print(f"{'rows':>7} {'engine':>14} {'fit_s':>8} {'peak_mb':>9} {'silhouette':>11}")
+
+    for n in sizes:
+        embeddings = make_embeddings(n)
+
+        for engine in engines:
+            if engine == "agglomerative" and n > agglomerative_max:
+                estimate_mb = n * (n - 1) / 2 * 8 / 2**20
+                print(
+                    f"{n:>7} {engine:>14} {'skipped':>8} "
+                    f"{f'~{estimate_mb:,.0f}':>9} {'-':>11}"
+                )
+                continue
+
+            seconds, peak_mb, silhouette = measure(engine, embeddings, k)
+            print(
+                f"{n:>7} {engine:>14} {seconds:>8.2f} {peak_mb:>9.0f} "
+                f"{silhouette:>11.4f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=["agglomerative", "minibatch", "two_stage"],
+        choices=["agglomerative", "minibatch", "two_stage"],
+    )
+    parser.add_argument("--clusters", type=int, default=4)
+    parser.add_argument("--agglomerative-max", type=int, default=20000)
+    args = parser.parse_args()
+
+    run(args.sizes, args.engines, args.clusters, args.agglomerative_max)
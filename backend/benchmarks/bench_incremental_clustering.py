@@ -0,0 +1,94 @@
+"""
+Benchmark: clustering penuh (AgglomerativeClustering + neighbour table semua
+baris) vs assignment incremental (centroid terdekat + drift + neighbour table
+baris baru saja) ketika sejumlah kecil inovasi baru masuk.
+
+"agree" = porsi baris baru yang cluster incremental-nya sama dengan hasil
+clustering penuh (label penuh dipetakan ke label lama lewat mayoritas).
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_incremental_clustering
+    python -m benchmarks.bench_incremental_clustering --sizes 2000 5000 --new 50 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering
+
+from app.services.clustering_service import build_neighbor_pairs
+from app.services.incremental_clustering import assign_new_rows, cluster_drift
+from app.services.vector_index import normalize_rows
+from benchmarks.bench_vector_index import make_embeddings
+
+
+def full_run(embeddings: np.ndarray, n_clusters: int):
+    labels = AgglomerativeClustering(n_clusters=n_clusters).fit_predict(embeddings)
+    build_neighbor_pairs(embeddings, labels)
+    return labels
+
+
+def incremental_run(embeddings: np.ndarray, old_labels: np.ndarray, n_new: int):
+    n_old = len(old_labels)
+    new_labels, _ = assign_new_rows(
+        embeddings[:n_old], old_labels, np.zeros(n_old, dtype=bool), embeddings[n_old:]
+    )
+    labels = np.concatenate([old_labels, new_labels])
+    incremental = np.arange(len(labels)) >= n_old
+    _, needs_recluster = cluster_drift(normalize_rows(embeddings), labels, incremental)
+    build_neighbor_pairs(embeddings, labels, rows=np.arange(n_old, len(labels)))
+    return new_labels, needs_recluster
+
+
+def agreement(old_labels, full_labels, new_labels) -> float:
+    n_old = len(old_labels)
+    # Label hasil run penuh -> label lama yang paling banyak anggotanya
+    mapping = {
+        f: np.bincount(old_labels[full_labels[:n_old] == f]).argmax()
+        for f in np.unique(full_labels[:n_old])
+    }
+    mapped = np.array([mapping.get(f, -1) for f in full_labels[n_old:]])
+    return float(np.mean(mapped == new_labels))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(sizes, new_counts, n_clusters: int):
+    print(
+        f"{'rows':>7} {'new':>5} {'full_s':>8} {'incr_s':>8} {'speedup':>8} "
+        f"{'agree':>6} {'drift':>6}"
+    )
+
+    for n in sizes:
+        for n_new in new_counts:
+            embeddings = make_embeddings(n + n_new)
+            old_labels = AgglomerativeClustering(n_clusters=n_clusters).fit_predict(
+                embeddings[:n]
+            )
+
+            full_labels, full_s = timed(full_run, embeddings, n_clusters)
+            (new_labels, drift), incr_s = timed(
+                incremental_run, embeddings, old_labels, n_new
+            )
+
+            print(
+                f"{n:>7} {n_new:>5} {full_s:>8.2f} {incr_s:>8.3f} "
+                f"{full_s / incr_s:>7.1f}x "
+                f"{agreement(old_labels, full_labels, new_labels):>6.2f} "
+                f"{'yes' if drift else 'no':>6}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 5000, 10000])
+    parser.add_argument("--new", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--clusters", type=int, default=4)
+    args = parser.parse_args()
+
+    run(args.sizes, args.new, args.clusters)
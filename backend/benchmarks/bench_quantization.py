@@ -0,0 +1,94 @@
+"""
+Benchmark: memory dan ranking drift untuk mode VECTOR_CACHE_DTYPE
+(float32 vs float16 vs int8) serta metadata list-of-dict vs kolumnar.
+
+Embedding sintetis 384 dimensi; metadata diambil dari
+datasets/data_inovasi_clean.csv lalu direplikasi sampai n baris.
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_quantization
+    python -m benchmarks.bench_quantization --sizes 10000 100000
+"""
+
+import argparse
+import csv
+import os
+import time
+import tracemalloc
+import numpy as np
+
+from app.services.vector_index import ExactIndex
+from app.services.inovasi_columns import CATEGORY_COLUMNS, InovasiColumns
+from benchmarks.bench_vector_index import make_embeddings
+
+DATASET = os.path.join(
+    os.path.dirname(__file__), "..", "..", "datasets", "data_inovasi_clean.csv"
+)
+
+
+def make_rows(n: int):
+    with open(DATASET, encoding="utf-8") as f:
+        source = list(csv.DictReader(f))
+
+    # Salin string per baris, seperti hasil fetch database (bukan objek bersama)
+    columns = ("judul_inovasi",) + CATEGORY_COLUMNS
+    return [
+        {
+            "id": i + 1,
+            **{c: (source[i % len(source)][c] + " ")[:-1] for c in columns},
+        }
+        for i in range(n)
+    ]
+
+
+def traced_mb(build):
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current / (1024 * 1024)
+
+
+def run(sizes, n_queries: int, top_k: int):
+    for n in sizes:
+        print(f"\n=== {n} rows ===")
+
+        rows, dict_mb = traced_mb(lambda: make_rows(n))
+        _, col_mb = traced_mb(lambda: InovasiColumns(rows))
+        print(f"metadata  list-of-dict: {dict_mb:8.2f} MB   columnar: {col_mb:8.2f} MB")
+
+        embeddings = make_embeddings(n)
+        queries = make_embeddings(n_queries, seed=7)
+
+        baseline = ExactIndex(embeddings, dtype="float32")
+        base_scores, base_idx = baseline.search(queries, top_k)
+
+        print(
+            f"{'dtype':>8} {'matrix_mb':>10} {'ms/query':>9} "
+            f"{'overlap@k':>10} {'max|Δscore|':>12}"
+        )
+        for dtype in ("float32", "float16", "int8"):
+            index = ExactIndex(embeddings, dtype=dtype)
+
+            start = time.perf_counter()
+            scores, idx = index.search(queries, top_k)
+            ms = (time.perf_counter() - start) * 1000 / n_queries
+
+            overlap = np.mean(
+                [len(set(a) & set(b)) / top_k for a, b in zip(base_idx, idx)]
+            )
+            drift = float(np.abs(scores - base_scores).max())
+            print(
+                f"{dtype:>8} {index.vectors.nbytes / (1024 * 1024):>10.2f} "
+                f"{ms:>9.3f} {overlap:>10.3f} {drift:>12.4f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    run(args.sizes, args.queries, args.top_k)
@@ -0,0 +1,73 @@
+"""
+Benchmark: recall vs latency untuk backend vector index (exact vs ivf).
+
+Pakai embedding sintetis (384 dimensi, sama dengan MiniLM) yang dibuat
+berkelompok supaya mirip distribusi data inovasi asli.
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_vector_index
+    python -m benchmarks.bench_vector_index --sizes 5000 50000 --nprobe 4 8 16
+"""
+
+import argparse
+import time
+import numpy as np
+
+from app.services.vector_index import ExactIndex, IVFIndex
+
+DIM = 384
+
+
+def make_embeddings(n: int, n_topics: int = 40, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, DIM))
+    assign = rng.integers(0, n_topics, size=n)
+    return (topics[assign] + 0.6 * rng.normal(size=(n, DIM))).astype(np.float32)
+
+
+def time_queries(index, queries: np.ndarray, top_k: int):
+    start = time.perf_counter()
+    results = [index.search(q, top_k)[1][0] for q in queries]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return results, elapsed_ms
+
+
+def recall_at_k(truth, approx) -> float:
+    hits = [len(set(t) & set(a)) / len(t) for t, a in zip(truth, approx)]
+    return float(np.mean(hits))
+
+
+def run(sizes, nprobes, n_queries: int, top_k: int):
+    print(f"{'rows':>8} {'backend':>14} {'build_s':>8} {'ms/query':>9} {'recall@k':>9}")
+
+    for n in sizes:
+        embeddings = make_embeddings(n)
+        queries = make_embeddings(n_queries, seed=7)
+
+        start = time.perf_counter()
+        exact = ExactIndex(embeddings)
+        build_s = time.perf_counter() - start
+        truth, exact_ms = time_queries(exact, queries, top_k)
+        print(f"{n:>8} {'exact':>14} {build_s:>8.2f} {exact_ms:>9.3f} {1.0:>9.3f}")
+
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            ivf = IVFIndex(embeddings, nprobe=nprobe)
+            build_s = time.perf_counter() - start
+            approx, ivf_ms = time_queries(ivf, queries, top_k)
+            label = f"ivf/nprobe={ivf.nprobe}"
+            print(
+                f"{n:>8} {label:>14} {build_s:>8.2f} {ivf_ms:>9.3f} "
+                f"{recall_at_k(truth, approx):>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    run(args.sizes, args.nprobe, args.queries, args.top_k)